@@ -114,6 +114,7 @@ class LogScope:
 
 class ErrorMessage:
     internal_server_error = "Something went wrong. Please try again."
+    request_timed_out = "The request took too long. Please try again."
     class_join = "Failed to join the class"
     class_not_found = "No class found"
     otp_not_sent = "There was a problem while sending OTP. Please try again."
@@ -1,5 +1,4 @@
 import nltk
-import spacy
 import pandas as pd
 from textblob import TextBlob
 from nltk.corpus import stopwords
@@ -11,6 +10,7 @@ from api.models.content import Content
 from api.models.chat import Chat
 from api.models import db
 
+from api.utils.model_registry import models
 from api.utils.request import bad_response, response
 from api.middleware.error_handlers import internal_error_handler
 
@@ -18,11 +18,9 @@ from api.middleware.error_handlers import internal_error_handler
 # nltk.download('stopwords')
 # nltk.download('averaged_perceptron_tagger')
 
-nlp = spacy.load('en_core_web_sm')
-
 
 def get_related_keywords(content, top_n=5):
-    doc = nlp(content)
+    doc = models.get("en_core_web_sm")(content)
     tokens = [token for token in doc if not token.is_stop and token.is_alpha and token.has_vector]
 
     similar_words = set()
@@ -37,7 +35,7 @@ def get_related_keywords(content, top_n=5):
 
 
 def get_topics(content):
-    doc = nlp(content)
+    doc = models.get("en_core_web_sm")(content)
     tokens = [token.lemma_ for token in doc if not token.is_stop and token.is_alpha]
     dictionary = Dictionary([tokens])
     corpus = [dictionary.doc2bow([token]) for token in tokens]
@@ -52,7 +50,7 @@ def get_topics(content):
 
 
 def get_sentiment(content):
-    doc = nlp(content)
+    doc = models.get("en_core_web_sm")(content)
     sentences = [sent.text.strip() for sent in doc.sents]  # Change this line
     polarity = 0
     subjectivity = 0
@@ -72,7 +70,7 @@ def get_sentiment(content):
 
 
 def generate_content_ner(content):
-    doc = nlp(content)
+    doc = models.get("en_core_web_sm")(content)
     entities = []
 
     for ent in doc.ents:
@@ -83,7 +81,7 @@ def generate_content_ner(content):
 
 
 def get_keywords_and_themes(content):
-    doc = nlp(content)
+    doc = models.get("en_core_web_sm")(content)
     nouns = []
     adjectives = []
     verbs = []
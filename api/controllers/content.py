@@ -1,16 +1,10 @@
 from http import HTTPStatus
 import math
 import nltk
-import spacy
-import openai
 import textstat
-import language_tool_python
 from typing import List
 
 import gensim
-import tensorflow as tf
-import tensorflow_hub as hub
-import tensorflow_text as text
 import gensim.corpora as corpora
 from gensim.models import CoherenceModel
 from nltk.stem import WordNetLemmatizer
@@ -18,6 +12,8 @@ from scipy.spatial.distance import cosine
 from api.utils.classifier_models import ClassifierModels
 from api.utils.input_preprocessor import InputPreprocessor
 from api.utils.instructor import Instructor
+from api.utils.llm_gateway import LLMGateway
+from api.utils.model_registry import models
 from api.utils.prompt import PromptGenerator
 from api.utils.scrapper import AssistantHubScrapper
 from api.utils.socket import Socket
@@ -32,12 +28,6 @@ from api.middleware.error_handlers import internal_error_handler
 from api.controllers import dashboard as dashboard_controller
 
 
-openai.api_key = Config.OPENAI_API_KEY
-nlp = spacy.load("en_core_web_md")
-tool = language_tool_python.LanguageTool("en-US");
-embed = hub.load("https://tfhub.dev/google/universal-sentence-encoder/4")
-
-
 def best_content(prompt: str, generated_contents: List[str]) -> str:
     scores = []
     index = 0
@@ -66,7 +56,7 @@ def best_content(prompt: str, generated_contents: List[str]) -> str:
 # Measure the relevance of User Message with the Update generated
 def relevance(prompt: str, content: str) -> float:
     # Generate embeddings for the prompt and the generated content
-    embeddings = embed([prompt, content])
+    embeddings = models.get("sentence_encoder")([prompt, content])
 
     # Calculate the cosine similarity between the embeddings
     similarity = 1 - cosine(embeddings[0], embeddings[1])
@@ -111,7 +101,7 @@ def readability(content: str) -> float:
 
 
 def grammar_and_spelling(content: str) -> float:
-    matches = tool.check(content)
+    matches = models.get("language_tool").check(content)
     grammar_score = 1 - len(matches) / len(content)
     return grammar_score
 
@@ -245,16 +235,11 @@ def fetch_content(user, content_id, user_ip):
         # Cost of Crawl
         points = points + total_point
 
-        web_content = ""
-        for result in web_searched_results:
-            web_content = web_content + result['website'] + "\n\n"
-            web_content = web_content + result['content'] + "\n\n"
-
-        system_message, user_message = PromptGenerator.generate_messages_on_opinion_for_social_media(
+        system_message, user_message = dashboard_controller.build_opinion_messages(
             content_data.topic,
             content_data.platform,
             content_data.length,
-            web_content
+            web_searched_results,
         )
     else:
         web_searched_results = None
@@ -298,7 +283,7 @@ def update_content(user_id, user_name, content_id, message):
         "name": format_name(user_name),
     }
 
-    assistant_response = openai.ChatCompletion.create(
+    assistant_response = LLMGateway.chat_completion(
         model=Config.OPENAI_MODEL,
         messages=[system_message, user_message],
         temperature=0.7,
@@ -306,6 +291,7 @@ def update_content(user_id, user_name, content_id, message):
         presence_penalty=0,
         user=str(user_id),
         frequency_penalty=0,
+        cache_ttl=0,
     )
 
     contents_by_model = [resp_data["message"]["content"] for resp_data in assistant_response["choices"]]
@@ -2,9 +2,8 @@ import math
 from bs4 import BeautifulSoup
 from http import HTTPStatus
 from concurrent.futures import ThreadPoolExecutor
-from flask import current_app, session
+from flask import Response, current_app, session, stream_with_context
 
-import concurrent.futures
 from api.middleware.error_handlers import internal_error_handler
 from api.assets import constants
 from api.models.analysis import Analysis
@@ -17,6 +16,7 @@ from api.utils.competitors_util import CompetitorUtils
 from api.utils.content_db import ContentDataModel
 from api.utils.dashboard import DashboardUtils
 from api.utils.db import add_commit_, add_flush_, commit_
+from api.utils.deadline import Deadline, DeadlineExceeded
 from api.utils.generator_models import GeneratorModels
 from api.utils.instructor import Instructor
 from api.utils.maps_utils import AssistantHubMapsAlgo
@@ -27,8 +27,12 @@ from api.utils.socket import Socket
 from api.utils.validator import APIInputValidator
 from api.utils.input_preprocessor import InputPreprocessor
 from api.utils.scrapper import AssistantHubScrapper
+from api.utils.semantic_cache import DRAFT, FEW_SHOT, SemanticCache
+from api.utils.pipeline import Pipeline
 from api.utils.time import TimeUtils
-from api.utils.request import bad_response, response
+from api.utils.title_generator import TitleGenerator
+from api.utils.token_budget import TokenBudget
+from api.utils.request import bad_response, response, sse_event
 from api.utils.seo_utils import AssistantHubSEO
 from api.utils import logging_wrapper
 
@@ -37,6 +41,7 @@ from api.models.content import Content
 from api.models.chat import Chat
 from api.models.seo_project import SEOProject
 from api.utils.youtube_utils import YotubeSEOUtils
+from config import Config
 
 logger = logging_wrapper.Logger(__name__)
 
@@ -56,6 +61,36 @@ def is_user_have_sufficient_points(user_id):
     return True, purchase
 
 
+def reserve_points(purchase, points):
+    # Held before an expensive call and settled once the real cost is known
+    if purchase.points < points:
+        return False
+
+    purchase.points = purchase.points - points
+    commit_()
+    return True
+
+
+def settle_points(purchase, reserved_points, points):
+    purchase.points = purchase.points + reserved_points - math.ceil((points * 100))
+    commit_()
+
+
+def estimate_generation_points(system_message, user_message):
+    prompt_tokens = TokenBudget.count_message_tokens(
+        [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        Config.OPENAI_MODEL,
+    )
+    return TokenBudget.estimate_points(
+        prompt_tokens,
+        Config.OPENAI_ESTIMATED_COMPLETION_TOKENS,
+        Config.OPENAI_GENERATION_PRICE_PER_1K_TOKENS,
+    )
+
+
 @internal_error_handler
 def seo_analyzer_create_project(user, business_type, target_audience, industry, goals, user_ip):
     is_allowed, purchase = is_user_have_sufficient_points(user.id)
@@ -150,20 +185,11 @@ def seo_analyzer_youtube(user, project_id):
             message="Unable to generate the search query.",
         )
 
-    # Fetch YouTube video data
+    # Fetch YouTube video data, all queries at once so video details are fetched in batches
     try:
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_video_data = {executor.submit(YotubeSEOUtils.youtube_search, current_app._get_current_object(), query, project_id): query for query in youtube_array_of_search}
-            youtube_data = []
-            for future in concurrent.futures.as_completed(future_to_video_data):
-                query = future_to_video_data[future]
-                try:
-                    data = future.result()
-                    youtube_data.extend(data)
-                except Exception as e:
-                    logger.exception(f"Error fetching YouTube data for query {query}: {str(e)}")
-                    # Handle the exception as needed
-
+        youtube_data = YotubeSEOUtils.youtube_search(youtube_array_of_search, project_id)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return response(
             success=False,
@@ -308,11 +334,7 @@ def seo_analyzer_news(user, project_id):
     trending_topics = AssistantHubNewsAlgo.keywords_titles_builder(news_articles)
 
     # seo_analyzer_news function
-    with ThreadPoolExecutor() as executor:
-        titles_futures = [executor.submit(AssistantHubNewsAlgo.generate_title, keywords, user_id, current_app._get_current_object()) for keywords in trending_topics]
-        titles_results = [future.result() for future in titles_futures]
-        titles, total_tokens_list = zip(*titles_results)
-        total_tokens_gpt4 = sum(total_tokens_list)
+    titles, total_tokens_gpt4 = TitleGenerator.generate_titles(trending_topics, user_id)
         
     points = points + ((total_tokens_gpt4 * 0.02)/1000)
     project_data_model.news_suggestions = {
@@ -498,7 +520,7 @@ def seo_analyzer_places(user, project_id, app):
             return response_place_data
 
     with ThreadPoolExecutor() as executor:
-        response_places_data = executor.map(lambda place: analyze_place(place, app), places_data)
+        response_places_data = executor.map(Deadline.propagate(lambda place: analyze_place(place, app)), places_data)
 
     response_places_data = list(response_places_data)
     geo_distribution = AssistantHubMapsAlgo.analyze_georaphic_distribution(places_data)
@@ -568,11 +590,7 @@ def seo_analyzer_search_results(user, project_id):
     points += total_point
 
     trending_topics = GoogleSearchUtils.keywords_titles_builder(search_results)
-    with ThreadPoolExecutor() as executor:
-        titles_futures = [executor.submit(GoogleSearchUtils.generate_title, keywords, user_id, current_app._get_current_object()) for keywords in trending_topics]
-        titles_results = [future.result() for future in titles_futures]
-        titles, total_tokens_list = zip(*titles_results)
-        total_tokens_gpt4 = sum(total_tokens_list)
+    titles, total_tokens_gpt4 = TitleGenerator.generate_titles(trending_topics, user_id)
 
     points = points + ((total_tokens_gpt4 * 0.02)/1000)
 
@@ -800,11 +818,7 @@ def seo_analyzer_competitors(user, project_id):
     # NLP Analysis
     trending_topics = CompetitorUtils.keywords_titles_builder(comptitor_analysis)
 
-    with ThreadPoolExecutor() as executor:
-        titles_futures = [executor.submit(CompetitorUtils.generate_title, user_id, keywords, current_app._get_current_object()) for keywords in trending_topics]
-        titles_results = [future.result() for future in titles_futures]
-        titles, total_tokens_list = zip(*titles_results)
-        total_tokens_gpt4 = sum(total_tokens_list)
+    titles, total_tokens_gpt4 = TitleGenerator.generate_titles(trending_topics, user_id)
 
     points = points + ((total_tokens_gpt4 * 0.02)/1000)
 
@@ -863,17 +877,7 @@ def seo_analyzer_online_forums(user, business_type, target_audience, industry, g
     )
 
 
-@internal_error_handler
-def generate_content_for_social_media(user, topic, platform, keywords, length, urls, user_ip):
-    is_allowed, purchase = is_user_have_sufficient_points(user.id)
-
-    if not is_allowed:
-        return bad_response(
-            message="You don't have enough points to create a project.",
-            status_code=HTTPStatus.BAD_REQUEST,
-        )
-
-    points = 0.0
+def preprocess_social_media_input(topic, platform, length, urls):
     validation_response = APIInputValidator.validate_content_input_for_social_media(
         topic,
         platform,
@@ -881,10 +885,11 @@ def generate_content_for_social_media(user, topic, platform, keywords, length, u
     )
 
     if validation_response:
-        return validation_response
+        return validation_response, None
 
     try:
-        processed_input = InputPreprocessor.preprocess_user_input_for_social_media_post(
+        # URLs are fetched later, in parallel with the other pipeline stages
+        processed_input = InputPreprocessor.validate_social_media_post_input(
             topic,
             urls,
             length,
@@ -895,50 +900,127 @@ def generate_content_for_social_media(user, topic, platform, keywords, length, u
             success=False,
             message=str(e),
             status_code=HTTPStatus.BAD_REQUEST,
-        )
+        ), None
     except Exception as e:
         return response(
             success=False,
             message=str(e),
             status_code=HTTPStatus.BAD_REQUEST,
-        )
+        ), None
 
-    is_opinion, total_tokens = ClassifierModels.is_the_topic_opinion_based(
-        processed_input['topic'],
+    return None, processed_input
+
+
+def build_web_content(web_searched_results):
+    web_content = ""
+    for result in web_searched_results:
+        web_content = web_content + result['website'] + "\n\n"
+        web_content = web_content + result['content'] + "\n\n"
+    return web_content
+
+
+def build_opinion_messages(topic, platform, content_length, web_searched_results):
+    system_message, user_message = PromptGenerator.generate_messages_on_opinion_for_social_media(
+        topic,
+        platform,
+        content_length,
+        build_web_content(web_searched_results),
     )
 
+    prompt_tokens = TokenBudget.count_message_tokens(
+        [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        Config.OPENAI_MODEL,
+    )
+    overflow_tokens = prompt_tokens - TokenBudget.prompt_budget(Config.OPENAI_MODEL)
+    if overflow_tokens <= 0:
+        return system_message, user_message
+
+    # Trim the crawled content, lowest ranked sources go first
+    web_tokens = TokenBudget.count_tokens(build_web_content(web_searched_results), Config.OPENAI_MODEL)
+    web_searched_results[:] = TokenBudget.fit_contents(
+        web_searched_results,
+        web_tokens - overflow_tokens,
+        Config.OPENAI_MODEL,
+    )
+    logger.info("Trimmed web content to the prompt budget", metadata={
+        "prompt_tokens": prompt_tokens,
+        "overflow_tokens": overflow_tokens,
+    })
+
+    return PromptGenerator.generate_messages_on_opinion_for_social_media(
+        topic,
+        platform,
+        content_length,
+        build_web_content(web_searched_results),
+    )
+
+
+def build_social_media_messages(processed_input, length, user_ip):
+    topic = processed_input['topic']
+
+    # Independent stages run in parallel. With SPECULATIVE_SEARCH_ENABLED the
+    # web search starts before classification is known, but only for topics
+    # the memo or the local model already lean towards opinion, since a
+    # search that has started spends Custom Search quota even when the
+    # topic turns out not to need it.
+    pipeline = Pipeline(current_app._get_current_object())
+    pipeline.add("url_contents", lambda: InputPreprocessor.fetch_url_contents(processed_input['urls']))
+    pipeline.add("classification", lambda: ClassifierModels.is_the_topic_opinion_based(topic))
+    pipeline.add("country_code", lambda: AssistantHubScrapper.get_country_code_from_ip(user_ip) or 'IN')
+
+    def search(country_code, classification=(True, 0)):
+        is_opinion, _ = classification
+        return AssistantHubScrapper.google_search(topic, country_code) if is_opinion else (None, 0.0)
+
+    def crawl(classification, search):
+        is_opinion, _ = classification
+        search_results, _ = search
+        return AssistantHubScrapper.crawl(search_results) if is_opinion else None
+
+    if Config.SPECULATIVE_SEARCH_ENABLED and ClassifierModels.leans_opinion(topic):
+        pipeline.add("search_results", search, ["country_code"])
+    else:
+        pipeline.add("search_results", search, ["country_code", "classification"])
+    pipeline.add("web_searched_results", crawl, ["classification", "search_results"])
+
+    points = 0.0
+    is_opinion, total_tokens = pipeline.result("classification")
+
     # Cost of Classification
     points = points + ((total_tokens * 0.02)/1000)
 
     if is_opinion:
-        web_searched_results, total_point = AssistantHubScrapper.search_and_crawl(
-            processed_input['topic'],
-            user_ip,
-        )
-
-        # Cost of Crawl
-        points = points + total_point
+        web_searched_results = pipeline.result("web_searched_results")
 
-        web_content = ""
-        for result in web_searched_results:
-            web_content = web_content + result['website'] + "\n\n"
-            web_content = web_content + result['content'] + "\n\n"
+        # Cost of Crawl, free when the search results were cached
+        _, search_point = pipeline.result("search_results")
+        points = points + search_point
 
-        system_message, user_message = PromptGenerator.generate_messages_on_opinion_for_social_media(
-            processed_input['topic'],
+        system_message, user_message = build_opinion_messages(
+            topic,
             processed_input['platform'],
             processed_input["length"],
-            web_content
+            web_searched_results,
         )
     else:
+        pipeline.cancel("country_code", "search_results", "web_searched_results")
         web_searched_results = None
         system_message, user_message = PromptGenerator.generate_messages_for_social_media(
-            processed_input['topic'],
+            topic,
             processed_input['platform'],
             length,
             processed_input["length"],
         )
 
+    processed_input['url_contents'] = pipeline.result("url_contents")
+
+    return is_opinion, web_searched_results, system_message, user_message, points
+
+
+def reuse_cached_social_media_content(user, processed_input, keywords, length, cached_content):
     content_data = ContentDataModel.create_content_data(
         user=user,
         type="SOCIAL_MEDIA_POST",
@@ -946,56 +1028,289 @@ def generate_content_for_social_media(user, topic, platform, keywords, length, u
         platform=processed_input['platform'],
         keywords=keywords,
         length=length,
-        system_message=system_message,
-        user_message=user_message,
+        system_message=cached_content.system_message,
+        user_message=cached_content.user_message,
         purpose=None,
+        urls=processed_input['urls'],
+    )
+    ContentDataModel.update_content_model_from_cached_content(
+        cached_content, content_data
+    )
+
+    Instructor.handle_chat_instruction_for_social_media(
+        user.name,
+        content_data,
+        False,
+    )
+
+    # Call the Node.js server to create a room
+    Socket.create_room_for_content(
+        content_data.id,
+        content_data.user_id,
     )
 
+    return content_data
+
+
+@internal_error_handler
+def generate_content_for_social_media(user, topic, platform, keywords, length, urls, user_ip, no_cache=False):
+    is_allowed, purchase = is_user_have_sufficient_points(user.id)
+
+    if not is_allowed:
+        return bad_response(
+            message="You don't have enough points to create a project.",
+            status_code=HTTPStatus.BAD_REQUEST,
+        )
+
+    error_response, processed_input = preprocess_social_media_input(topic, platform, length, urls)
+    if error_response:
+        return error_response
+
+    match_type, cached_content = SemanticCache.lookup(
+        user.id, processed_input['topic'], "SOCIAL_MEDIA_POST", processed_input['platform'], length,
+        keywords=keywords, urls=processed_input['urls'], force=no_cache,
+    )
+
+    # Near identical post already generated, hand it back as a draft for free
+    if match_type == DRAFT:
+        content_data = reuse_cached_social_media_content(user, processed_input, keywords, length, cached_content)
+        return response(
+            success=True,
+            message=constants.SuccessMessage.content_generated,
+            content=content_data.model_response,
+            contentId=content_data.id,
+            cached=True,
+        )
+
+    is_opinion, web_searched_results, system_message, user_message, points = build_social_media_messages(
+        processed_input,
+        length,
+        user_ip,
+    )
+
+    if match_type == FEW_SHOT:
+        user_message = PromptGenerator.add_few_shot_example(user_message, cached_content.model_response)
+
+    reserved_points = estimate_generation_points(system_message, user_message)
+    if not reserve_points(purchase, reserved_points):
+        return bad_response(
+            message="You don't have enough points to generate this content.",
+            status_code=HTTPStatus.BAD_REQUEST,
+        )
+
+    # The reservation is settled in finally whatever ends the request, and is
+    # charged only for a generation that completed
+    completed = False
     try:
-        assistant_response, total_tokens = GeneratorModels.generate_content(
-            user, system_message, user_message
+        content_data = ContentDataModel.create_content_data(
+            user=user,
+            type="SOCIAL_MEDIA_POST",
+            topic=processed_input['topic'],
+            platform=processed_input['platform'],
+            keywords=keywords,
+            length=length,
+            system_message=system_message,
+            user_message=user_message,
+            purpose=None,
+            urls=processed_input['urls'],
         )
 
-        # Cost of Generation
-        points = points + ((total_tokens * 0.03)/1000)
+        try:
+            assistant_response, total_tokens = GeneratorModels.generate_content(
+                user, system_message, user_message
+            )
 
-        ContentDataModel.update_content_model_after_successful_ai_response(
-            assistant_response, content_data
+            # Cost of Generation
+            points = points + ((total_tokens * Config.OPENAI_GENERATION_PRICE_PER_1K_TOKENS)/1000)
+
+            ContentDataModel.update_content_model_after_successful_ai_response(
+                assistant_response, content_data
+            )
+            completed = True
+        except Exception as e:
+            logger.exception(str(e))
+            ContentDataModel.update_content_model_after_failed_ai_response(
+                content_data
+            )
+
+        if not completed:
+            return response(
+                success=False,
+                message="Unable to generate the content.",
+                status_code=HTTPStatus.BAD_REQUEST,
+            )
+
+        SemanticCache.add(content_data)
+
+        Instructor.handle_chat_instruction_for_social_media(
+            user.name,
+            content_data,
+            is_opinion,
+            web_searched_results,
         )
-    except Exception as e:
-        assistant_response = None
-        ContentDataModel.update_content_model_after_failed_ai_response(
-            content_data
+
+        # Call the Node.js server to create a room
+        Socket.create_room_for_content(
+            content_data.id,
+            content_data.user_id,
         )
 
-    if assistant_response == None:
         return response(
-            success=False,
-            message="Unable to generate the content.",
+            success=True,
+            message=constants.SuccessMessage.content_generated,
+            content=content_data.model_response,
+            contentId=content_data.id,
+        )
+    except Exception:
+        # Leaves the session usable for the settlement below
+        db.session.rollback()
+        raise
+    finally:
+        settle_points(purchase, reserved_points, points if completed else 0)
+
+
+@internal_error_handler
+def generate_content_for_social_media_stream(user, topic, platform, keywords, length, urls, user_ip, no_cache=False):
+    is_allowed, purchase = is_user_have_sufficient_points(user.id)
+
+    if not is_allowed:
+        return bad_response(
+            message="You don't have enough points to create a project.",
             status_code=HTTPStatus.BAD_REQUEST,
         )
 
-    Instructor.handle_chat_instruction_for_social_media(
-        user.name,
-        content_data,
-        is_opinion,
-        web_searched_results,
-    )
+    error_response, processed_input = preprocess_social_media_input(topic, platform, length, urls)
+    if error_response:
+        return error_response
+
+    # Everything after input validation runs inside the stream, so the client
+    # gets the first byte before classification, crawling and generation.
+    def generate_events():
+        # Streams outlive the regular request deadline
+        Deadline.start(Config.STREAM_DEADLINE_SECONDS)
+
+        # Headers are already sent here, so errors become an "error" event and
+        # the reservation is settled in finally, whatever ended the stream
+        reserved_points = 0
+        points = 0
+        content_data = None
+        completed = False
+        try:
+            yield sse_event("status", {"stage": "preparing"})
+
+            match_type, cached_content = SemanticCache.lookup(
+                user.id, processed_input['topic'], "SOCIAL_MEDIA_POST", processed_input['platform'], length,
+                keywords=keywords, urls=processed_input['urls'], force=no_cache,
+            )
 
-    # Call the Node.js server to create a room
-    Socket.create_room_for_content(
-        content_data.id,
-        content_data.user_id,
-    )
+            if match_type == DRAFT:
+                content_data = reuse_cached_social_media_content(user, processed_input, keywords, length, cached_content)
+                completed = True
+                yield sse_event("content", {"contentId": content_data.id})
+                yield sse_event("done", {
+                    "success": True,
+                    "message": constants.SuccessMessage.content_generated,
+                    "content": content_data.model_response,
+                    "contentId": content_data.id,
+                    "cached": True,
+                })
+                return
+
+            is_opinion, web_searched_results, system_message, user_message, points = build_social_media_messages(
+                processed_input,
+                length,
+                user_ip,
+            )
 
-    purchase.points = purchase.points - math.ceil((points * 100))
-    db.session.commit()
+            if match_type == FEW_SHOT:
+                user_message = PromptGenerator.add_few_shot_example(user_message, cached_content.model_response)
+
+            estimated_points = estimate_generation_points(system_message, user_message)
+            if not reserve_points(purchase, estimated_points):
+                yield sse_event("error", {"success": False, "message": "You don't have enough points to generate this content."})
+                return
+            reserved_points = estimated_points
+
+            content_data = ContentDataModel.create_content_data(
+                user=user,
+                type="SOCIAL_MEDIA_POST",
+                topic=processed_input['topic'],
+                platform=processed_input['platform'],
+                keywords=keywords,
+                length=length,
+                system_message=system_message,
+                user_message=user_message,
+                purpose=None,
+                urls=processed_input['urls'],
+            )
+            commit_()
 
-    return response(
-        success=True,
-        message=constants.SuccessMessage.content_generated,
-        content=content_data.model_response,
-        contentId=content_data.id,
+            yield sse_event("content", {"contentId": content_data.id})
+
+            content_stream = GeneratorModels.stream_content(user, system_message, user_message)
+            for token in content_stream:
+                yield sse_event("token", {"token": token})
+
+            assistant_response = content_stream.to_response()
+
+            # Cost of Generation
+            points = points + ((assistant_response['usage']['total_tokens'] * Config.OPENAI_GENERATION_PRICE_PER_1K_TOKENS)/1000)
+
+            ContentDataModel.update_content_model_after_successful_ai_response(
+                assistant_response, content_data
+            )
+            completed = True
+            SemanticCache.add(content_data)
+
+            Instructor.handle_chat_instruction_for_social_media(
+                user.name,
+                content_data,
+                is_opinion,
+                web_searched_results,
+            )
+
+            # Call the Node.js server to create a room
+            Socket.create_room_for_content(
+                content_data.id,
+                content_data.user_id,
+            )
+
+            settle_points(purchase, reserved_points, points)
+            reserved_points = 0
+
+            yield sse_event("done", {
+                "success": True,
+                "message": constants.SuccessMessage.content_generated,
+                "content": content_data.model_response,
+                "contentId": content_data.id,
+            })
+        except GeneratorExit:
+            # Client went away, finally settles
+            raise
+        except Exception as e:
+            logger.exception(str(e))
+            db.session.rollback()
+            yield sse_event("error", {"success": False, "message": "Unable to generate the content."})
+        finally:
+            try:
+                if content_data is not None and not completed:
+                    ContentDataModel.update_content_model_after_failed_ai_response(
+                        content_data
+                    )
+                if reserved_points:
+                    # Charged only for a generation that completed
+                    settle_points(purchase, reserved_points, points if completed else 0)
+            except Exception as e:
+                logger.exception(str(e))
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the event stream
+            "X-Accel-Buffering": "no",
+        },
     )
 
 
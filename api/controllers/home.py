@@ -1,20 +1,17 @@
 import nltk
-import openai
-import requests
+from api.utils.http_client import http_session
 import pandas as pd
 from pytrends.request import TrendReq
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from config import Config
+from api.utils.google_clients import google_clients
 from textstat import textstat
 from collections import Counter
 from api.middleware.error_handlers import internal_error_handler
+from api.utils.llm_gateway import LLMGateway
 
 #Only ONE TIME Download is required
 #nltk.download('punkt')
 
-openai.api_key = Config.OPENAI_API_KEY
-
 
 # Replace this with the path to your service account key JSON file
 KEY_FILE_LOCATION = '/home/ubuntu/development/Backend/dronacharya.json'
@@ -22,7 +19,6 @@ VIEW_ID = 'YOUR_VIEW_ID'  # Replace this with your Google Analytics View ID
 
 # Set up the Google Analytics API client
 credentials = service_account.Credentials.from_service_account_file(KEY_FILE_LOCATION)
-analytics = build('analyticsreporting', 'v4', credentials=credentials)
 
 @internal_error_handler
 def generate_content_ideas(prompt, num_ideas=5, format='content idea', examples=None, constraints=None):
@@ -34,7 +30,7 @@ def generate_content_ideas(prompt, num_ideas=5, format='content idea', examples=
     if constraints:
         prompt_intro += f"\nConstraints:\n{constraints}"
     
-    response = openai.Completion.create(
+    response = LLMGateway.completion(
         model="text-davinci-003",
         prompt=prompt_intro,
         temperature=0.7,
@@ -54,7 +50,7 @@ def generate_content_ideas(prompt, num_ideas=5, format='content idea', examples=
 def generate_content_brief(keywords, target_audience, competitors, num_sections=5):
     prompt = f"Create a content brief for an article targeting the keywords {', '.join(keywords)}, with insights on the target audience: {target_audience}, and considering the competitors: {', '.join(competitors)}. Include {num_sections} sections in the outline."
 
-    response = openai.Completion.create(
+    response = LLMGateway.completion(
         model="text-davinci-003",
         prompt=prompt,
         temperature=0.7,
@@ -73,7 +69,7 @@ def generate_content_brief(keywords, target_audience, competitors, num_sections=
 def generate_social_media_posts(topic, num_posts=3):
     prompt = f"Generate {num_posts} engaging social media posts for the topic '{topic}', including captions and hashtags."
 
-    response = openai.Completion.create(
+    response = LLMGateway.completion(
         model="text-davinci-003",
         prompt=prompt,
         temperature=0.7,
@@ -134,7 +130,7 @@ def get_trending_topics(query):
 @internal_error_handler
 def get_keyword_suggestions(query, api_key):
     url = f"https://api.semrush.com/?type=phrase_related&phrase={query}&key={api_key}&database=us"
-    response = requests.get(url)
+    response = http_session.get(url)
     keyword_data = response.text.split('\r\n')[1:-1]  # Skipping the first line (header) and last line (empty)
     keywords = [line.split(';')[0] for line in keyword_data]
     return keywords
@@ -143,7 +139,7 @@ def get_keyword_suggestions(query, api_key):
 def repurpose_content(content, target_format):
     prompt = f"Repurpose the following content into a {target_format}:\n\n{content}\n\n---\n\n{target_format} Content:"
 
-    response = openai.Completion.create(
+    response = LLMGateway.completion(
         model="text-davinci-003",
         prompt=prompt,
         temperature=0.7,
@@ -160,6 +156,7 @@ def repurpose_content(content, target_format):
 
 
 def get_analytics_data(start_date, end_date):
+    analytics = google_clients.client('analyticsreporting', 'v4', credentials=credentials)
     response = analytics.reports().batchGet(
         body={
             'reportRequests': [
@@ -6,6 +6,7 @@ from api.assets.constants import ErrorMessage
 from api.assets.constants import LogScope
 
 from api.utils.request import response
+from api.utils.deadline import DeadlineExceeded
 from api.utils import logging_wrapper
 
 logger = logging_wrapper.Logger(__name__)
@@ -15,6 +16,13 @@ def internal_error_handler(f):
     def wrapped_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except DeadlineExceeded as e:
+            logger.error(str(e))
+            return response(
+                False,
+                ErrorMessage.request_timed_out,
+                status_code=HTTPStatus.GATEWAY_TIMEOUT,
+            )
         except Exception as e:
             # NOTE: Keeping print for debug purposes, in case sentry doesn't work as intended.
             # print(f"Internal server error: Exception occurred", e)
@@ -0,0 +1,40 @@
+import copy
+from dataclasses import dataclass
+from api.models import db
+from datetime import datetime as dt, timezone
+
+
+@dataclass
+class TopicClassification(db.Model):
+    __tablename__ = "topic_classification"
+
+    id: int
+    topic_hash: str
+    topic: str
+    is_opinion: bool
+    source: str
+    confidence: float
+    created_at: dt
+    updated_at: dt
+
+    id = db.Column(db.Integer, primary_key=True, unique=True, autoincrement=True)
+    topic_hash = db.Column(db.String(64), index=True, nullable=False)
+    topic = db.Column(db.Text, nullable=False)
+    is_opinion = db.Column(db.Boolean, nullable=False)
+    # "llm" decisions are the training labels, "local" ones only memoize the local model
+    source = db.Column(db.String(16), nullable=False)
+    confidence = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, default=dt.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, onupdate=dt.utcnow, default=dt.utcnow, nullable=False)
+
+    def to_dict(self):
+        assert self.id is not None
+        obj_dict = copy.deepcopy(self.__dict__)
+        obj_dict.pop("_sa_instance_state", None)
+        obj_dict["created_at"] = (
+            obj_dict.pop("created_at").replace(tzinfo=timezone.utc).isoformat()
+        )
+        obj_dict["updated_at"] = (
+            obj_dict.pop("updated_at").replace(tzinfo=timezone.utc).isoformat()
+        )
+        return obj_dict
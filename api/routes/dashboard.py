@@ -338,6 +338,9 @@ def generate_content_for_social_media():
                 type: array
                 items:
                   type: object
+            no_cache:
+                type: boolean
+                description: Generate a new post even when a near identical one exists
         required:
             - topic
             - platform
@@ -365,6 +368,74 @@ def generate_content_for_social_media():
         length=request.json.get("length", None),
         urls=request.json.get("urls", None),
         user_ip=request.remote_addr,
+        no_cache=request.json.get("no_cache", False),
+    )
+
+@bp.route("/social_media_post/generator/content/stream", methods=["POST"])
+@authenticate
+def generate_content_for_social_media_stream():
+    """Generate Social Media Post and stream it as Server-Sent Events
+    This API endpoint generates the same content as /social_media_post/generator/content but forwards tokens while they are generated.
+    Events are sent in the order: status, content (with contentId), token (one per token) and finally done or error.
+    ---
+    tags:
+        - Dashboard
+    produces:
+        - text/event-stream
+    parameters:
+      - name: Authorization
+        in: header
+        schema:
+          type: string
+          example: Bearer 52Y6QUDNSF2XRH43SUK3GSBMGUFZ08PNBOXSAO7QWQI6JJWAYN0F1GS5UA4W15XF3DJR7M369GOX8WDVXYZC2VBL2U2EHDZ9EABO
+        required: true
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            topic:
+                type: string
+                description: Topic of the content
+            keywords:
+                type: string
+                description: List of keywords to include in the content
+            platform:
+                type: string
+                description: Platform of the content
+            length:
+                type: string
+                description: Length of the content
+                enum: [SHORT, MEDIUM, LONG]
+            urls:
+                description: Urls for research
+                type: array
+                items:
+                  type: object
+            no_cache:
+                type: boolean
+                description: Generate a new post even when a near identical one exists
+        required:
+            - topic
+            - platform
+            - length
+    responses:
+        200:
+          description: Stream of Server-Sent Events. The done event carries success, message, content and contentId.
+          content:
+            text/event-stream:
+              schema:
+                type: string
+    """
+    return dashboard_controller.generate_content_for_social_media_stream(
+        user=request.user,
+        topic=request.json.get("topic", None),
+        keywords=request.json.get("keywords", None),
+        platform=request.json.get("platform", None),
+        length=request.json.get("length", None),
+        urls=request.json.get("urls", None),
+        user_ip=request.remote_addr,
+        no_cache=request.json.get("no_cache", False),
     )
 
 @bp.route("/generator/content", methods=["POST"])
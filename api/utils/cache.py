@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from api.utils import logging_wrapper
+
+logger = logging_wrapper.Logger(__name__)
+
+
+class LRUCache:
+    # Thread safe in-memory cache with LRU eviction and per entry expiry.
+    # A ttl of None means the entry never expires on its own.
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    # Persistent key/value tier shared by every worker on the host.
+    # Values are stored as JSON, so only JSON serialisable objects are accepted.
+    def __init__(self, db_path, table="cache"):
+        self.db_path = db_path
+        self.table = table
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, created_at REAL NOT NULL)"
+        )
+        connection.commit()
+
+    def _connection(self):
+        # sqlite connections cannot be shared across threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        value, _ = self.get_with_ttl(key)
+        return value
+
+    def get_with_ttl(self, key):
+        # (value, seconds left or None when it never expires), (None, None) on a miss
+        try:
+            row = self._connection().execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+            return None, None
+
+        if row is None:
+            return None, None
+
+        value, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at <= now:
+            self.delete(key)
+            return None, None
+
+        return json.loads(value), expires_at - now if expires_at is not None else None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            connection = self._connection()
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+
+    def delete(self, key):
+        try:
+            connection = self._connection()
+            connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+
+    def purge_expired(self):
+        try:
+            connection = self._connection()
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+
+
+def read_through(memory, disk, key):
+    # Memory first, then disk. A disk hit is promoted for the time it has
+    # left, so an entry never outlives the TTL it was stored with.
+    value = memory.get(key)
+    if value is None and disk is not None:
+        value, ttl = disk.get_with_ttl(key)
+        if value is not None:
+            memory.set(key, value, ttl=ttl)
+    return value
@@ -1,13 +1,53 @@
-import openai
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.llm_gateway import LLMGateway
+from api.utils.opinion_classifier import LLM_SOURCE, opinion_classifier, topic_hash
+
+logger = logging_wrapper.Logger(__name__)
 
 class ClassifierModels:
+    # Returns (is_opinion, total_tokens). Topics the LLM already decided and
+    # confident local predictions cost no tokens, everything else is
+    # escalated to the LLM.
     def is_the_topic_opinion_based(topic):
+        key = topic_hash(topic)
+        try:
+            is_opinion = opinion_classifier.remembered(key)
+            if is_opinion is not None:
+                return is_opinion, 0
+
+            is_opinion, confidence = opinion_classifier.predict(topic)
+            if is_opinion is not None and confidence >= Config.OPINION_CLASSIFIER_CONFIDENCE:
+                return is_opinion, 0
+        except Exception as e:
+            logger.exception(str(e))
+
+        is_opinion, total_tokens = ClassifierModels.ask_llm_if_topic_is_opinion_based(topic)
+        if total_tokens:
+            opinion_classifier.remember(key, topic, is_opinion, LLM_SOURCE)
+
+        return is_opinion, total_tokens
+
+    # Guess from the memo or the local model, whatever its confidence, without
+    # asking the LLM. Only decides whether the web search starts early.
+    def leans_opinion(topic):
+        try:
+            is_opinion = opinion_classifier.remembered(topic_hash(topic))
+            if is_opinion is None:
+                is_opinion, _ = opinion_classifier.predict(topic)
+            return bool(is_opinion)
+        except Exception as e:
+            logger.exception(str(e))
+            return False
+
+    def ask_llm_if_topic_is_opinion_based(topic):
         try:
-            response = openai.Completion.create(
+            # Only the yes/no is read, so a couple of tokens is enough
+            response = LLMGateway.completion(
                 model="text-davinci-003",
                 prompt=f"Topic: \"{topic}\"\n\nIs this topic an opinion based topic? Yes or No\nAns:",
-                temperature=0.7,
-                max_tokens=256,
+                temperature=0,
+                max_tokens=3,
                 top_p=1,
                 frequency_penalty=0,
                 presence_penalty=0
@@ -21,4 +61,4 @@ class ClassifierModels:
                 return False, total_tokens
         except Exception as e:
             print(e)
-            return False, 0
\ No newline at end of file
+            return False, 0
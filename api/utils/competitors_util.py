@@ -1,10 +1,8 @@
 from httpx import HTTPError
-import openai
-import re
-import nltk
-import requests
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from api.utils.llm_gateway import LLMGateway
+from api.utils.deadline import DeadlineExceeded
+from api.utils.search_cache import search_cache, COMPETITORS
+from api.utils.text_preprocessing import TextPreprocessor
 from gensim.corpora import Dictionary
 from collections import Counter
 from sklearn.cluster import KMeans
@@ -81,7 +79,7 @@ class CompetitorUtils:
                 "content": f"User Input\n```\nBusiness type: {business_type}\nTarget audience: {target_audience}\nIndustry: {industry}\nLocation: {location}\n```"
             }
 
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL_GPT4,
                 messages=[system_prompt, user_prompt],
                 temperature=0.7,
@@ -95,6 +93,8 @@ class CompetitorUtils:
             search_queries = assistant_response["choices"][0]["message"]["content"].strip().split("\n")
             total_tokens = assistant_response['usage']['total_tokens']
             return search_queries, total_tokens
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.exception(str(e))
             return None, 0
@@ -103,8 +103,9 @@ class CompetitorUtils:
     def fetch_competitors(query_arr, project_id, country_code, max_results=5):
         total_point = 0.0
         competitor_urls = {}
-        url = "https://www.googleapis.com/customsearch/v1"
-            
+        upstream_calls = 0
+
+
         for query in query_arr:
             try:
                 search_model = SearchQuery.query.filter(
@@ -122,39 +123,31 @@ class CompetitorUtils:
                     add_commit_(search_model)
 
                 params = {
-                    "key": Config.GOOGLE_SEARCH_API_KEY,
-                    "cx": Config.CUSTOM_SEARCH_ENGINE_ID,
                     "q": query,
                     'num': max_results,
                     'gl': country_code,
                 }
 
-                response = requests.get(url, params=params)
-                if response.status_code == 200:
-                    competitor_urls[search_model.id] = response.json().get("items", [])
+                results, cached = search_cache.search(COMPETITORS, params)
+                if results is not None:
+                    competitor_urls[search_model.id] = results.get("items", [])
+                    # Cached listings were already paid for
+                    if not cached:
+                        upstream_calls += 1
                 else:
                     continue
             except HTTPError as e:
                 logger.exception(str(e))
                 continue
 
-        total_point = len(competitor_urls) * 0.0005
+        total_point = upstream_calls * 0.0005
         return competitor_urls, total_point
 
-    # Preprocessing function
-    def preprocess(text):
-        text = re.sub(r'<[^>]+>', '', text)  # Remove HTML tags
-        text = re.sub(r'\s+', ' ', text)  # Remove extra spaces
-        text = text.lower()  # Convert text to lowercase
-        tokens = nltk.word_tokenize(text)  # Tokenize words
-        lemmatizer = WordNetLemmatizer()
-        tokens = [lemmatizer.lemmatize(token) for token in tokens if token.isalnum() and token not in stopwords.words('english')]
-        return tokens
-
     def keywords_titles_builder(news_data):
         # Preprocess the articles
         articles = [(article.get("title", "") + article.get("snippet", "")) for article in news_data]
-        preprocessed_articles = [CompetitorUtils.preprocess(article) for article in articles]
+        # Tokenized once, shared by TF-IDF, LDA and the cluster keyword counts
+        preprocessed_articles = TextPreprocessor.tokens_batch(articles)
 
         # Build a dictionary and a corpus for the articles
         dictionary = Dictionary(preprocessed_articles)
@@ -196,41 +189,10 @@ class CompetitorUtils:
         # Analyzing trends and events
         trending_topics = []
         for cluster in range(5):
-            cluster_articles = [article for article, c in zip(articles, clusters) if c == cluster]
             cluster_keywords = Counter()
-            for article in cluster_articles:
-                article_keywords = CompetitorUtils.preprocess(article)
-                cluster_keywords.update(article_keywords)
+            for article_keywords, c in zip(preprocessed_articles, clusters):
+                if c == cluster:
+                    cluster_keywords.update(article_keywords)
             trending_topics.append(cluster_keywords.most_common(5))
 
         return trending_topics
-
-    def generate_title(user_id, keywords, app):
-        with app.app_context():
-            # Join the top keywords with a comma
-            keywords_str = ", ".join([keyword[0] for keyword in keywords])
-
-            system_prompt = {
-                "role": "system",
-                "content": "You are an AI assistant trained to generate relevant and engaging article titles based on a set of keywords. Generate a title using the following keywords."
-            }
-
-            user_prompt = {
-                "role": "user",
-                "content": f"Keywords: {keywords_str}"
-            }
-
-            assistant_response = openai.ChatCompletion.create(
-                model=Config.OPENAI_MODEL_GPT4,
-                messages=[system_prompt, user_prompt],
-                temperature=0.7,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0,
-                user=str(user_id),
-            )
-
-            # Extract and format the title
-            title = assistant_response["choices"][0]["message"]["content"].strip()
-            total_tokens = assistant_response['usage']['total_tokens']
-            return title, total_tokens
\ No newline at end of file
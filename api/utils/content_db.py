@@ -5,7 +5,7 @@ from api.models import db
 
 
 class ContentDataModel:
-    def create_content_data(user, type, topic, platform, purpose, keywords, length, system_message, user_message):
+    def create_content_data(user, type, topic, platform, purpose, keywords, length, system_message, user_message, urls=None):
         content_data = Content(
             user_id=user.id,
             type=type,
@@ -17,6 +17,7 @@ class ContentDataModel:
             model=Config.OPENAI_MODEL,
             platform=platform,
             purpose=purpose,
+            urls=urls,
         )
         db.session.add(content_data)
         db.session.flush()
@@ -32,6 +33,17 @@ class ContentDataModel:
         db.session.commit()
         return True
 
+    def update_content_model_from_cached_content(cached_content, content_data):
+        # Reused drafts cost no tokens
+        content_data.model_response = cached_content.model_response
+        content_data.content_data = cached_content.model_response
+        content_data.no_of_prompt_tokens = 0
+        content_data.no_of_completion_tokens = 0
+        content_data.finish_reason = "cached"
+        content_data.status = constants.ContentStatus.SUCCESS
+        db.session.commit()
+        return True
+
     def update_content_model_after_failed_ai_response(content_data):
         content_data.status = constants.ContentStatus.ERROR
         db.session.commit()
@@ -0,0 +1,226 @@
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.cache import LRUCache, SQLiteCache
+from api.utils.deadline import Deadline
+from api.utils.http_client import http_session, read_capped
+
+logger = logging_wrapper.Logger(__name__)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Google only reads the first 500KiB of a robots.txt
+ROBOTS_MAX_BYTES = 500 * 1024
+
+
+class CrawlSkipped(requests.exceptions.RequestException):
+    # Raised instead of issuing a request, callers treat it like a failed fetch
+    pass
+
+
+class SQLiteHostBuckets:
+    # Per host token buckets in a sqlite file, shared by the workers of one host
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS host_buckets ("
+            "host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.commit()
+
+    def _connection(self):
+        # sqlite connections cannot be shared across threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def reserve(self, host, rate, burst, max_wait):
+        # Takes a token, possibly one that only refills in the future, and
+        # returns how long to wait for it. None when that is over max_wait.
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated_at FROM host_buckets WHERE host = ?", (host,)
+            ).fetchone()
+            tokens, updated_at = row if row is not None else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated_at) * rate) - 1
+            wait = max(0.0, -tokens / rate)
+            if wait > max_wait:
+                connection.execute("ROLLBACK")
+                return None
+
+            connection.execute(
+                "INSERT OR REPLACE INTO host_buckets (host, tokens, updated_at) VALUES (?, ?, ?)",
+                (host, tokens, now),
+            )
+            connection.execute("COMMIT")
+            return wait
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+
+class RedisHostBuckets:
+    # Same buckets in Redis, shared by every worker on every machine
+    RESERVE_SCRIPT = """
+        local rate = tonumber(ARGV[1])
+        local burst = tonumber(ARGV[2])
+        local now = tonumber(ARGV[3])
+        local max_wait = tonumber(ARGV[4])
+        local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or burst)
+        local updated_at = tonumber(redis.call('HGET', KEYS[1], 'updated_at') or now)
+        tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate) - 1
+        local wait = math.max(0, -tokens / rate)
+        if wait > max_wait then
+            return nil
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+        redis.call('EXPIRE', KEYS[1], 3600)
+        return tostring(wait)
+    """
+
+    def __init__(self, redis_url):
+        self.client = redis.Redis.from_url(redis_url)
+        self.reserve_script = self.client.register_script(self.RESERVE_SCRIPT)
+
+    def reserve(self, host, rate, burst, max_wait):
+        wait = self.reserve_script(keys=[f"crawl:host:{host}"], args=[rate, burst, time.time(), max_wait])
+        return float(wait) if wait is not None else None
+
+
+class RobotsCache:
+    # Parsed robots.txt per origin, in memory and in a sqlite file shared by workers
+    def __init__(self, disk, ttl, error_ttl):
+        self.memory = LRUCache(max_entries=4096)
+        self.disk = disk
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+
+    def parser(self, origin):
+        parser = self.memory.get(origin)
+        if parser is not None:
+            return parser
+
+        # A disk entry keeps the TTL it was stored with, a 5xx stays a short lived allow all
+        robots, ttl = self.disk.get_with_ttl(origin) if self.disk is not None else (None, None)
+        if robots is None:
+            robots, ttl = self.download(origin)
+            if self.disk is not None:
+                self.disk.set(origin, robots, ttl=ttl)
+
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        if robots["status"] >= 400:
+            # No usable robots.txt, everything is allowed
+            parser.allow_all = True
+        else:
+            parser.parse(robots["text"].splitlines())
+        self.memory.set(origin, parser, ttl=ttl)
+        return parser
+
+    def download(self, origin):
+        try:
+            response = http_session.get(f"{origin}/robots.txt", stream=True)
+            text = read_capped(response, ROBOTS_MAX_BYTES).decode("utf-8", errors="replace")
+            ttl = self.error_ttl if response.status_code >= 500 else self.ttl
+            return {"status": response.status_code, "text": text}, ttl
+        except requests.exceptions.RequestException as e:
+            # Unreachable robots.txt, allow crawling but ask again soon
+            logger.info("robots.txt fetch failed", metadata={"origin": origin, "error": str(e)})
+            return {"status": 599, "text": ""}, self.error_ttl
+
+
+class CrawlGovernor:
+    # Gate in front of every scraped page request.
+    #
+    # A page is skipped when robots.txt disallows it for our user agent.
+    # Otherwise the request takes a token from the host's bucket, which
+    # refills at CRAWL_HOST_RATE requests per second (or 1 / Crawl-delay when
+    # robots.txt asks for less) and is shared by all workers through Redis,
+    # or through sqlite without Redis. When the token only frees up after
+    # max_wait seconds or after the request deadline the page is skipped.
+    def __init__(self, buckets, robots, user_agent, rate, burst, max_wait):
+        self.buckets = buckets
+        self.robots = robots
+        self.user_agent = user_agent
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+
+    def acquire(self, url):
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        parser = self.robots.parser(origin)
+        if not parser.can_fetch(self.user_agent, url):
+            raise CrawlSkipped(f"Disallowed by robots.txt: {url}")
+
+        rate, burst = self.rate, self.burst
+        crawl_delay = parser.crawl_delay(self.user_agent)
+        if crawl_delay:
+            rate, burst = min(rate, 1.0 / float(crawl_delay)), 1
+
+        max_wait = self.max_wait
+        remaining = Deadline.remaining()
+        if remaining is not None:
+            max_wait = min(max_wait, remaining)
+
+        try:
+            wait = self.buckets.reserve(host, rate, burst, max_wait)
+        except Exception as e:
+            # The governor being down must not stop scraping
+            logger.exception(str(e))
+            return
+
+        if wait is None:
+            raise CrawlSkipped(f"Crawl rate budget for {host} exhausted")
+        if wait > 0:
+            time.sleep(wait)
+
+
+def build_crawl_governor():
+    if Config.CRAWL_GOVERNOR_REDIS_URL and redis is not None:
+        buckets = RedisHostBuckets(Config.CRAWL_GOVERNOR_REDIS_URL)
+    else:
+        if Config.CRAWL_GOVERNOR_REDIS_URL:
+            logger.error("CRAWL_GOVERNOR_REDIS_URL is set but redis is not installed, using sqlite buckets")
+        buckets = SQLiteHostBuckets(Config.CRAWL_GOVERNOR_PATH)
+
+    return CrawlGovernor(
+        buckets,
+        RobotsCache(
+            SQLiteCache(Config.CRAWL_GOVERNOR_PATH, table="robots"),
+            ttl=Config.ROBOTS_CACHE_TTL,
+            error_ttl=Config.ROBOTS_CACHE_ERROR_TTL,
+        ),
+        user_agent=Config.CRAWL_ROBOTS_USER_AGENT,
+        rate=Config.CRAWL_HOST_RATE,
+        burst=Config.CRAWL_HOST_BURST,
+        max_wait=Config.CRAWL_GOVERNOR_MAX_WAIT,
+    )
+
+
+crawl_governor = build_crawl_governor() if Config.CRAWL_GOVERNOR_ENABLED else None
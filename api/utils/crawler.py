@@ -0,0 +1,104 @@
+import math
+import asyncio
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.deadline import Deadline
+
+logger = logging_wrapper.Logger(__name__)
+
+# Blocking fetches run here, the event loop only schedules them
+crawl_executor = ThreadPoolExecutor(max_workers=Config.CRAWL_MAX_WORKERS, thread_name_prefix="crawler")
+
+
+class AsyncCrawler:
+    # Fetches a ranked list of URLs concurrently.
+    #
+    # Politeness is enforced per host: at most per_host_concurrency requests
+    # in flight and per_host_delay seconds between request starts. At most
+    # fetch_budget URLs are fetched and the crawl stops after time_budget
+    # seconds. enough(results) is called with the finished results in rank
+    # order and stops the crawl early once it returns True.
+    def __init__(self, max_concurrency, per_host_concurrency, per_host_delay, fetch_budget, time_budget):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.fetch_budget = fetch_budget
+        self.time_budget = time_budget
+
+    def crawl(self, urls, fetch, enough=None):
+        # Returns one result per URL in rank order, None for URLs that failed or were skipped
+        return asyncio.run(self._crawl(list(urls), Deadline.propagate(fetch), enough))
+
+    async def _crawl(self, urls, fetch, enough):
+        loop = asyncio.get_running_loop()
+        global_slots = asyncio.Semaphore(self.max_concurrency)
+        host_slots = {}
+        host_next_start = {}
+
+        async def fetch_one(url):
+            host = urlparse(url).netloc.lower()
+            host_slot = host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+
+            async with host_slot:
+                delay = host_next_start.get(host, 0) - loop.time()
+                host_next_start[host] = max(loop.time(), host_next_start.get(host, 0)) + self.per_host_delay
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                async with global_slots:
+                    return await loop.run_in_executor(crawl_executor, fetch, url)
+
+        results = [None] * len(urls)
+        finished = [False] * len(urls)
+        tasks = {
+            asyncio.ensure_future(fetch_one(url)): index
+            for index, url in enumerate(urls[:self.fetch_budget])
+        }
+
+        remaining = Deadline.remaining()
+        time_budget = self.time_budget if remaining is None else min(self.time_budget, remaining)
+        stop_at = loop.time() + time_budget
+
+        ranked_prefix = 0
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=max(0, stop_at - loop.time()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                logger.info("Crawl time budget exhausted", metadata={"pending": len(pending)})
+                break
+
+            for task in done:
+                index = tasks[task]
+                finished[index] = True
+                if task.exception() is not None:
+                    logger.error("Crawl fetch failed", metadata={"url": urls[index], "error": str(task.exception())})
+                else:
+                    results[index] = task.result()
+
+            while ranked_prefix < len(urls) and finished[ranked_prefix]:
+                ranked_prefix += 1
+
+            if enough is not None and enough([result for result in results[:ranked_prefix] if result is not None]):
+                break
+
+        # Fetches already handed to a thread finish in the background, their results are dropped
+        for task in pending:
+            task.cancel()
+
+        return results
+
+
+crawler = AsyncCrawler(
+    max_concurrency=Config.CRAWL_MAX_CONCURRENCY,
+    per_host_concurrency=Config.CRAWL_PER_HOST_CONCURRENCY,
+    per_host_delay=Config.CRAWL_PER_HOST_DELAY,
+    fetch_budget=Config.CRAWL_FETCH_BUDGET,
+    time_budget=Config.CRAWL_TIME_BUDGET or math.inf,
+)
@@ -0,0 +1,63 @@
+import time
+import contextvars
+from functools import wraps
+from contextlib import contextmanager
+
+# Absolute time.monotonic() by which the current request must be answered
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    def start(seconds):
+        request_deadline.set(time.monotonic() + seconds if seconds else None)
+
+    def clear():
+        request_deadline.set(None)
+
+    def remaining():
+        # None when no deadline is set
+        deadline = request_deadline.get()
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    def check():
+        remaining = Deadline.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def timeout(default):
+        # Timeout for one outbound call, never past the request deadline.
+        # Raises once the deadline has passed, clients reject a zero timeout.
+        remaining = Deadline.remaining()
+        if remaining is None:
+            return default
+        if remaining <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return min(default, remaining)
+
+    @contextmanager
+    def scope(seconds):
+        token = request_deadline.set(time.monotonic() + seconds if seconds else None)
+        try:
+            yield
+        finally:
+            request_deadline.reset(token)
+
+    def propagate(f):
+        # Worker threads do not inherit context variables, carry the deadline over
+        deadline = request_deadline.get()
+
+        @wraps(f)
+        def wrapped_function(*args, **kwargs):
+            token = request_deadline.set(deadline)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                request_deadline.reset(token)
+
+        return wrapped_function
@@ -0,0 +1,208 @@
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+
+from config import Config
+from api.utils import logging_wrapper
+
+logger = logging_wrapper.Logger(__name__)
+
+WORDS = (
+    "growth audience brand content local market strategy digital insight trend customer "
+    "engagement search community product service quality launch guide story value"
+).split()
+
+
+class FixtureStore:
+    # JSONL file of {"key": <gateway cache key>, "endpoint": ..., "response": {...}}
+    def __init__(self, fixtures_path, record_path=None):
+        self.fixtures_path = fixtures_path
+        self.record_path = record_path
+        self.fixtures = {}
+        self._lock = threading.Lock()
+
+        if fixtures_path:
+            try:
+                with open(fixtures_path, "r") as file:
+                    for line in file:
+                        if line.strip():
+                            fixture = json.loads(line)
+                            self.fixtures[fixture["key"]] = fixture["response"]
+            except FileNotFoundError:
+                logger.info("No LLM fixtures found", metadata={"path": fixtures_path})
+
+    def get(self, key):
+        return self.fixtures.get(key)
+
+    def record(self, key, endpoint, response):
+        with self._lock:
+            self.fixtures[key] = response
+            with open(self.record_path, "a") as file:
+                file.write(json.dumps({"key": key, "endpoint": endpoint, "response": response}) + "\n")
+
+
+class FakeLLMBackend:
+    # Stand-in for the OpenAI API used for load tests and offline development.
+    #
+    # replay mode answers from recorded fixtures (see LLM_RECORD_FIXTURES_PATH)
+    # and synthesizes a response when a request was never recorded. synthetic
+    # mode always synthesizes. Latency is drawn from a log-normal distribution
+    # fitted to the configured median and p95.
+    def __init__(self, mode, fixtures, latency_median_ms, latency_p95_ms, token_latency_ms, completion_tokens, seed=None):
+        self.mode = mode
+        self.fixtures = fixtures
+        self.latency_median_ms = latency_median_ms
+        self.latency_p95_ms = latency_p95_ms
+        self.token_latency_ms = token_latency_ms
+        self.completion_tokens = completion_tokens
+        self.random = random.Random(seed)
+
+    def sample_latency(self):
+        if self.latency_median_ms <= 0:
+            return 0.0
+
+        # p95 of a log-normal is median * exp(1.645 * sigma)
+        p95 = max(self.latency_p95_ms, self.latency_median_ms)
+        sigma = math.log(p95 / self.latency_median_ms) / 1.645
+        return self.random.lognormvariate(math.log(self.latency_median_ms), sigma) / 1000.0
+
+    def count_tokens(self, text):
+        return max(1, len(text) // 4)
+
+    def expected_items(self, text):
+        # Prompts listing numbered items (e.g. batched title keyword sets) expect one answer per item
+        numbered_items = re.findall(r'^\s*\d+\.\s', text, flags=re.MULTILINE)
+        return len(numbered_items) or 5
+
+    def synthesize_text(self, prompt_text, max_tokens=None):
+        token_budget = min(max_tokens or self.completion_tokens, self.completion_tokens)
+        items = self.expected_items(prompt_text)
+        words_per_item = max(3, token_budget // items)
+
+        lines = []
+        for index in range(items):
+            words = [self.random.choice(WORDS) for _ in range(words_per_item)]
+            lines.append(f"{index + 1}. {' '.join(words).capitalize()}")
+        return "\n".join(lines)
+
+    def synthesize(self, endpoint, params):
+        if endpoint == "chat_completion":
+            prompt_text = "\n".join(message.get("content") or "" for message in params["messages"])
+            user_text = params["messages"][-1].get("content") or ""
+        else:
+            prompt_text = params.get("prompt") or ""
+            user_text = prompt_text
+
+        choices = []
+        completion_tokens = 0
+        for index in range(params.get("n") or 1):
+            text = self.synthesize_text(user_text, params.get("max_tokens"))
+            completion_tokens += self.count_tokens(text)
+            if endpoint == "chat_completion":
+                choices.append({
+                    "index": index,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                })
+            else:
+                choices.append({"index": index, "text": text, "finish_reason": "stop", "logprobs": None})
+
+        prompt_tokens = self.count_tokens(prompt_text)
+        return {
+            "id": f"fake-{uuid.uuid4().hex}",
+            "object": "chat.completion" if endpoint == "chat_completion" else "text_completion",
+            "created": int(time.time()),
+            "model": params.get("model"),
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def create(self, endpoint, key, params):
+        response = None
+        if self.mode == "replay":
+            response = self.fixtures.get(key)
+            if response is None:
+                logger.info("No fixture recorded for LLM request, synthesizing", metadata={"key": key})
+
+        if response is None:
+            response = self.synthesize(endpoint, params)
+
+        time.sleep(self.sample_latency())
+        return response
+
+    def stream(self, key, params):
+        response = self.create("chat_completion", key, params)
+        content = response["choices"][0]["message"]["content"]
+
+        # Split on whitespace boundaries so the stream resembles token deltas
+        for token in re.findall(r'\s*\S+', content):
+            time.sleep(self.token_latency_ms / 1000.0)
+            yield {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+
+        yield {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+
+fixture_store = FixtureStore(Config.LLM_FAKE_FIXTURES_PATH, record_path=Config.LLM_RECORD_FIXTURES_PATH)
+
+fake_backend = FakeLLMBackend(
+    mode=Config.LLM_FAKE_MODE,
+    fixtures=fixture_store,
+    latency_median_ms=Config.LLM_FAKE_LATENCY_MEDIAN_MS,
+    latency_p95_ms=Config.LLM_FAKE_LATENCY_P95_MS,
+    token_latency_ms=Config.LLM_FAKE_TOKEN_LATENCY_MS,
+    completion_tokens=Config.LLM_FAKE_COMPLETION_TOKENS,
+    seed=Config.LLM_FAKE_SEED,
+)
+
+
+def create_stub_app():
+    # OpenAI compatible HTTP server, point OPENAI_API_BASE at it to benchmark
+    # several gunicorn workers against one shared fake backend.
+    from flask import Flask, Response, request
+
+    from api.utils.llm_gateway import LLMGateway
+
+    stub_app = Flask(__name__)
+
+    def handle(endpoint):
+        params = request.get_json(force=True)
+        key = LLMGateway.cache_key(endpoint, params)
+
+        if params.get("stream"):
+            def events():
+                for chunk in fake_backend.stream(key, params):
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return Response(events(), mimetype="text/event-stream")
+
+        return fake_backend.create(endpoint, key, params)
+
+    @stub_app.route("/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        return handle("chat_completion")
+
+    @stub_app.route("/v1/completions", methods=["POST"])
+    def completions():
+        return handle("completion")
+
+    return stub_app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI compatible server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args(sys.argv[1:])
+
+    create_stub_app().run(host=args.host, port=args.port, threaded=True)
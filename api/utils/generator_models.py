@@ -1,4 +1,4 @@
-import openai
+from api.utils.llm_gateway import LLMGateway
 
 from config import Config
 from api.assets import constants
@@ -9,7 +9,7 @@ logger = logging_wrapper.Logger(__name__)
 class GeneratorModels:
     def generate_content(user, system_message, user_message):
         try:
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": system_message},
@@ -20,16 +20,31 @@ class GeneratorModels:
                 presence_penalty=0,
                 user=str(user.id),
                 frequency_penalty=0,
+                cache_ttl=0,
             )
             total_tokens = assistant_response['usage']['total_tokens']
             return assistant_response, total_tokens
         except Exception as e:
             return None, 0
 
+    def stream_content(user, system_message, user_message):
+        return LLMGateway.stream_chat_completion(
+            model=Config.OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": user_message},
+            ],
+            temperature=0.7,
+            top_p=1,
+            presence_penalty=0,
+            user=str(user.id),
+            frequency_penalty=0,
+        )
+
     def generate_title_templates(user, business_type, target_audience, industry, location, num_templates=5):
         try:
             prompt = f"Generate {num_templates} content title templates for a {business_type} business targeting {target_audience} in the {industry} industry located in {location}. Include a '{{keyword}}' placeholder in each template where a keyword will be inserted."
-            response = openai.Completion.create(
+            response = LLMGateway.completion(
                 model="text-davinci-003",
                 prompt=prompt,
                 temperature=0.7,
@@ -49,7 +64,7 @@ class GeneratorModels:
     def generate_youtube_search_text(user, business_type, target_audience, industry, location):
         try:
             prompt = f"Generate YouTube search queries based on the following information:\n1. Business type: {business_type}\n2. Target audience: {target_audience}\n3. Industry: {industry}\n4. Location: {location}\n\nSearch queries:"
-            response = openai.Completion.create(
+            response = LLMGateway.completion(
                 model="text-davinci-003",
                 prompt=prompt,
                 temperature=0.7,
@@ -69,7 +84,7 @@ class GeneratorModels:
         
     def generate_news_search_text(user, bussiness_type, target_audience, industry, goals, location):
         try:
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL,
                 messages=[
                     {
@@ -0,0 +1,116 @@
+import os
+import ipaddress
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.cache import LRUCache
+from api.utils.http_client import http_session
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+logger = logging_wrapper.Logger(__name__)
+
+UNKNOWN = (None, None)
+
+# Countries almost never change inside these prefixes, so one lookup serves the whole block
+PREFIX_LENGTHS = {4: 24, 6: 48}
+
+
+class GeoIPResolver:
+    # Resolves client IPs to (country name, country code), both lowercased.
+    #
+    # Lookups go to a local MaxMind style country database opened with mmap,
+    # so they cost no network round trip. Results are kept in an LRU keyed by
+    # the /24 (IPv4) or /48 (IPv6) prefix when the database network covers the
+    # whole prefix, and by the exact IP otherwise. ip-api.com is asked for
+    # every IP when no database is loaded, and for IPs the database has no
+    # record for when remote_fallback is on.
+    def __init__(self, db_path, remote_fallback, cache_size, cache_ttl):
+        self.db_path = db_path
+        self.remote_fallback = remote_fallback
+        self.cache_ttl = cache_ttl
+        self.cache = LRUCache(max_entries=cache_size)
+        self.reader = None
+
+        if not db_path:
+            return
+        if maxminddb is None:
+            logger.error("maxminddb is not installed, using remote GeoIP lookups")
+        elif not os.path.exists(db_path):
+            logger.error("GeoIP database not found, using remote GeoIP lookups", metadata={"path": db_path})
+        else:
+            self.reader = maxminddb.open_database(db_path, maxminddb.MODE_MMAP)
+
+    def prefix_key(self, address):
+        network = ipaddress.ip_network(f"{address}/{PREFIX_LENGTHS[address.version]}", strict=False)
+        return str(network)
+
+    def resolve(self, ip_address):
+        try:
+            address = ipaddress.ip_address((ip_address or "").strip())
+        except ValueError:
+            return UNKNOWN
+
+        # ip-api.com cannot place these either
+        if not address.is_global:
+            return UNKNOWN
+
+        prefix_key = self.prefix_key(address)
+        for key in (prefix_key, str(address)):
+            country = self.cache.get(key)
+            if country is not None:
+                return country
+
+        country, prefix_length = self.lookup_database(address)
+        if country is None and (self.reader is None or self.remote_fallback):
+            country, prefix_length = self.lookup_remote(address), None
+            # Remote failures are usually transient, try again on the next request
+            if country is None:
+                return UNKNOWN
+
+        country = country or UNKNOWN
+        covers_prefix = prefix_length is not None and prefix_length <= PREFIX_LENGTHS[address.version]
+        self.cache.set(prefix_key if covers_prefix else str(address), country, ttl=self.cache_ttl)
+        return country
+
+    def lookup_database(self, address):
+        if self.reader is None:
+            return None, None
+
+        try:
+            record, prefix_length = self.reader.get_with_prefix_len(address)
+        except ValueError as e:
+            logger.error("GeoIP lookup failed", metadata={"ip": str(address), "error": str(e)})
+            return None, None
+
+        country = (record or {}).get("country")
+        if not country:
+            return None, prefix_length
+
+        name = country.get("names", {}).get("en")
+        code = country.get("iso_code")
+        if not name or not code:
+            return None, prefix_length
+        return (name.lower(), code.lower()), prefix_length
+
+    def lookup_remote(self, address):
+        try:
+            response = http_session.get(f"http://ip-api.com/json/{address}")
+            response.raise_for_status()
+            data = response.json()
+            if data['status'] == 'success':
+                return data['country'].lower(), data['countryCode'].lower()
+        except Exception as e:
+            logger.error("Remote GeoIP lookup failed", metadata={"ip": str(address), "error": str(e)})
+        return None
+
+
+geoip = GeoIPResolver(
+    Config.GEOIP_DATABASE_PATH,
+    remote_fallback=Config.GEOIP_REMOTE_FALLBACK,
+    cache_size=Config.GEOIP_CACHE_SIZE,
+    cache_ttl=Config.GEOIP_CACHE_TTL,
+)
@@ -0,0 +1,81 @@
+import os
+import json
+import threading
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.http_client import http_session
+
+logger = logging_wrapper.Logger(__name__)
+
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+
+
+class GoogleClientFactory:
+    # Process wide source of googleapiclient services.
+    #
+    # build() downloads and parses the discovery document on every call.
+    # Here each document is loaded once per process, from GOOGLE_DISCOVERY_DIR
+    # when it holds "{api}.{version}.json", else from the documents bundled
+    # with google-api-python-client, and only as a last resort from the
+    # network. Services are not thread safe (each wraps its own httplib2
+    # connection), so every thread gets its own client, built once.
+    def __init__(self, discovery_dir):
+        self.discovery_dir = discovery_dir
+        self.documents = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def discovery_document(self, api, version):
+        key = f"{api}.{version}"
+        document = self.documents.get(key)
+        if document is not None:
+            return document
+
+        with self._lock:
+            document = self.documents.get(key)
+            if document is None:
+                document = json.loads(self.load_discovery_document(api, version))
+                self.documents[key] = document
+        return document
+
+    def load_discovery_document(self, api, version):
+        if self.discovery_dir:
+            document_path = os.path.join(self.discovery_dir, f"{api}.{version}.json")
+            if os.path.exists(document_path):
+                with open(document_path) as file:
+                    return file.read()
+
+        document = get_static_doc(api, version)
+        if document is not None:
+            return document
+
+        logger.info("Fetching discovery document", metadata={"api": api, "version": version})
+        response = http_session.get(DISCOVERY_URL.format(api=api, version=version))
+        response.raise_for_status()
+        return response.text
+
+    def client(self, api, version, developer_key=None, credentials=None):
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+
+        key = (api, version, developer_key, id(credentials) if credentials is not None else None)
+        service = clients.get(key)
+        if service is None:
+            service = build_from_document(
+                self.discovery_document(api, version),
+                developerKey=developer_key,
+                credentials=credentials,
+            )
+            clients[key] = service
+        return service
+
+    def youtube(self):
+        return self.client("youtube", "v3", developer_key=Config.GOOGLE_SEARCH_API_KEY)
+
+
+google_clients = GoogleClientFactory(Config.GOOGLE_DISCOVERY_DIR)
@@ -0,0 +1,256 @@
+import re
+import sys
+import time
+import codecs
+from html.parser import HTMLParser
+
+from config import Config
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+SKIPPED_TAGS = ("script", "style", "noscript", "template")
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.I)
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def empty_extract():
+    return {
+        "title": None,
+        "heading": None,
+        "description": None,
+        "text": "",
+        "paragraphs": [],
+        "links": [],
+    }
+
+
+def clean(text):
+    return " ".join((text or "").split())
+
+
+def sniff_encoding(content, encoding=None):
+    # A BOM, then the charset from the HTTP headers, then <meta charset> near the top, then utf-8
+    for bom, name in BOMS:
+        if content.startswith(bom):
+            return name
+
+    meta = META_CHARSET.search(content[:4096])
+    candidates = [encoding, meta.group(1).decode("ascii") if meta else None]
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+
+def decode_html(content, encoding=None):
+    return content.decode(sniff_encoding(content, encoding), errors="replace")
+
+
+class SinglePassParser(HTMLParser):
+    # Pure python fallback, collects everything in one streaming pass without building a tree
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.extract = empty_extract()
+        self.text_parts = []
+        self.skip_depth = 0
+        self.title_parts = None
+        self.headings = {}
+        self.heading_tag = None
+        self.heading_parts = None
+        self.paragraph_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+            return
+
+        attributes = dict(attrs)
+        if tag == "title" and self.extract["title"] is None:
+            self.title_parts = []
+        elif tag in ("h1", "h2") and tag not in self.headings and self.heading_parts is None:
+            self.heading_tag = tag
+            self.heading_parts = []
+        elif tag == "p":
+            self.paragraph_parts = []
+        elif tag == "a":
+            self.extract["links"].append(attributes.get("href"))
+        elif tag == "meta" and self.extract["description"] is None:
+            if attributes.get("name") == "description" or attributes.get("property") == "og:description":
+                self.extract["description"] = attributes.get("content")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "title" and self.title_parts is not None:
+            self.extract["title"] = clean("".join(self.title_parts))
+            self.title_parts = None
+        elif tag == self.heading_tag and self.heading_parts is not None:
+            self.headings[tag] = clean("".join(self.heading_parts))
+            self.heading_parts = None
+        elif tag == "p" and self.paragraph_parts is not None:
+            self.extract["paragraphs"].append(clean("".join(self.paragraph_parts)))
+            self.paragraph_parts = None
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+
+        for parts in (self.title_parts, self.heading_parts, self.paragraph_parts):
+            if parts is not None:
+                parts.append(data)
+
+        if self.title_parts is None:
+            self.text_parts.append(data)
+
+    def result(self):
+        self.close()
+        self.extract["heading"] = self.headings.get("h1") or self.headings.get("h2")
+        self.extract["text"] = clean(" ".join(self.text_parts))
+        return self.extract
+
+
+class HTMLExtractor:
+    # Extracts title, first heading, meta description, visible text,
+    # paragraphs and links from a page in a single pass.
+    #
+    # Engines: "selectolax" and "lxml" use C parsers when installed,
+    # "html.parser" is the pure python streaming fallback. "auto" picks the
+    # fastest one available.
+    def engine_name(engine=None):
+        # Falls back to the next available engine when the configured one is not installed
+        engine = engine or Config.HTML_EXTRACTOR_ENGINE
+        if engine == "html.parser":
+            return engine
+        if engine in ("auto", "selectolax") and SelectolaxParser is not None:
+            return "selectolax"
+        if engine in ("auto", "selectolax", "lxml") and lxml is not None:
+            return "lxml"
+        return "html.parser"
+
+    def extract(html, engine=None, encoding=None):
+        # html is bytes or str, bytes are capped to HTML_MAX_BYTES and decoded
+        # with encoding (the HTTP charset) or the charset the page declares
+        if isinstance(html, bytes):
+            html = decode_html(html[:Config.HTML_MAX_BYTES], encoding)
+        if not html:
+            return empty_extract()
+
+        engine = HTMLExtractor.engine_name(engine)
+        if engine == "selectolax":
+            return HTMLExtractor.extract_with_selectolax(html)
+        if engine == "lxml":
+            return HTMLExtractor.extract_with_lxml(html)
+        return HTMLExtractor.extract_stream([html])
+
+    def extract_stream(chunks, encoding="utf-8"):
+        # Incremental decoding, a character may be split across byte chunks
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        parser = SinglePassParser()
+        for chunk in chunks:
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk)
+            parser.feed(chunk)
+        parser.feed(decoder.decode(b"", final=True))
+        return parser.result()
+
+    def extract_with_selectolax(html):
+        tree = SelectolaxParser(html)
+        for node in tree.css(", ".join(SKIPPED_TAGS)):
+            node.decompose()
+
+        extract = empty_extract()
+
+        title_node = tree.css_first("title")
+        if title_node is not None:
+            extract["title"] = clean(title_node.text())
+
+        heading_node = tree.css_first("h1") or tree.css_first("h2")
+        if heading_node is not None:
+            extract["heading"] = clean(heading_node.text())
+
+        meta_node = tree.css_first('meta[name="description"]') or tree.css_first('meta[property="og:description"]')
+        if meta_node is not None:
+            extract["description"] = meta_node.attributes.get("content")
+
+        extract["paragraphs"] = [clean(node.text()) for node in tree.css("p")]
+        extract["links"] = [node.attributes.get("href") for node in tree.css("a")]
+
+        root = tree.body or tree.root
+        if root is not None:
+            extract["text"] = clean(root.text(separator=" "))
+        return extract
+
+    def extract_with_lxml(html):
+        try:
+            document = lxml.html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            return empty_extract()
+
+        etree.strip_elements(document, *SKIPPED_TAGS, with_tail=False)
+        extract = empty_extract()
+
+        title = document.find(".//title")
+        if title is not None:
+            extract["title"] = clean(title.text_content())
+
+        headings = document.xpath("(//h1)[1]") or document.xpath("(//h2)[1]")
+        if headings:
+            extract["heading"] = clean(headings[0].text_content())
+
+        descriptions = document.xpath('//meta[@name="description"]/@content | //meta[@property="og:description"]/@content')
+        if descriptions:
+            extract["description"] = str(descriptions[0])
+
+        extract["paragraphs"] = [clean(node.text_content()) for node in document.iter("p")]
+        extract["links"] = [node.get("href") for node in document.iter("a")]
+
+        body = document.find("body")
+        extract["text"] = clean(" ".join((body if body is not None else document).itertext()))
+        return extract
+
+
+def benchmark(paths, rounds=5):
+    # python -m api.utils.html_extractor page.html [more.html ...]
+    from bs4 import BeautifulSoup
+
+    def beautifulsoup(html):
+        soup = BeautifulSoup(html, "html.parser")
+        return soup.get_text(strip=True), [p.text for p in soup.find_all("p")], [a.get("href") for a in soup.find_all("a")]
+
+    engines = {"beautifulsoup": beautifulsoup}
+    for engine in ("selectolax", "lxml", "html.parser"):
+        if HTMLExtractor.engine_name(engine) == engine:
+            engines[engine] = lambda html, engine=engine: HTMLExtractor.extract(html, engine)
+
+    pages = []
+    for page_path in paths:
+        with open(page_path, "rb") as file:
+            pages.append(file.read().decode("utf-8", errors="replace"))
+
+    total_bytes = sum(len(page) for page in pages)
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KiB, {rounds} rounds")
+    for name, extract in engines.items():
+        started_at = time.perf_counter()
+        for _ in range(rounds):
+            for page in pages:
+                extract(page)
+        elapsed = (time.perf_counter() - started_at) / rounds
+        print(f"{name:>14}: {elapsed * 1000:8.1f} ms per round, {total_bytes / 1024 / 1024 / elapsed:6.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:])
@@ -0,0 +1,73 @@
+import re
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+from api.utils.deadline import Deadline
+
+
+class PooledSession(requests.Session):
+    # Every request gets a default timeout, capped by the request deadline
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (
+                Deadline.timeout(Config.HTTP_CONNECT_TIMEOUT),
+                Deadline.timeout(Config.HTTP_READ_TIMEOUT),
+            )
+        return super().request(method, url, **kwargs)
+
+
+def header_charset(response):
+    # Only a charset the server declared, requests guesses ISO-8859-1 for any text/* without one
+    match = re.search(r'charset=["\']?([\w.:-]+)', response.headers.get("Content-Type", ""), re.I)
+    return match.group(1) if match else None
+
+
+def read_capped(response, max_bytes):
+    # Reads a stream=True response body, stopping after max_bytes of decoded content
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+    finally:
+        response.close()
+    return b"".join(chunks)[:max_bytes]
+
+
+def build_session():
+    session = PooledSession()
+
+    # Connections are kept alive and reused across threads, one pool per host
+    adapter = HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+        max_retries=Retry(
+            total=Config.HTTP_MAX_RETRIES,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    session.headers.update({
+        "User-Agent": Config.HTTP_USER_AGENT,
+        "Accept-Encoding": "gzip, deflate",
+    })
+
+    # The session is shared by all users, cookies from one site visit must not leak into the next
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+# Shared by every outbound HTTP call of the process
+http_session = build_session()
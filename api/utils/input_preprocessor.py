@@ -1,8 +1,20 @@
 import re
 import requests
-from bs4 import BeautifulSoup
+from api.utils.page_cache import page_cache, normalize_url
+from api.utils.main_content import MainContentExtractor
+from api.utils.crawler import AsyncCrawler
 
 from api.utils.dashboard import DashboardUtils
+from config import Config
+
+url_fetcher = AsyncCrawler(
+    max_concurrency=Config.CRAWL_MAX_CONCURRENCY,
+    per_host_concurrency=Config.CRAWL_PER_HOST_CONCURRENCY,
+    per_host_delay=Config.CRAWL_PER_HOST_DELAY,
+    fetch_budget=Config.USER_URLS_MAX,
+    time_budget=Config.USER_URLS_TIME_BUDGET,
+)
+
 
 class InputPreprocessor:
     def preprocess_user_input(topic, urls, length):
@@ -31,43 +43,7 @@ class InputPreprocessor:
 
             parsed_urls.append(parsed_url_data)
 
-        url_contents = []
-        for url in parsed_urls:
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()  # Raise an exception for HTTP errors
-                soup = BeautifulSoup(response.content, 'html.parser')
-            except requests.exceptions.RequestException as e:
-                # Handle request errors, such as timeouts, DNS resolution errors, or invalid URLs
-                print(f"Error fetching URL: {url} - {e}")
-                continue
-
-            # Extract text from the webpage
-            text = soup.get_text(strip=True)
-
-            # Extract additional information, such as titles and summaries
-            title = None
-            summary = None
-
-            # Look for the title in common HTML elements
-            title_element = soup.find('title') or soup.find(
-                'h1') or soup.find('h2')
-            if title_element:
-                title = title_element.get_text(strip=True)
-
-            # Look for a summary in common HTML elements
-            summary_element = soup.find('meta', attrs={'name': 'description'}) or \
-                soup.find('meta', attrs={'property': 'og:description'})
-            if summary_element:
-                summary = summary_element['content']
-
-            url_info = {
-                'text': text,
-                'title': title,
-                'summary': summary
-            }
-
-            url_contents.append(url_info)
+        url_contents = InputPreprocessor.fetch_url_contents(parsed_urls)
 
         content_length = DashboardUtils.sizeOfContent(type, length)
         
@@ -79,7 +55,7 @@ class InputPreprocessor:
         }
 
 
-    def preprocess_user_input_for_social_media_post(topic, urls, length, platform):
+    def validate_social_media_post_input(topic, urls, length, platform):
         platform = platform.upper().strip()
 
         if platform not in ['LINKEDIN', 'TWITTER', 'FACEBOOK', 'INSTAGRAM']:
@@ -112,49 +88,57 @@ class InputPreprocessor:
 
             parsed_urls.append(parsed_url_data)
 
-        url_contents = []
-        for url in parsed_urls:
-            try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()  # Raise an exception for HTTP errors
-                soup = BeautifulSoup(response.content, 'html.parser')
-            except requests.exceptions.RequestException as e:
-                # Handle request errors, such as timeouts, DNS resolution errors, or invalid URLs
-                print(f"Error fetching URL: {url} - {e}")
-                continue
-
-            # Extract text from the webpage
-            text = soup.get_text(strip=True)
-
-            # Extract additional information, such as titles and summaries
-            title = None
-            summary = None
-
-            # Look for the title in common HTML elements
-            title_element = soup.find('title') or soup.find(
-                'h1') or soup.find('h2')
-            if title_element:
-                title = title_element.get_text(strip=True)
-
-            # Look for a summary in common HTML elements
-            summary_element = soup.find('meta', attrs={'name': 'description'}) or \
-                soup.find('meta', attrs={'property': 'og:description'})
-            if summary_element:
-                summary = summary_element['content']
-
-            url_info = {
-                'text': text,
-                'title': title,
-                'summary': summary
-            }
-
-            url_contents.append(url_info)
-
         content_length = DashboardUtils.sizeOfContent(type, length)
         return {
             'platform': platform,
             'topic': topic,
             'urls': parsed_urls,
             'length': content_length,
-            'url_contents': url_contents
-        }
\ No newline at end of file
+            'url_contents': []
+        }
+
+    def fetch_url_content(url):
+        try:
+            page = page_cache.fetch(url["url"])
+            if not page.ok:
+                raise requests.exceptions.HTTPError(f"HTTP {page.status_code}")
+        except requests.exceptions.RequestException as e:
+            # Handle request errors, such as timeouts, DNS resolution errors, or invalid URLs
+            print(f"Error fetching URL: {url['url']} - {e}")
+            return None
+
+        # Parsed once per page version
+        url_info = page_cache.extract(page, "input_preprocessor:v4", InputPreprocessor.extract_page_content)
+        url_info['text'] = url_info['text'][:Config.USER_URL_MAX_TEXT_CHARS]
+        return url_info
+
+    def extract_page_content(page):
+        # Only the main content goes on to the prompts, navigation and footers are dropped
+        extract = MainContentExtractor.extract(page.content, page.encoding)
+        return {
+            'text': extract['main_text'],
+            'title': extract['title'] or extract['heading'],
+            'summary': extract['description']
+        }
+
+    def unique_urls(parsed_urls):
+        # The same page is fetched once, however the user spelled its URL
+        unique = {}
+        for url in parsed_urls:
+            try:
+                key = normalize_url(url["url"])
+            except ValueError:
+                key = url["url"]
+            unique.setdefault(key, url)
+        return list(unique.values())[:Config.USER_URLS_MAX]
+
+    def fetch_url_contents(parsed_urls):
+        # Fetched concurrently, pages still missing after the time budget are dropped
+        urls = [url["url"] for url in InputPreprocessor.unique_urls(parsed_urls)]
+        url_infos = url_fetcher.crawl(urls, lambda url: InputPreprocessor.fetch_url_content({"url": url}))
+        return [url_info for url_info in url_infos if url_info is not None]
+
+    def preprocess_user_input_for_social_media_post(topic, urls, length, platform):
+        processed_input = InputPreprocessor.validate_social_media_post_input(topic, urls, length, platform)
+        processed_input['url_contents'] = InputPreprocessor.fetch_url_contents(processed_input['urls'])
+        return processed_input
@@ -0,0 +1,305 @@
+import json
+import time
+import hashlib
+
+import openai
+from openai.util import convert_to_openai_object
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.cache import LRUCache, SQLiteCache, read_through
+from api.utils.deadline import Deadline, DeadlineExceeded
+from api.utils.rate_limiter import rate_limiter
+from api.utils.resilience import LatencyTracker, call_with_retries, hedged_call
+from api.utils.token_budget import TokenBudget
+from api.utils.fake_llm import fake_backend, fixture_store
+
+logger = logging_wrapper.Logger(__name__)
+
+openai.api_key = Config.OPENAI_API_KEY
+if Config.OPENAI_API_BASE:
+    # e.g. the stub server from api/utils/fake_llm.py
+    openai.api_base = Config.OPENAI_API_BASE
+
+# Two tier cache: a per process LRU in front of a sqlite file shared by all workers
+memory_cache = LRUCache(max_entries=Config.LLM_CACHE_MAX_ENTRIES)
+disk_cache = SQLiteCache(Config.LLM_CACHE_PATH, table="llm_cache") if Config.LLM_CACHE_ENABLED else None
+
+# Params that never change the completion. user is left out here and scoped
+# separately in LLMGateway.user_cache_key
+NON_CACHE_KEY_PARAMS = ("user", "request_timeout", "stream")
+
+latency_tracker = LatencyTracker()
+
+
+def is_retryable_error(e):
+    if isinstance(e, (
+        openai.error.Timeout,
+        openai.error.TryAgain,
+        openai.error.RateLimitError,
+        openai.error.APIConnectionError,
+        openai.error.ServiceUnavailableError,
+    )):
+        return True
+    # Server side errors, 4xx errors will fail the same way again
+    return isinstance(e, openai.error.APIError) and (e.http_status or 500) >= 500
+
+
+def request_timeout():
+    timeout = Deadline.timeout(Config.LLM_REQUEST_TIMEOUT)
+    if timeout <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before calling OpenAI")
+    return timeout
+
+
+class LLMGateway:
+    # Every call to OpenAI goes through this class.
+    #
+    # cache_ttl controls caching per call:
+    #   None -> Config.LLM_CACHE_DEFAULT_TTL
+    #   0    -> bypass the cache (read and write)
+    #   n    -> keep the response for n seconds
+    #
+    # Cache hits carry "cached": True and a zeroed usage block, so they cost
+    # the caller no points. Cached responses are therefore only reused for
+    # the same user. shared_cache=True opts a call into sharing responses
+    # across users, for prompts that carry nothing user specific and whose
+    # cost is not charged per user.
+    def chat_completion(model, messages, user=None, cache_ttl=None, shared_cache=False, **params):
+        return LLMGateway._create(
+            openai.ChatCompletion,
+            "chat_completion",
+            cache_ttl,
+            user,
+            shared_cache,
+            model=model,
+            messages=messages,
+            **params,
+        )
+
+    def completion(model, prompt, user=None, cache_ttl=None, shared_cache=False, **params):
+        return LLMGateway._create(
+            openai.Completion,
+            "completion",
+            cache_ttl,
+            user,
+            shared_cache,
+            model=model,
+            prompt=prompt,
+            **params,
+        )
+
+    # Streams are never cached, the caller consumes the deltas as they arrive
+    def stream_chat_completion(model, messages, user=None, **params):
+        key = LLMGateway.cache_key("chat_completion", {"model": model, "messages": messages, **params})
+        if user is not None:
+            params["user"] = str(user)
+
+        estimated_tokens = LLMGateway.estimate_tokens(model=model, messages=messages, **params)
+
+        def start_stream():
+            # The concurrency slot is only held until the stream starts
+            with rate_limiter.acquire(model, estimated_tokens, user):
+                # Taken after the rate limit wait, which uses up part of the deadline
+                timeout = request_timeout()
+                if Config.LLM_BACKEND == "fake":
+                    return fake_backend.stream(key, {"model": model, "messages": messages, **params})
+
+                return openai.ChatCompletion.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    request_timeout=timeout,
+                    **params,
+                )
+
+        # Only opening the stream is retried, a stream that broke half way can not be resumed
+        chunks = call_with_retries(
+            start_stream,
+            is_retryable_error,
+            Config.LLM_MAX_RETRIES,
+            Config.LLM_RETRY_BASE_DELAY,
+            Config.LLM_RETRY_MAX_DELAY,
+        )
+        return ChatCompletionStream(model, messages, chunks, estimated_tokens)
+
+    def estimate_tokens(model=None, messages=None, prompt=None, max_tokens=None, n=1, **params):
+        # Pre-flight estimate used to reserve the tokens-per-minute budget
+        if messages is not None:
+            prompt_tokens = TokenBudget.count_message_tokens(messages, model)
+        else:
+            prompt_tokens = TokenBudget.count_tokens(prompt, model)
+
+        completion_tokens = max_tokens or Config.OPENAI_ESTIMATED_COMPLETION_TOKENS
+        return prompt_tokens + completion_tokens * (n or 1)
+
+    def cache_key(endpoint, params):
+        key_params = {
+            name: value for name, value in params.items() if name not in NON_CACHE_KEY_PARAMS
+        }
+        payload = json.dumps({"endpoint": endpoint, **key_params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def user_cache_key(key, user, shared_cache=False):
+        # Fixtures use the plain key, the response cache is per user unless shared
+        if shared_cache or user is None:
+            return key
+        return hashlib.sha256(f"{key}:{user}".encode("utf-8")).hexdigest()
+
+    def get_cached(key):
+        cached_response = read_through(memory_cache, disk_cache, key)
+        if cached_response is None:
+            return None
+
+        # No tokens were spent on a cache hit, callers charge points from usage
+        return {
+            **cached_response,
+            "cached": True,
+            "usage": {name: 0 for name in cached_response.get("usage") or {}},
+        }
+
+    def evict_cached(endpoint, user=None, shared_cache=False, **params):
+        # For callers that find a cached response unusable, arguments as passed to the call
+        key = LLMGateway.user_cache_key(LLMGateway.cache_key(endpoint, params), user, shared_cache)
+        memory_cache.delete(key)
+        if disk_cache is not None:
+            disk_cache.delete(key)
+
+    def set_cached(key, response, ttl):
+        memory_cache.set(key, response, ttl)
+        if disk_cache is not None:
+            disk_cache.set(key, response, ttl)
+
+    def _dispatch(api_resource, endpoint, key, params):
+        if Config.LLM_BACKEND == "fake":
+            return convert_to_openai_object(fake_backend.create(endpoint, key, params))
+
+        response = api_resource.create(**params)
+        if Config.LLM_RECORD_FIXTURES_PATH:
+            # Recorded responses can be replayed later with LLM_FAKE_MODE=replay
+            fixture_store.record(key, endpoint, json.loads(json.dumps(response)))
+        return response
+
+    # Each attempt is bounded by the request deadline and retried with
+    # backoff on transient errors. With LLM_HEDGE_ENABLED a second request is
+    # sent once the first one is slower than the model's recent p95.
+    def _call(api_resource, endpoint, key, params, estimated_tokens, user):
+        model = params["model"]
+
+        def attempt():
+            with rate_limiter.acquire(model, estimated_tokens, user):
+                timeout = request_timeout()
+                started_at = time.monotonic()
+                response = LLMGateway._dispatch(api_resource, endpoint, key, {**params, "request_timeout": timeout})
+            latency_tracker.record(model, time.monotonic() - started_at)
+            return response
+
+        def attempt_with_retries():
+            return call_with_retries(
+                attempt,
+                is_retryable_error,
+                Config.LLM_MAX_RETRIES,
+                Config.LLM_RETRY_BASE_DELAY,
+                Config.LLM_RETRY_MAX_DELAY,
+            )
+
+        hedge_delay = None
+        if Config.LLM_HEDGE_ENABLED:
+            hedge_delay = latency_tracker.percentile(model, Config.LLM_HEDGE_PERCENTILE)
+
+        if hedge_delay is None:
+            return attempt_with_retries()
+        return hedged_call(attempt_with_retries, hedge_delay)
+
+    def _create(api_resource, endpoint, cache_ttl, user, shared_cache, **params):
+        if cache_ttl is None:
+            cache_ttl = Config.LLM_CACHE_DEFAULT_TTL
+
+        use_cache = Config.LLM_CACHE_ENABLED and cache_ttl > 0
+        key = LLMGateway.cache_key(endpoint, params)
+        response_key = LLMGateway.user_cache_key(key, user, shared_cache)
+
+        if use_cache:
+            cached_response = LLMGateway.get_cached(response_key)
+            if cached_response is not None:
+                logger.debug("LLM cache hit", metadata={"endpoint": endpoint, "model": params.get("model")})
+                return convert_to_openai_object(cached_response)
+
+        if user is not None:
+            params["user"] = str(user)
+
+        model = params["model"]
+        estimated_tokens = LLMGateway.estimate_tokens(**params)
+        response = LLMGateway._call(api_resource, endpoint, key, params, estimated_tokens, user)
+
+        usage = response.get("usage") or {}
+        if "total_tokens" in usage:
+            rate_limiter.record_usage(model, estimated_tokens, usage["total_tokens"])
+
+        if use_cache:
+            # Round trip through JSON so that both tiers store plain dicts
+            LLMGateway.set_cached(response_key, json.loads(json.dumps(response)), cache_ttl)
+
+        return response
+
+
+class ChatCompletionStream:
+    # Iterates over the text deltas of a streamed chat completion and keeps
+    # enough state to rebuild a regular (non streamed) response at the end.
+    def __init__(self, model, messages, chunks, estimated_tokens):
+        self.model = model
+        self.messages = messages
+        self.chunks = chunks
+        self.estimated_tokens = estimated_tokens
+        self.parts = []
+        self.finish_reason = None
+
+    def __iter__(self):
+        try:
+            for chunk in self.chunks:
+                choice = chunk["choices"][0]
+                delta = choice.get("delta", {}).get("content")
+
+                if delta:
+                    self.parts.append(delta)
+                    yield delta
+
+                if choice.get("finish_reason") is not None:
+                    self.finish_reason = choice["finish_reason"]
+        finally:
+            # Streams carry no usage block, the reservation is corrected from our own count,
+            # also when the stream broke or the client went away half way
+            rate_limiter.record_usage(
+                self.model,
+                self.estimated_tokens,
+                self.estimate_prompt_tokens() + self.count_completion_tokens(),
+            )
+
+    @property
+    def content(self):
+        return "".join(self.parts)
+
+    def estimate_prompt_tokens(self):
+        # Streamed responses carry no usage block
+        return TokenBudget.count_message_tokens(self.messages, self.model)
+
+    def count_completion_tokens(self):
+        # A chunk may hold more than one token, so the joined text is counted
+        return TokenBudget.count_tokens(self.content, self.model)
+
+    def to_response(self):
+        prompt_tokens = self.estimate_prompt_tokens()
+        completion_tokens = self.count_completion_tokens()
+        return {
+            "model": self.model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.content},
+                "finish_reason": self.finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
@@ -3,7 +3,7 @@ from logging.config import dictConfig
 import json
 import os
 
-from flask import request
+from flask import has_request_context, request
 
 
 with open("logging_config.json", "r") as file:
@@ -16,6 +16,10 @@ class ContextualFilter(logging.Filter):
         log_record.method = ""
         log_record.ip = ""
 
+        # Worker threads log without a request context
+        if not has_request_context():
+            return True
+
         if hasattr(request, "path"):
             log_record.url = request.path
         if hasattr(request, "method"):
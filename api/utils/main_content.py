@@ -0,0 +1,209 @@
+import re
+
+from config import Config
+from api.utils.html_extractor import SinglePassParser, clean, decode_html, empty_extract
+
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "li", "main", "ol", "p", "pre", "section", "table",
+    "td", "th", "tr", "ul",
+}
+# Text inside these never belongs to the article
+BOILERPLATE_TAGS = {"aside", "button", "footer", "form", "header", "iframe", "nav", "select", "svg"}
+BOILERPLATE_ROLES = {"banner", "complementary", "contentinfo", "dialog", "navigation", "search"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+NEGATIVE_HINTS = re.compile(
+    r"\bad-|\bads?\b|advert|banner|breadcrumb|comment|consent|cookie|footer|header|menu|modal|nav|"
+    r"newsletter|popup|promo|related|share|sidebar|social|sponsor|subscribe|widget",
+    re.I,
+)
+POSITIVE_HINTS = re.compile(r"article|blog|body|content|entry|main|post|story|text", re.I)
+
+TAG_SCORES = {
+    "article": 10, "main": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "ol": -3, "ul": -3, "li": -3, "dl": -3, "dd": -3, "dt": -3, "th": -5,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5,
+}
+
+MIN_PARAGRAPH_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+
+
+class Block:
+    __slots__ = ("tag", "parent", "boilerplate", "weight", "parts", "link_chars", "score")
+
+    def __init__(self, tag, parent, boilerplate, weight):
+        self.tag = tag
+        self.parent = parent
+        self.boilerplate = boilerplate
+        self.weight = weight
+        self.parts = []
+        self.link_chars = 0
+        self.score = 0.0
+
+
+class MainContentParser(SinglePassParser):
+    # Readability style main content detection on top of the single pass
+    # parser. Block elements are recorded with their own text and link text.
+    # Paragraph like blocks score their parent and grandparent by length and
+    # commas, class/id hints and link density adjust the scores, and the text
+    # of the best container (plus strong siblings) is the main content.
+    def __init__(self):
+        super().__init__()
+        self.blocks = []
+        self.stack = []
+        self.link_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        if self.skip_depth:
+            return
+
+        if tag == "a":
+            self.link_depth += 1
+            return
+        if tag not in BLOCK_TAGS and tag not in BOILERPLATE_TAGS:
+            return
+
+        # <p> can not contain blocks, an open one ends here
+        if self.stack and self.blocks[self.stack[-1]].tag == "p":
+            self.stack.pop()
+
+        attributes = dict(attrs)
+        hints = f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+        negative = bool(NEGATIVE_HINTS.search(hints))
+        positive = bool(POSITIVE_HINTS.search(hints))
+
+        parent = self.stack[-1] if self.stack else None
+        boilerplate = (
+            (parent is not None and self.blocks[parent].boilerplate)
+            or tag in BOILERPLATE_TAGS
+            or attributes.get("role") in BOILERPLATE_ROLES
+            or (negative and not positive)
+        )
+        weight = TAG_SCORES.get(tag, 0) + (25 if positive else 0) - (25 if negative else 0)
+
+        self.blocks.append(Block(tag, parent, boilerplate, weight))
+        self.stack.append(len(self.blocks) - 1)
+
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        if tag == "a":
+            self.link_depth = max(0, self.link_depth - 1)
+            return
+        if tag not in BLOCK_TAGS and tag not in BOILERPLATE_TAGS:
+            return
+
+        # Close up to the matching block, stray end tags are ignored
+        for position in range(len(self.stack) - 1, -1, -1):
+            if self.blocks[self.stack[position]].tag == tag:
+                del self.stack[position:]
+                break
+
+    def handle_data(self, data):
+        super().handle_data(data)
+        if self.skip_depth or not self.stack or self.title_parts is not None:
+            return
+
+        block = self.blocks[self.stack[-1]]
+        block.parts.append(data)
+        if self.link_depth:
+            block.link_chars += len(data.strip())
+
+    def main_text(self):
+        texts = [clean("".join(block.parts)) for block in self.blocks]
+
+        # Total and link text of every subtree, children always come after their parent
+        total_chars = [len(text) for text in texts]
+        link_chars = [block.link_chars for block in self.blocks]
+        for index in range(len(self.blocks) - 1, -1, -1):
+            parent = self.blocks[index].parent
+            if parent is not None:
+                total_chars[parent] += total_chars[index]
+                link_chars[parent] += link_chars[index]
+
+        def link_density(index):
+            return link_chars[index] / total_chars[index] if total_chars[index] else 0.0
+
+        def readable(index):
+            # Judged on the block's own text, link lists are navigation
+            block = self.blocks[index]
+            if block.boilerplate or not texts[index]:
+                return False
+            return block.link_chars / len(texts[index]) <= MAX_LINK_DENSITY
+
+        # Every readable paragraph, for pages without a clear article
+        fallback = [
+            texts[index] for index in range(len(self.blocks))
+            if len(texts[index]) >= MIN_PARAGRAPH_CHARS and readable(index)
+        ]
+
+        candidates = set()
+        for index, block in enumerate(self.blocks):
+            if len(texts[index]) < MIN_PARAGRAPH_CHARS or not readable(index):
+                continue
+
+            content_score = 1 + texts[index].count(",") + min(len(texts[index]) // 100, 3)
+            ancestors = []
+            if block.parent is not None:
+                ancestors.append((block.parent, 1.0))
+                if self.blocks[block.parent].parent is not None:
+                    ancestors.append((self.blocks[block.parent].parent, 0.5))
+
+            for ancestor, share in ancestors:
+                if self.blocks[ancestor].boilerplate:
+                    continue
+                if ancestor not in candidates:
+                    candidates.add(ancestor)
+                    self.blocks[ancestor].score = self.blocks[ancestor].weight
+                self.blocks[ancestor].score += content_score * share
+
+        if not candidates:
+            return "", fallback
+
+        for index in candidates:
+            self.blocks[index].score *= 1 - link_density(index)
+        top = max(candidates, key=lambda index: self.blocks[index].score)
+        top_score = self.blocks[top].score
+
+        # Siblings that score close to the top container belong to the article too
+        selected = {top}
+        top_parent = self.blocks[top].parent
+        for index in candidates:
+            block = self.blocks[index]
+            if block.parent == top_parent and block.score >= max(10, top_score * 0.2):
+                selected.add(index)
+
+        in_article = [False] * len(self.blocks)
+        parts = []
+        for index, block in enumerate(self.blocks):
+            in_article[index] = index in selected or (block.parent is not None and in_article[block.parent])
+            if not in_article[index] or not readable(index):
+                continue
+            if len(texts[index]) >= 10 or block.tag in HEADING_TAGS:
+                parts.append(texts[index])
+
+        return " ".join(parts), fallback
+
+    def result(self):
+        extract = super().result()
+        main_text, fallback = self.main_text()
+        if len(main_text) < Config.MAIN_CONTENT_MIN_CHARS:
+            main_text = " ".join(fallback) or main_text
+
+        extract["main_text"] = main_text or extract["text"]
+        return extract
+
+
+class MainContentExtractor:
+    def extract(html, encoding=None):
+        # Same fields as HTMLExtractor.extract plus "main_text", the article body without boilerplate
+        if isinstance(html, bytes):
+            html = decode_html(html[:Config.HTML_MAX_BYTES], encoding)
+        if not html:
+            return {**empty_extract(), "main_text": ""}
+
+        parser = MainContentParser()
+        parser.feed(html)
+        return parser.result()
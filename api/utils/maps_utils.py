@@ -1,4 +1,5 @@
-import openai
+from api.utils.llm_gateway import LLMGateway
+from api.utils.deadline import Deadline, DeadlineExceeded
 import yake
 from googleplaces import GooglePlaces
 from api.models.analysis import Analysis
@@ -7,10 +8,12 @@ from api.models.search_query import SearchQuery
 from config import Config
 from api.utils import logging_wrapper
 
-import requests
-from bs4 import BeautifulSoup
-import spacy
+from api.utils.page_cache import page_cache
+from api.utils.http_client import http_session
+from api.utils.cache import SQLiteCache
+from api.utils.html_extractor import HTMLExtractor
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from sklearn.cluster import KMeans
@@ -18,7 +21,15 @@ from api.assets import constants
 
 
 logger = logging_wrapper.Logger(__name__)
-nlp = spacy.load("en_core_web_sm")
+
+PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACE_DETAILS_FIELDS = "name,formatted_address,geometry/location,rating,website"
+
+places_executor = ThreadPoolExecutor(max_workers=Config.PLACES_MAX_WORKERS, thread_name_prefix="places")
+
+# Shared by every worker, repeat searches in the same area skip the detail calls
+place_details_cache = SQLiteCache(Config.PLACES_DETAILS_CACHE_PATH, table="place_details") if Config.PLACES_DETAILS_CACHE_ENABLED else None
+
 
 class AssistantHubMapsAlgo:
     def get_data(project_id):
@@ -108,7 +119,7 @@ class AssistantHubMapsAlgo:
                 "content": f"User Input\n```\nBusiness type: {business_type}\nTarget audience: {target_audience}\nIndustry: {industry}\nLocation: {location}\n```"
             }
 
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL_GPT4,
                 messages=[system_prompt, user_prompt],
                 temperature=0.7,
@@ -122,6 +133,8 @@ class AssistantHubMapsAlgo:
             search_queries = assistant_response["choices"][0]["message"]["content"].strip().split("\n")
             total_tokens = assistant_response['usage']['total_tokens']
             return search_queries, total_tokens
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.exception(str(e))
             return None, 0
@@ -133,38 +146,72 @@ class AssistantHubMapsAlgo:
         google_places = GooglePlaces(Config.GOOGLE_SEARCH_API_KEY_FOR_PLACES)
         query_result = google_places.text_search(query=query)
 
+        place_ids = [place.place_id for place in query_result.places]
+        places_details = places_executor.map(Deadline.propagate(AssistantHubMapsAlgo.fetch_place_details), place_ids)
+
         places_data = []
-        for place in query_result.places:
-            place.get_details()
+        for place_id, details in zip(place_ids, places_details):
+            if details is None:
+                continue
+
+            location = details["geometry"]["location"]
             place_dict = {
-                "name": place.name,
-                "address": place.formatted_address,
-                "google_maps_url": f"https://maps.google.com/?q={place.geo_location['lat']},{place.geo_location['lng']}",
-                "latitude": place.geo_location["lat"],
-                "longitude": place.geo_location["lng"]
+                "name": details.get("name"),
+                "address": details.get("formatted_address"),
+                "google_maps_url": f"https://maps.google.com/?q={location['lat']},{location['lng']}",
+                "latitude": location["lat"],
+                "longitude": location["lng"]
             }
-            if hasattr(place, 'website'):
-                place_dict["website"] = place.website
-            if hasattr(place, 'rating'):
-                place_dict["rating"] = place.rating
+            if details.get("website"):
+                place_dict["website"] = details["website"]
+            if details.get("rating") is not None:
+                place_dict["rating"] = details["rating"]
             places_data.append(place_dict)
 
         return places_data
 
+    # Place Details bills per field group, only the fields used above are requested
+    def fetch_place_details(place_id):
+        details = place_details_cache.get(place_id) if place_details_cache is not None else None
+        if details is not None:
+            return details
+
+        try:
+            response = http_session.get(PLACE_DETAILS_URL, params={
+                "place_id": place_id,
+                "fields": PLACE_DETAILS_FIELDS,
+                "key": Config.GOOGLE_SEARCH_API_KEY_FOR_PLACES,
+            })
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logger.error("Place details request failed", metadata={"place_id": place_id, "error": str(e)})
+            return None
+
+        if data.get("status") != "OK":
+            logger.error("Place details request failed", metadata={"place_id": place_id, "status": data.get("status")})
+            return None
+
+        details = data["result"]
+        if place_details_cache is not None:
+            place_details_cache.set(place_id, details, ttl=Config.PLACES_DETAILS_CACHE_TTL)
+        return details
+
     def fetch_website_data(url):
-        response = requests.get(url)
+        page = page_cache.fetch(url)
 
         # Return None if the status code indicates scraping is not allowed
-        if response.status_code == 403:
+        if page.status_code == 403:
             return None
 
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        title = soup.title.string if soup.title else ""
-        snippets = [snippet.text for snippet in soup.find_all("p")]
-        urls = [link.get("href") for link in soup.find_all("a")]
+        # Parsed once per page version
+        title, snippets, urls = page_cache.extract(page, "maps:v3", AssistantHubMapsAlgo.extract_website_data)
         return title, snippets, urls
 
+    def extract_website_data(page):
+        extract = HTMLExtractor.extract(page.content, encoding=page.encoding)
+        return extract["title"] or "", extract["paragraphs"], extract["links"]
+
     def process_text(text, place, num_keywords=10):
         # Initialize YAKE
         language = "en"
@@ -0,0 +1,130 @@
+import gc
+import time
+import threading
+
+import psutil
+
+from config import Config
+from api.utils import logging_wrapper
+
+logger = logging_wrapper.Logger(__name__)
+
+
+def rss_bytes():
+    return psutil.Process().memory_info().rss
+
+
+class ModelRegistry:
+    # Heavy NLP models shared by the whole process.
+    #
+    # A model is loaded on first use, once, whichever module asks for it, and
+    # the import of its library happens in the loader so importing a module
+    # that may use a model stays cheap. Names listed in MODEL_PRELOAD are
+    # loaded when app.py is imported: with gunicorn --preload that happens in
+    # the master, and the forked workers share the model pages copy-on-write.
+    # Load time and the RSS growth of every load are kept for stats().
+    def __init__(self):
+        self.loaders = {}
+        self.models = {}
+        self.load_stats = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self.loaders[name] = loader
+
+    def model_lock(self, name):
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        model = self.models.get(name)
+        if model is not None:
+            return model
+
+        # Concurrent first requests wait for a single load
+        with self.model_lock(name):
+            model = self.models.get(name)
+            if model is None:
+                model = self.load(name)
+        return model
+
+    def load(self, name):
+        if name not in self.loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        rss_before = rss_bytes()
+        started = time.perf_counter()
+        model = self.loaders[name]()
+        load_seconds = time.perf_counter() - started
+        rss_delta = rss_bytes() - rss_before
+
+        self.models[name] = model
+        self.load_stats[name] = {
+            "load_seconds": round(load_seconds, 3),
+            "rss_delta_mb": round(rss_delta / 1024 / 1024, 1),
+        }
+        logger.info("Loaded model", metadata={"model": name, **self.load_stats[name]})
+        return model
+
+    def preload(self, names):
+        for name in names:
+            self.get(name)
+
+        if names:
+            # Keeps the collector from touching (and so copying) the preloaded objects after fork
+            gc.freeze()
+
+    def stats(self):
+        return {
+            "rss_mb": round(rss_bytes() / 1024 / 1024, 1),
+            "models": {
+                name: {"loaded": name in self.models, **self.load_stats.get(name, {})}
+                for name in self.loaders
+            },
+        }
+
+
+def load_spacy_small():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+def load_sentence_encoder():
+    import tensorflow_hub as hub
+    return hub.load(Config.SENTENCE_ENCODER_URL)
+
+
+def load_language_tool():
+    import language_tool_python
+    return language_tool_python.LanguageTool("en-US")
+
+
+def load_topic_classifier():
+    from transformers import BartForSequenceClassification, BartTokenizer, pipeline
+    model_name = "facebook/bart-large-mnli"
+    return pipeline(
+        "zero-shot-classification",
+        model=BartForSequenceClassification.from_pretrained(model_name),
+        tokenizer=BartTokenizer.from_pretrained(model_name),
+    )
+
+
+def load_tweet_sentiment():
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    model_name = "cardiffnlp/twitter-roberta-base-sentiment"
+    return AutoTokenizer.from_pretrained(model_name), AutoModelForSequenceClassification.from_pretrained(model_name)
+
+
+def load_language_identifier():
+    import fasttext
+    return fasttext.load_model(Config.FASTTEXT_LANGUAGE_MODEL_PATH)
+
+
+models = ModelRegistry()
+models.register("en_core_web_sm", load_spacy_small)
+models.register("sentence_encoder", load_sentence_encoder)
+models.register("language_tool", load_language_tool)
+models.register("topic_classifier", load_topic_classifier)
+models.register("tweet_sentiment", load_tweet_sentiment)
+models.register("language_identifier", load_language_identifier)
@@ -1,14 +1,11 @@
 import re
 import json
-import requests
 from flask import current_app
 import concurrent.futures
 
-import nltk
-import openai
+from api.utils.llm_gateway import LLMGateway
+from api.utils.deadline import DeadlineExceeded
 
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from gensim.models import TfidfModel, LdaModel
 from gensim.corpora import Dictionary
 from gensim.matutils import corpus2dense
@@ -24,6 +21,8 @@ from api.models.search_query import SearchQuery
 from api.assets import constants
 from api.utils import logging_wrapper
 from api.utils.db import add_commit_
+from api.utils.search_cache import search_cache, NEWS
+from api.utils.text_preprocessing import TextPreprocessor
 from config import Config
 
 logger = logging_wrapper.Logger(__name__)
@@ -83,21 +82,12 @@ class AssistantHubNewsAlgo:
 
         return cleaned_title
 
-    # Preprocessing function
-    def preprocess(text):
-        text = re.sub(r'<[^>]+>', '', text)  # Remove HTML tags
-        text = re.sub(r'\s+', ' ', text)  # Remove extra spaces
-        text = text.lower()  # Convert text to lowercase
-        tokens = nltk.word_tokenize(text)  # Tokenize words
-        lemmatizer = WordNetLemmatizer()
-        tokens = [lemmatizer.lemmatize(token) for token in tokens if token.isalnum() and token not in stopwords.words('english')]
-        return tokens
-
     # Build a dictionary and a corpus for the articles
     def keywords_titles_builder(news_data):
         # Preprocess the articles
         articles = [article["snippet"] for article in news_data]
-        preprocessed_articles = [AssistantHubNewsAlgo.preprocess(article) for article in articles]
+        # Tokenized once, shared by TF-IDF, LDA and the cluster keyword counts
+        preprocessed_articles = TextPreprocessor.tokens_batch(articles)
 
         # Build a dictionary and a corpus for the articles
         dictionary = Dictionary(preprocessed_articles)
@@ -139,46 +129,14 @@ class AssistantHubNewsAlgo:
         # Analyzing trends and events
         trending_topics = []
         for cluster in range(5):
-            cluster_articles = [article for article, c in zip(articles, clusters) if c == cluster]
             cluster_keywords = Counter()
-            for article in cluster_articles:
-                article_keywords = AssistantHubNewsAlgo.preprocess(article)
-                cluster_keywords.update(article_keywords)
+            for article_keywords, c in zip(preprocessed_articles, clusters):
+                if c == cluster:
+                    cluster_keywords.update(article_keywords)
             trending_topics.append(cluster_keywords.most_common(5))
 
         return trending_topics
 
-    # Generating content titles
-    def generate_title(keywords, user_id, app):
-        with app.app_context():
-            # Join the top keywords with a comma
-            keywords_str = ", ".join([keyword[0] for keyword in keywords])
-
-            system_prompt = {
-                "role": "system",
-                "content": "You are an AI assistant trained to generate relevant and engaging article titles based on a set of keywords. Generate a title using the following keywords."
-            }
-
-            user_prompt = {
-                "role": "user",
-                "content": f"Keywords: {keywords_str}"
-            }
-
-            assistant_response = openai.ChatCompletion.create(
-                model=Config.OPENAI_MODEL_GPT4,
-                messages=[system_prompt, user_prompt],
-                temperature=0.7,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0,
-                user=str(user_id),
-            )
-
-            # Extract and format the title
-            title = assistant_response["choices"][0]["message"]["content"].strip()
-            total_tokens = assistant_response['usage']['total_tokens']
-            return title, total_tokens
-
     # Fetch News search text
     def generate_news_search_text_gpt4(user, business_type, target_audience, industry, location):
         try:
@@ -192,7 +150,7 @@ class AssistantHubNewsAlgo:
                 "content": f"User Input\n```\nBusiness type: {business_type}\nTarget audience: {target_audience}\nIndustry: {industry}\nLocation: {location}\n```"
             }
 
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL_GPT4,
                 messages=[system_prompt, user_prompt],
                 temperature=0.7,
@@ -205,6 +163,8 @@ class AssistantHubNewsAlgo:
             # Extract and format search queries as an array
             search_queries = assistant_response["choices"][0]["message"]["content"].strip().split("\n")
             return search_queries
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.exception(str(e))
             return None
@@ -215,7 +175,8 @@ class AssistantHubNewsAlgo:
     def fetch_google_news(query_arr, project_id, country_code, num_results=5):
         total_points = 0.0
         news_articles = []
-        base_url = 'https://www.googleapis.com/customsearch/v1'
+        # Only searches that reached Google cost points
+        upstream_calls = []
 
         search_models = SearchQuery.query.filter(
             SearchQuery.seo_project_id == project_id,
@@ -240,8 +201,6 @@ class AssistantHubNewsAlgo:
                 search_model = existing_search_models[query]
                 params = {
                     'q': f"{query} AND when:7d",  # Fetch articles from the past 7 days
-                    'cx': Config.CUSTOM_SEARCH_ENGINE_ID,
-                    'key': Config.GOOGLE_SEARCH_API_KEY,
                     'num': num_results,
                     'sort': 'date',  # Sort results by recency
                     'lr': 'lang_en',  # Fetch articles in English
@@ -249,11 +208,12 @@ class AssistantHubNewsAlgo:
                     'gl': country_code,
                 }
 
-                response = requests.get(base_url, params=params)
-                fetched_news_articles = []
+                results, cached = search_cache.search(NEWS, params)
+                if not cached:
+                    upstream_calls.append(query)
 
-                if response.status_code == 200:
-                    results = response.json()
+                fetched_news_articles = []
+                if results is not None:
                     news_article_items = results.get('items', [])
 
                     existing_news_articles = Analysis.query.filter(
@@ -301,8 +261,6 @@ class AssistantHubNewsAlgo:
                             )
                             add_commit_(search_news_rel_model)
                 else:
-                    logger.exception(f"Error: {response.status_code}")
-                    print(f"Error: {response.status_code}")
                     return None
 
                 return fetched_news_articles
@@ -314,6 +272,6 @@ class AssistantHubNewsAlgo:
                 if result is not None:
                     news_articles.extend(result)
         
-        total_points = total_points + (len(query_arr) * 0.0005)
+        total_points = total_points + (len(upstream_calls) * 0.0005)
         
         return news_articles, total_points
\ No newline at end of file
@@ -0,0 +1,150 @@
+import time
+import hashlib
+import threading
+
+from flask import current_app
+from sklearn.pipeline import make_pipeline
+from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.cache import LRUCache
+from api.models import db
+from api.utils.semantic_cache import normalize_topic
+from api.models.topic_classification import TopicClassification
+
+logger = logging_wrapper.Logger(__name__)
+
+LLM_SOURCE = "llm"
+
+
+def topic_hash(topic):
+    return hashlib.sha256(normalize_topic(topic).encode("utf-8")).hexdigest()
+
+
+class OpinionClassifier:
+    # Local yes/no opinion classifier trained from earlier LLM decisions.
+    #
+    # LLM decisions are memoized by topic hash, in memory and in the
+    # topic_classification table. Local predictions are never memoized, so a
+    # wrong guess is redone by the next model or escalated to the LLM. The
+    # model is retrained from the LLM labelled rows every
+    # OPINION_CLASSIFIER_RETRAIN_SECONDS and is only trusted when its
+    # probability clears OPINION_CLASSIFIER_CONFIDENCE. Training runs in a
+    # background thread, one at a time, and requests keep using the previous
+    # model until the new one is swapped in.
+    def __init__(self):
+        self.model = None
+        self.trained_on = 0
+        self.trained_at = 0.0
+        self.training = False
+        self.memo = LRUCache(max_entries=Config.OPINION_CLASSIFIER_MEMO_SIZE)
+        self._lock = threading.Lock()
+
+    def remembered(self, key):
+        is_opinion = self.memo.get(key)
+        if is_opinion is not None:
+            return is_opinion
+
+        # Older rows from the local model are skipped
+        classification = TopicClassification.query.filter(
+            TopicClassification.topic_hash == key,
+            TopicClassification.source == LLM_SOURCE,
+        ).order_by(TopicClassification.id.desc()).first()
+        if classification is None:
+            return None
+
+        self.memo.set(key, classification.is_opinion)
+        return classification.is_opinion
+
+    def remember(self, key, topic, is_opinion, source, confidence=None):
+        self.memo.set(key, is_opinion)
+
+        # A session of its own, so neither the commit nor a rollback touches the request's work
+        session = db.session.session_factory()
+        try:
+            session.add(TopicClassification(
+                topic_hash=key,
+                topic=topic,
+                is_opinion=is_opinion,
+                source=source,
+                confidence=confidence,
+            ))
+            session.commit()
+        except Exception as e:
+            # Losing a memo entry is fine
+            session.rollback()
+            logger.exception(str(e))
+        finally:
+            session.close()
+
+    def train(self):
+        rows = (
+            TopicClassification.query
+            .with_entities(TopicClassification.topic, TopicClassification.is_opinion)
+            .filter(TopicClassification.source == LLM_SOURCE)
+            .order_by(TopicClassification.id.desc())
+            .limit(Config.OPINION_CLASSIFIER_MAX_SAMPLES)
+            .all()
+        )
+
+        labels = [row.is_opinion for row in rows]
+        if len(rows) < Config.OPINION_CLASSIFIER_MIN_SAMPLES or len(set(labels)) < 2:
+            return None
+
+        model = make_pipeline(
+            TfidfVectorizer(preprocessor=normalize_topic, ngram_range=(1, 2), sublinear_tf=True),
+            LogisticRegression(class_weight="balanced", max_iter=1000),
+        )
+        model.fit([row.topic for row in rows], labels)
+
+        logger.info("Trained opinion classifier", metadata={"samples": len(rows)})
+        self.trained_on = len(rows)
+        return model
+
+    def retrain(self, app):
+        try:
+            with app.app_context():
+                model = self.train()
+            if model is not None:
+                self.model = model
+        except Exception as e:
+            logger.exception(str(e))
+        finally:
+            self.training = False
+
+    def local_model(self):
+        with self._lock:
+            due = (
+                not self.training
+                and time.monotonic() - self.trained_at >= Config.OPINION_CLASSIFIER_RETRAIN_SECONDS
+            )
+            if due:
+                self.trained_at = time.monotonic()
+                self.training = True
+
+        if due:
+            try:
+                threading.Thread(
+                    target=self.retrain,
+                    args=(current_app._get_current_object(),),
+                    daemon=True,
+                ).start()
+            except Exception as e:
+                self.training = False
+                logger.exception(str(e))
+        return self.model
+
+    def predict(self, topic):
+        # Returns (is_opinion, confidence) or (None, None) without a trained model
+        model = self.local_model()
+        if model is None:
+            return None, None
+
+        probabilities = dict(zip(model.classes_, model.predict_proba([topic])[0]))
+        opinion_probability = probabilities.get(True, 0.0)
+        return opinion_probability >= 0.5, max(opinion_probability, 1 - opinion_probability)
+
+
+opinion_classifier = OpinionClassifier()
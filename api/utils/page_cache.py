@@ -0,0 +1,300 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.http_client import header_charset, http_session, read_capped
+from api.utils.crawl_governor import crawl_governor
+from api.utils.html_extractor import decode_html
+
+logger = logging_wrapper.Logger(__name__)
+
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|mc_cid|mc_eid)$')
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Seconds between accessed_at updates of a page that keeps being served from cache
+TOUCH_INTERVAL = 60 * 60
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(name)
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class CachedPage:
+    def __init__(self, url, status_code, content, encoding, etag=None, last_modified=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.from_cache = from_cache
+        self.body_hash = hashlib.sha256(content).hexdigest()
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return decode_html(self.content, self.encoding)
+
+
+class PageCache:
+    # Disk backed HTTP cache for scraped pages, shared by every worker on the host.
+    #
+    # Bodies are stored zlib compressed and keyed by the normalized URL. Stale
+    # entries are revalidated with If-None-Match / If-Modified-Since, so an
+    # unchanged page costs a 304 instead of a full download. Parsed
+    # extractions are cached per body hash, so unchanged pages are not parsed
+    # again. The least recently used pages are evicted above max_bytes.
+    def __init__(self, db_path, max_bytes, max_entry_bytes, default_ttl):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.default_ttl = default_ttl
+        self.writes_since_eviction = 0
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        connection.executescript(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, status INTEGER NOT NULL, body BLOB NOT NULL, encoding TEXT, "
+            "etag TEXT, last_modified TEXT, body_hash TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);"
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "url TEXT NOT NULL, extractor TEXT NOT NULL, body_hash TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (url, extractor));"
+        )
+        connection.commit()
+
+    def _connection(self):
+        # sqlite connections cannot be shared across threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def freshness(self, response):
+        # Seconds the page may be served without asking the host, None when it must not be stored
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        if "no-store" in cache_control:
+            return None
+        if "no-cache" in cache_control:
+            # Stored, but revalidated on every use
+            return 0
+
+        max_age = re.search(r'max-age=(\d+)', cache_control)
+        if max_age:
+            return int(max_age.group(1))
+
+        expires = response.headers.get("Expires")
+        if expires:
+            try:
+                return max(0, parsedate_to_datetime(expires).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+        return self.default_ttl
+
+    def lookup(self, key):
+        try:
+            row = self._connection().execute(
+                "SELECT status, body, encoding, etag, last_modified, expires_at, accessed_at FROM pages WHERE url = ?",
+                (key,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+            return None, None, None
+
+        if row is None:
+            return None, None, None
+
+        status, body, encoding, etag, last_modified, expires_at, accessed_at = row
+        page = CachedPage(key, status, zlib.decompress(body), encoding, etag, last_modified, from_cache=True)
+        return page, expires_at, accessed_at
+
+    def store(self, page, ttl):
+        body = zlib.compress(page.content)
+        if len(body) > self.max_entry_bytes:
+            return
+
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, status, body, encoding, etag, last_modified, body_hash, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (page.url, page.status_code, body, page.encoding, page.etag, page.last_modified,
+                 page.body_hash, len(body), now + ttl, now),
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+            return
+
+        self.writes_since_eviction += 1
+        if self.writes_since_eviction >= 50:
+            self.writes_since_eviction = 0
+            self.evict()
+
+    def touch(self, key, ttl=None):
+        now = time.time()
+        try:
+            connection = self._connection()
+            if ttl is None:
+                connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, key))
+            else:
+                connection.execute(
+                    "UPDATE pages SET accessed_at = ?, expires_at = ? WHERE url = ?", (now, now + ttl, key)
+                )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+
+    def evict(self):
+        # Drop least recently used pages until the cache is back under 90% of max_bytes
+        try:
+            connection = self._connection()
+            total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total_size <= self.max_bytes:
+                return
+
+            excess = total_size - int(self.max_bytes * 0.9)
+            rows = connection.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+            urls = []
+            for url, size in rows:
+                if excess <= 0:
+                    break
+                urls.append((url,))
+                excess -= size
+
+            connection.executemany("DELETE FROM pages WHERE url = ?", urls)
+            connection.executemany("DELETE FROM extractions WHERE url = ?", urls)
+            connection.commit()
+            logger.info("Evicted pages from page cache", metadata={"pages": len(urls)})
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+
+    def fetch(self, url, **kwargs):
+        key = normalize_url(url)
+        cached_page, expires_at, accessed_at = self.lookup(key)
+
+        now = time.time()
+        if cached_page is not None and expires_at > now:
+            # Eviction only needs a rough recency, most hits skip the write
+            if now - accessed_at > TOUCH_INTERVAL:
+                self.touch(key)
+            return cached_page
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached_page is not None:
+            if cached_page.etag:
+                headers["If-None-Match"] = cached_page.etag
+            if cached_page.last_modified:
+                headers["If-Modified-Since"] = cached_page.last_modified
+
+        # Cached pages are served without asking the host again
+        if crawl_governor is not None:
+            crawl_governor.acquire(url)
+
+        response = http_session.get(url, headers=headers, stream=True, **kwargs)
+
+        if response.status_code == 304 and cached_page is not None:
+            response.close()
+            self.touch(key, self.freshness(response) or 0)
+            return cached_page
+
+        page = CachedPage(
+            key,
+            response.status_code,
+            read_capped(response, Config.HTML_MAX_BYTES),
+            header_charset(response),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+
+        # Pages that must be revalidated are still worth keeping when they carry a validator
+        ttl = self.freshness(response)
+        if response.status_code == 200 and ttl is not None and (ttl > 0 or page.etag or page.last_modified):
+            self.store(page, ttl)
+
+        return page
+
+    def extract(self, page, extractor, f):
+        # f(page) must return a JSON serialisable value
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM extractions WHERE url = ? AND extractor = ? AND body_hash = ?",
+                (page.url, extractor, page.body_hash),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.exception(str(e))
+            row = None
+
+        if row is not None:
+            return json.loads(row[0])
+
+        value = f(page)
+        if page.status_code == 200:
+            try:
+                connection = self._connection()
+                connection.execute(
+                    "INSERT OR REPLACE INTO extractions (url, extractor, body_hash, value) VALUES (?, ?, ?, ?)",
+                    (page.url, extractor, page.body_hash, json.dumps(value)),
+                )
+                connection.commit()
+            except sqlite3.Error as e:
+                logger.exception(str(e))
+
+        return value
+
+
+class UncachedPages:
+    # Same interface as PageCache for PAGE_CACHE_ENABLED=false
+    def fetch(self, url, **kwargs):
+        if crawl_governor is not None:
+            crawl_governor.acquire(url)
+
+        response = http_session.get(url, stream=True, **kwargs)
+        content = read_capped(response, Config.HTML_MAX_BYTES)
+        return CachedPage(url, response.status_code, content, header_charset(response))
+
+    def extract(self, page, extractor, f):
+        return f(page)
+
+
+if Config.PAGE_CACHE_ENABLED:
+    page_cache = PageCache(
+        Config.PAGE_CACHE_PATH,
+        max_bytes=Config.PAGE_CACHE_MAX_BYTES,
+        max_entry_bytes=Config.PAGE_CACHE_MAX_ENTRY_BYTES,
+        default_ttl=Config.PAGE_CACHE_DEFAULT_TTL,
+    )
+else:
+    page_cache = UncachedPages()
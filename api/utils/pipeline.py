@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.deadline import Deadline, DeadlineExceeded
+
+logger = logging_wrapper.Logger(__name__)
+
+pipeline_executor = ThreadPoolExecutor(max_workers=Config.PIPELINE_MAX_WORKERS, thread_name_prefix="pipeline")
+
+
+class Pipeline:
+    # Small DAG runner for request handlers.
+    #
+    # A stage starts as soon as the stages it depends on have finished and is
+    # called with their results as arguments. Stages that were never started
+    # can be cancelled, which also cancels everything depending on them.
+    # Stages run inside an app context of the given Flask app.
+    def __init__(self, app):
+        self.app = app
+        self.futures = {}
+
+    def add(self, name, f, dependencies=()):
+        future = Future()
+        dependency_futures = [self.futures[dependency] for dependency in dependencies]
+        self.futures[name] = future
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                with self.app.app_context():
+                    arguments = [dependency.result() for dependency in dependency_futures]
+                    future.set_result(f(*arguments))
+            except BaseException as e:
+                future.set_exception(e)
+
+        run = Deadline.propagate(run)
+
+        if not dependency_futures:
+            pipeline_executor.submit(run)
+            return future
+
+        remaining = [len(dependency_futures)]
+        lock = threading.Lock()
+
+        def on_dependency_done(dependency):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+
+            failed = next(
+                (item for item in dependency_futures if item.cancelled() or item.exception() is not None),
+                None,
+            )
+            if failed is None:
+                pipeline_executor.submit(run)
+            elif failed.cancelled() or future.cancelled():
+                future.cancel()
+            elif future.set_running_or_notify_cancel():
+                future.set_exception(failed.exception())
+
+        for dependency in dependency_futures:
+            dependency.add_done_callback(on_dependency_done)
+
+        return future
+
+    def result(self, name):
+        try:
+            return self.futures[name].result(timeout=Deadline.remaining())
+        except TimeoutError:
+            raise DeadlineExceeded(f"Request deadline exceeded waiting for {name}")
+
+    def cancel(self, *names):
+        # Only stages that have not started yet can be cancelled
+        for name in names:
+            if self.futures[name].cancel():
+                logger.debug("Cancelled pipeline stage", metadata={"stage": name})
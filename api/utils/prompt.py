@@ -74,6 +74,9 @@ class PromptGenerator:
         
         return system_message, user_message
 
+    def add_few_shot_example(user_message, example_content):
+        return f"{user_message}\n\nHere is a post written earlier on a similar topic. Use it as a reference for tone and structure, but do not copy it:\n```\n{example_content}\n```"
+
     def generate_messages(type, topic, content_length, purpose):
         system_message = f"You are a {type} writing GPT working for KeywordIQ. You are directly writing for our client."
         user_message = f"Write a {type} on {topic}. The length of the content should be {content_length}.\nThe purpose of the content is to {purpose}.\nYour writing should be in visually appealing HTML as it is shown directly on our platform."
@@ -0,0 +1,299 @@
+import time
+import threading
+import itertools
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.deadline import Deadline, DeadlineExceeded
+
+logger = logging_wrapper.Logger(__name__)
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def parse_model_limits(value):
+    # "gpt-4:200,gpt-3.5-turbo:3500" -> {"gpt-4": 200, "gpt-3.5-turbo": 3500}
+    limits = {}
+    for item in (value or "").split(","):
+        if ":" not in item:
+            continue
+        model, limit = item.rsplit(":", 1)
+        limits[model.strip()] = int(limit)
+    return limits
+
+
+class TokenBucket:
+    def __init__(self, capacity):
+        # Budgets are expressed per minute, the bucket refills continuously
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.refill_per_second = capacity / 60.0
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        # Requests larger than the bucket only wait for a full bucket
+        amount = min(amount, self.capacity)
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount):
+        # Negative amounts refund an over estimate
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RedisWindowBudget:
+    # Fixed one minute windows shared by every worker through Redis
+    def __init__(self, redis_url):
+        self.client = redis.Redis.from_url(redis_url)
+
+    def try_consume(self, model, requests, tokens, rpm, tpm):
+        window = int(time.time() // 60)
+        rpm_key = f"openai:rpm:{model}:{window}"
+        tpm_key = f"openai:tpm:{model}:{window}"
+
+        pipeline = self.client.pipeline()
+        pipeline.incrby(rpm_key, requests)
+        pipeline.incrby(tpm_key, tokens)
+        pipeline.expire(rpm_key, 120)
+        pipeline.expire(tpm_key, 120)
+        used_requests, used_tokens, _, _ = pipeline.execute()
+
+        if used_requests <= rpm and (used_tokens <= tpm or used_tokens == tokens):
+            return 0.0
+
+        # Over budget, give the reservation back and wait for the next window
+        pipeline = self.client.pipeline()
+        pipeline.decrby(rpm_key, requests)
+        pipeline.decrby(tpm_key, tokens)
+        pipeline.execute()
+        return 60 - (time.time() % 60)
+
+    def adjust_tokens(self, model, tokens):
+        # Corrects this window's reservation once the actual usage is known
+        tpm_key = f"openai:tpm:{model}:{int(time.time() // 60)}"
+        pipeline = self.client.pipeline()
+        pipeline.incrby(tpm_key, tokens)
+        pipeline.expire(tpm_key, 120)
+        pipeline.execute()
+
+
+class ModelLimiter:
+    def __init__(self, model, rpm, tpm):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+
+        # Waiting tickets grouped by user, served round robin across users
+        self.queues = OrderedDict()
+
+        self.waited_calls = 0
+        self.total_calls = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def queue_depth(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def enqueue(self, user_key, ticket):
+        self.queues.setdefault(user_key, deque()).append(ticket)
+
+    def is_next(self, ticket):
+        first_user = next(iter(self.queues))
+        return self.queues[first_user][0] == ticket
+
+    def dequeue(self, user_key, ticket):
+        queue = self.queues[user_key]
+        queue.remove(ticket)
+        if queue:
+            # Let the other users go before this user's next call
+            self.queues.move_to_end(user_key)
+        else:
+            del self.queues[user_key]
+
+    def record_wait(self, wait_seconds):
+        self.total_calls += 1
+        if wait_seconds > 0.001:
+            self.waited_calls += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def stats(self):
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "queue_depth": self.queue_depth,
+            "total_calls": self.total_calls,
+            "waited_calls": self.waited_calls,
+            "average_wait_seconds": self.total_wait_seconds / self.total_calls if self.total_calls else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+class OpenAIRateLimiter:
+    # Process wide limiter for outbound OpenAI traffic.
+    #
+    # Every call waits for a concurrency slot and for room in the model's
+    # requests-per-minute and tokens-per-minute budgets. Waiting calls are
+    # served round robin across users, so one user's burst can not starve
+    # everybody else. When RATE_LIMITER_REDIS_URL is set, the budgets are
+    # also enforced across workers.
+    def __init__(self, max_concurrency, rpm_limits, tpm_limits, default_rpm, default_tpm, redis_url=None):
+        self.max_concurrency = max_concurrency
+        self.rpm_limits = rpm_limits
+        self.tpm_limits = tpm_limits
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+
+        self.active_calls = 0
+        self.models = {}
+        self.tickets = itertools.count()
+        self.condition = threading.Condition()
+
+        self.redis_budget = None
+        if redis_url:
+            if redis is None:
+                logger.error("RATE_LIMITER_REDIS_URL is set but redis is not installed, using process limits only")
+            else:
+                self.redis_budget = RedisWindowBudget(redis_url)
+
+    def model_limiter(self, model):
+        limiter = self.models.get(model)
+        if limiter is None:
+            limiter = ModelLimiter(
+                model,
+                self.rpm_limits.get(model, self.default_rpm),
+                self.tpm_limits.get(model, self.default_tpm),
+            )
+            self.models[model] = limiter
+        return limiter
+
+    def _wait_time(self, limiter, estimated_tokens):
+        if self.active_calls >= self.max_concurrency:
+            # Woken up when a running call finishes
+            return None
+
+        return max(
+            limiter.request_bucket.wait_time(1),
+            limiter.token_bucket.wait_time(estimated_tokens),
+        )
+
+    def _redis_wait_time(self, limiter, estimated_tokens):
+        # Called without the lock held, a slow round trip only delays this call
+        try:
+            return self.redis_budget.try_consume(
+                limiter.model, 1, estimated_tokens, limiter.rpm, limiter.tpm
+            )
+        except Exception as e:
+            # Redis being down must not block OpenAI traffic
+            logger.exception(str(e))
+            return 0.0
+
+    @contextmanager
+    def acquire(self, model, estimated_tokens, user=None):
+        user_key = str(user) if user is not None else ""
+        started_at = time.monotonic()
+
+        with self.condition:
+            limiter = self.model_limiter(model)
+            ticket = next(self.tickets)
+            limiter.enqueue(user_key, ticket)
+
+            while True:
+                wait_time = None
+                if limiter.is_next(ticket):
+                    wait_time = self._wait_time(limiter, estimated_tokens)
+                    if wait_time == 0 and self.redis_budget is None:
+                        self.active_calls += 1
+                        break
+
+                    if wait_time == 0:
+                        # The slot is held while Redis is asked, but not the lock. The
+                        # ticket stays first in line, so nobody overtakes it meanwhile.
+                        self.active_calls += 1
+                        self.condition.release()
+                        try:
+                            wait_time = self._redis_wait_time(limiter, estimated_tokens)
+                        finally:
+                            self.condition.acquire()
+                        if wait_time == 0:
+                            break
+                        self.active_calls -= 1
+                        self.condition.notify_all()
+
+                # Never wait past the request deadline
+                remaining = Deadline.remaining()
+                if remaining is not None:
+                    if remaining <= 0:
+                        limiter.dequeue(user_key, ticket)
+                        self.condition.notify_all()
+                        raise DeadlineExceeded("Request deadline exceeded waiting for the OpenAI rate limit")
+                    wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                self.condition.wait(timeout=wait_time)
+
+            limiter.dequeue(user_key, ticket)
+            limiter.request_bucket.consume(1)
+            limiter.token_bucket.consume(estimated_tokens)
+
+            wait_seconds = time.monotonic() - started_at
+            limiter.record_wait(wait_seconds)
+            # Let the next user in line check the budget
+            self.condition.notify_all()
+
+        if wait_seconds > 1:
+            logger.info("Waited for OpenAI rate limit", metadata={
+                "model": model,
+                "wait_seconds": round(wait_seconds, 3),
+                "queue_depth": limiter.queue_depth,
+            })
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active_calls -= 1
+                self.condition.notify_all()
+
+    def record_usage(self, model, estimated_tokens, actual_tokens):
+        # Charge the difference once the real usage is known
+        with self.condition:
+            self.model_limiter(model).token_bucket.consume(actual_tokens - estimated_tokens)
+
+        if self.redis_budget is not None and actual_tokens != estimated_tokens:
+            try:
+                self.redis_budget.adjust_tokens(model, actual_tokens - estimated_tokens)
+            except Exception as e:
+                logger.exception(str(e))
+
+    def stats(self):
+        with self.condition:
+            return {
+                "active_calls": self.active_calls,
+                "max_concurrency": self.max_concurrency,
+                "models": {model: limiter.stats() for model, limiter in self.models.items()},
+            }
+
+
+rate_limiter = OpenAIRateLimiter(
+    max_concurrency=Config.OPENAI_MAX_CONCURRENCY,
+    rpm_limits=parse_model_limits(Config.OPENAI_RPM_LIMITS),
+    tpm_limits=parse_model_limits(Config.OPENAI_TPM_LIMITS),
+    default_rpm=Config.OPENAI_DEFAULT_RPM,
+    default_tpm=Config.OPENAI_DEFAULT_TPM,
+    redis_url=Config.RATE_LIMITER_REDIS_URL,
+)
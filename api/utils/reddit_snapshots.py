@@ -0,0 +1,93 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.cache import SQLiteCache
+from api.utils.deadline import Deadline
+
+logger = logging_wrapper.Logger(__name__)
+
+
+class RedditSnapshots:
+    # Cached snapshots of a subreddit's top posts with their comments.
+    #
+    # A snapshot younger than refresh_seconds is served as is. An older one
+    # is refreshed incrementally: the top listing is read again (one
+    # request), but comments are only downloaded for posts that were not in
+    # the previous snapshot or whose comments are older than max_age. Every
+    # post keeps at most max_comments comments.
+    def __init__(self, reddit, cache, refresh_seconds, max_age, max_comments, max_workers):
+        self.reddit = reddit
+        self.cache = cache
+        self.refresh_seconds = refresh_seconds
+        self.max_age = max_age
+        self.max_comments = max_comments
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reddit")
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def subreddit_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def fetch_post(self, post):
+        # comment_limit caps what Reddit sends, replace_more(0) drops the "load more" stubs
+        post.comment_limit = self.max_comments
+        post.comment_sort = "top"
+        post.comments.replace_more(limit=0)
+        return {
+            "id": post.id,
+            "title": post.title,
+            "body": post.selftext,
+            "created_utc": post.created_utc,
+            "comments": [comment.body for comment in post.comments.list()[:self.max_comments]],
+            "fetched_at": time.time(),
+        }
+
+    def posts(self, subreddit_name, post_limit):
+        key = f"{subreddit_name.lower()}:{post_limit}"
+
+        # One refresh per subreddit at a time, the others wait for its snapshot
+        with self.subreddit_lock(key):
+            snapshot = self.cache.get(key) if self.cache is not None else None
+            if snapshot is not None and time.time() - snapshot["fetched_at"] < self.refresh_seconds:
+                return snapshot["posts"]
+
+            # Posts stay in an all time top listing for good, their comments are refreshed after max_age
+            now = time.time()
+            known_posts = {
+                post["id"]: post
+                for post in (snapshot["posts"] if snapshot is not None else [])
+                if now - post.get("fetched_at", 0) < self.max_age
+            }
+            top_posts = list(self.reddit.subreddit(subreddit_name).top(limit=post_limit))
+
+            new_posts = [post for post in top_posts if post.id not in known_posts]
+            fetched_posts = {
+                post["id"]: post
+                for post in self.executor.map(Deadline.propagate(self.fetch_post), new_posts)
+            }
+
+            posts = [known_posts.get(post.id) or fetched_posts[post.id] for post in top_posts]
+            logger.info("Refreshed subreddit snapshot", metadata={
+                "subreddit": subreddit_name,
+                "posts": len(posts),
+                "fetched_posts": len(new_posts),
+            })
+
+            if self.cache is not None:
+                self.cache.set(key, {"fetched_at": time.time(), "posts": posts}, ttl=self.max_age)
+            return posts
+
+
+def build_reddit_snapshots(reddit):
+    return RedditSnapshots(
+        reddit,
+        SQLiteCache(Config.REDDIT_CACHE_PATH, table="reddit_snapshots") if Config.REDDIT_CACHE_ENABLED else None,
+        refresh_seconds=Config.REDDIT_SNAPSHOT_REFRESH_SECONDS,
+        max_age=Config.REDDIT_SNAPSHOT_MAX_AGE,
+        max_comments=Config.REDDIT_MAX_COMMENTS_PER_POST,
+        max_workers=Config.REDDIT_MAX_WORKERS,
+    )
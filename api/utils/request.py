@@ -23,6 +23,11 @@ def bad_response(message, **kwargs):
 def success_response(message, **kwargs):
     return response(success=True, message=message, status_code=HTTPStatus.OK, **kwargs)
 
+def sse_event(event, data):
+    # Server-Sent Events frame, data is sent as a single JSON line
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 def get_parsed_data_list(request, key_list):
     return [request.json.get(key, None) for key in key_list]
 
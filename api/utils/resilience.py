@@ -0,0 +1,90 @@
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from api.utils import logging_wrapper
+from api.utils.deadline import Deadline, DeadlineExceeded
+
+logger = logging_wrapper.Logger(__name__)
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(f, is_retryable, max_retries, base_delay, max_delay):
+    # Retries f() on retryable errors without sleeping past the request deadline
+    attempt = 0
+    while True:
+        Deadline.check()
+        try:
+            return f()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            remaining = Deadline.remaining()
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceeded("Request deadline exceeded while retrying") from e
+
+            logger.info("Retrying after error", metadata={
+                "attempt": attempt + 1,
+                "delay_seconds": round(delay, 3),
+                "error": str(e),
+            })
+            time.sleep(delay)
+            attempt += 1
+
+
+class LatencyTracker:
+    # Sliding window of recent latencies per key, used for the hedging delay
+    def __init__(self, window=200, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, percentile):
+        with self._lock:
+            samples = sorted(self.samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+
+hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+def hedged_call(f, hedge_delay):
+    # Runs f() and, if it has not finished after hedge_delay seconds, a second
+    # f() in parallel. The first result wins, the slower call is left to finish
+    # in the background.
+    f = Deadline.propagate(f)
+    futures = [hedge_executor.submit(f)]
+    done, _ = wait(futures, timeout=hedge_delay)
+
+    if not done:
+        logger.info("Sending hedged request", metadata={"hedge_delay_seconds": round(hedge_delay, 3)})
+        futures.append(hedge_executor.submit(f))
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=Deadline.remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded("Request deadline exceeded while waiting for a hedged call")
+
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+
+    raise error
@@ -1,87 +1,46 @@
 import os
-from googleapiclient.discovery import build
-import requests
-from bs4 import BeautifulSoup
-import time
+from api.utils.main_content import MainContentExtractor
 import re
 
 from config import Config
+from api.utils.token_budget import TokenBudget
+from api.utils.crawler import crawler
+from api.utils.page_cache import page_cache
+from api.utils.geoip import geoip
+from api.utils.search_cache import search_cache, WEB
 
-API_KEY = Config.GOOGLE_SEARCH_API_KEY
-CUSTOM_SEARCH_ENGINE_ID = Config.CUSTOM_SEARCH_ENGINE_ID
 
 class AssistantHubScrapper:
     def get_country_code_from_ip(ip_address):
-        try:
-            response = requests.get(f"http://ip-api.com/json/{ip_address}")
-            response.raise_for_status()
-            data = response.json()
-            if data['status'] == 'success':
-                return data['countryCode'].lower()
-        except Exception as e:
-            print(f"Error fetching country code: {e}")
-            return None
+        return geoip.resolve(ip_address)[1]
 
     def get_country_name_from_ip(ip_address):
-        try:
-            response = requests.get(f"http://ip-api.com/json/{ip_address}")
-            response.raise_for_status()
-            data = response.json()
-            if data['status'] == 'success':
-                return data['country'].lower()
-        except Exception as e:
-            print(f"Error fetching country name: {e}")
-            return None
+        return geoip.resolve(ip_address)[0]
 
     def get_country_name_and_code_from_ip(ip_address):
-        try:
-            response = requests.get(f"http://ip-api.com/json/{ip_address}")
-            response.raise_for_status()
-            data = response.json()
-
-            if data['status'] == 'success':
-                return data['country'].lower(), data['countryCode'].lower()
-            else:
-                return None, None
-        except Exception as e:
-            print(f"Error fetching country name: {e}")
-            return None, None
+        return geoip.resolve(ip_address)
 
     def fetch_url_content(url):
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
+            page = page_cache.fetch(url)
+            if not page.ok:
+                raise ValueError(f"HTTP {page.status_code}")
         except Exception as e:
             print(f"Error fetching {url}: {e}")
             return None
-        
-        # Extract text from the webpage
-        text = soup.get_text(strip=True)
-
-        # Extract additional information, such as titles and summaries
-        title = None
-        summary = None
-
-        # Look for the title in common HTML elements
-        title_element = soup.find('title') or soup.find('h1') or soup.find('h2')
-        if title_element:
-            title = title_element.get_text(strip=True)
-
-        # Look for a summary in common HTML elements
-        summary_element = soup.find('meta', attrs={'name': 'description'}) or \
-                          soup.find('meta', attrs={'property': 'og:description'})
-        if summary_element:
-            summary = summary_element['content']
-        else:
-            summary = ''
 
+        # Parsed once per page version
+        return page_cache.extract(page, "scrapper:v4", AssistantHubScrapper.extract_page_content)
+
+    def extract_page_content(page):
+        # Only the main content goes on to the prompts, navigation and footers are dropped
+        extract = MainContentExtractor.extract(page.content, page.encoding)
         return {
-            'text': text,
-            'title': title,
-            'summary': summary
+            'text': extract['main_text'],
+            'title': extract['title'] or extract['heading'],
+            'summary': extract['description'] or ''
         }
-        
+
     def preprocess_content(content):
         text = content['text']
         title = content['title']
@@ -106,60 +65,82 @@ class AssistantHubScrapper:
         }
 
     def tokenize_content(content):
-        text = content['text'].split()
-        title = content['title'].split()
-        summary = content['summary'].split()
+        text = (content['text'] or '').split()
+        title = (content['title'] or '').split()
+        summary = (content['summary'] or '').split()
 
         combined_tokens = text + title + summary
 
         return combined_tokens
     
     def google_search(query, user_location=None):
-        service = build("customsearch", "v1", developerKey=API_KEY)
-        search_params = {'q': query, 'cx': CUSTOM_SEARCH_ENGINE_ID}
+        # Returns the result items and the points the search cost, nothing when it was cached
+        search_params = {'q': query}
 
         if user_location:
             search_params['gl'] = user_location.upper()
-        
-        results = service.cse().list(**search_params).execute()
-        return results.get('items', [])
 
-    def search_and_crawl(query, user_ip, max_total_tokens=1000):
-        total_point = 0.0
-        country_code = AssistantHubScrapper.get_country_code_from_ip(user_ip)
-        
-        if not country_code:
-            country_code = 'IN'
-        
-        search_results = AssistantHubScrapper.google_search(query, country_code)
-        total_point += 0.0005
+        results, cached = search_cache.search(WEB, search_params)
+        point = 0.0 if cached else 0.0005
+        return (results or {}).get('items', []), point
+
+    def fetch_and_measure(url):
+        content = AssistantHubScrapper.fetch_url_content(url)
+        if not content:
+            return None
+
+        preprocessed_content = AssistantHubScrapper.preprocess_content(content)
+        text = ' '.join(AssistantHubScrapper.tokenize_content(preprocessed_content))
+        return text, TokenBudget.count_tokens(text, Config.OPENAI_MODEL)
+
+    def crawl(search_results, max_total_tokens=None):
+        # Budget is counted in model tokens of the content generation model
+        if max_total_tokens is None:
+            max_total_tokens = Config.WEB_CONTENT_MAX_TOKENS
+
+        # Pages are fetched concurrently, the crawl stops once the top ranked
+        # pages already fill the token budget
+        pages = crawler.crawl(
+            [result['link'] for result in search_results],
+            AssistantHubScrapper.fetch_and_measure,
+            lambda fetched_pages: sum(tokens for _, tokens in fetched_pages) >= max_total_tokens,
+        )
 
         all_contents = []
         total_tokens = 0
-        
-        for result in search_results:
+
+        for result, page in zip(search_results, pages):
             if total_tokens >= max_total_tokens:
                 break
 
-            url = result['link']
-            website = result['displayLink']
-            content = AssistantHubScrapper.fetch_url_content(url)
-
-            if content:
-                preprocessed_content = AssistantHubScrapper.preprocess_content(content)
-                tokens = AssistantHubScrapper.tokenize_content(preprocessed_content)
+            if page:
+                text, tokens = page
                 remaining_tokens = max_total_tokens - total_tokens
 
-                truncated_tokens = tokens[:remaining_tokens]
-                truncated_content = ' '.join(truncated_tokens)
-                total_tokens += len(truncated_tokens)
+                truncated_content = text
+                if tokens > remaining_tokens:
+                    truncated_content = TokenBudget.truncate_to_tokens(text, remaining_tokens, Config.OPENAI_MODEL)
+                    tokens = TokenBudget.count_tokens(truncated_content, Config.OPENAI_MODEL)
+                total_tokens += tokens
 
                 content_map = {
-                    'website': website,
+                    'website': result['displayLink'],
                     'content': truncated_content
                 }
 
                 all_contents.append(content_map)
-                time.sleep(1)  # Respect the website's rate limits
 
-        return all_contents, total_point
\ No newline at end of file
+        return all_contents
+
+    def search_and_crawl(query, user_ip, max_total_tokens=None):
+        total_point = 0.0
+        country_code = AssistantHubScrapper.get_country_code_from_ip(user_ip)
+        
+        if not country_code:
+            country_code = 'IN'
+        
+        search_results, search_point = AssistantHubScrapper.google_search(query, country_code)
+        total_point += search_point
+
+        all_contents = AssistantHubScrapper.crawl(search_results, max_total_tokens)
+        return all_contents, total_point
@@ -0,0 +1,124 @@
+import json
+import hashlib
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.cache import LRUCache, SQLiteCache, read_through
+from api.utils.deadline import Deadline, DeadlineExceeded
+from api.utils.http_client import http_session
+
+logger = logging_wrapper.Logger(__name__)
+
+CUSTOM_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+NEWS = "news"
+WEB = "web"
+COMPETITORS = "competitors"
+
+# Only these params change the results, the API key does not
+KEY_PARAMS = ("cx", "q", "gl", "tbm", "sort", "num", "start", "lr")
+
+
+def search_key(params):
+    key_params = {name: params[name] for name in KEY_PARAMS if params.get(name) is not None}
+    # Whitespace only, case matters to the OR and AND operators
+    key_params["q"] = " ".join(str(key_params.get("q", "")).split())
+    if "gl" in key_params:
+        key_params["gl"] = str(key_params["gl"]).lower()
+    return hashlib.sha256(json.dumps(key_params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    # Shared cache for Google Custom Search responses.
+    #
+    # Responses are kept per vertical for a different time: news goes stale
+    # in minutes, competitor listings hardly change in a week. A per process
+    # LRU sits in front of a sqlite file shared by all workers. Identical
+    # queries running at the same time in one process are coalesced into a
+    # single upstream call. Only upstream calls cost points, search() tells
+    # the caller whether the response was served without one.
+    def __init__(self, memory, disk, ttls):
+        self.memory = memory
+        self.disk = disk
+        self.ttls = ttls
+        self.counters = {vertical: {"hits": 0, "misses": 0, "coalesced": 0} for vertical in ttls}
+        self.in_flight = {}
+        self._lock = threading.Lock()
+
+    def count(self, vertical, counter):
+        with self._lock:
+            self.counters[vertical][counter] += 1
+
+    def stats(self):
+        with self._lock:
+            return {vertical: dict(counters) for vertical, counters in self.counters.items()}
+
+    def lookup(self, key):
+        return read_through(self.memory, self.disk, key)
+
+    def search(self, vertical, params):
+        # Returns (response json or None on upstream failure, served from cache)
+        ttl = self.ttls[vertical]
+        if not ttl:
+            return self.fetch(params), False
+
+        key = f"{vertical}:{search_key(params)}"
+        data = self.lookup(key)
+        if data is not None:
+            self.count(vertical, "hits")
+            return data, True
+
+        with self._lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not leader:
+            self.count(vertical, "coalesced")
+            try:
+                return future.result(timeout=Deadline.remaining()), True
+            except TimeoutError:
+                raise DeadlineExceeded("Request deadline exceeded waiting for search results")
+
+        self.count(vertical, "misses")
+        try:
+            data = self.fetch(params)
+            if data is not None:
+                self.memory.set(key, data, ttl=ttl)
+                if self.disk is not None:
+                    self.disk.set(key, data, ttl=ttl)
+            future.set_result(data)
+            return data, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self.in_flight.pop(key, None)
+
+    def fetch(self, params):
+        params = {
+            "key": Config.GOOGLE_SEARCH_API_KEY,
+            "cx": Config.CUSTOM_SEARCH_ENGINE_ID,
+            **params,
+        }
+        response = http_session.get(CUSTOM_SEARCH_URL, params=params)
+        if response.status_code != 200:
+            logger.error("Custom search failed", metadata={"status_code": response.status_code, "query": params.get("q")})
+            return None
+        return response.json()
+
+
+search_cache = SearchCache(
+    memory=LRUCache(max_entries=Config.SEARCH_CACHE_MAX_ENTRIES),
+    disk=SQLiteCache(Config.SEARCH_CACHE_PATH, table="search_cache") if Config.SEARCH_CACHE_ENABLED else None,
+    ttls={
+        NEWS: Config.SEARCH_CACHE_TTL_NEWS if Config.SEARCH_CACHE_ENABLED else 0,
+        WEB: Config.SEARCH_CACHE_TTL_WEB if Config.SEARCH_CACHE_ENABLED else 0,
+        COMPETITORS: Config.SEARCH_CACHE_TTL_COMPETITORS if Config.SEARCH_CACHE_ENABLED else 0,
+    },
+)
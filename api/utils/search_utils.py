@@ -1,14 +1,10 @@
 import re
-import nltk
 
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from gensim.models import TfidfModel, LdaModel
 from gensim.corpora import Dictionary
 from gensim.matutils import corpus2dense
 from collections import Counter
 from gensim.models.coherencemodel import CoherenceModel
-import openai
 from sklearn.cluster import KMeans
 from api.models.analysis import Analysis
 from api.models.search_analysis_rel import SearchAnalysisRel
@@ -16,8 +12,8 @@ from api.models.search_analysis_rel import SearchAnalysisRel
 from api.models.search_query import SearchQuery
 from api.assets import constants
 from api.utils.db import add_commit_
-from config import Config
-import requests
+from api.utils.search_cache import search_cache, WEB
+from api.utils.text_preprocessing import TextPreprocessor
 from api.utils import logging_wrapper
 
 logger = logging_wrapper.Logger(__name__)
@@ -92,43 +88,28 @@ class GoogleSearchUtils:
 
         for i in range(num_pages):
             start = i * 10 + 1
-            url = "https://www.googleapis.com/customsearch/v1"
             params = {
-                "key": Config.GOOGLE_SEARCH_API_KEY,
-                "cx": Config.CUSTOM_SEARCH_ENGINE_ID,
                 "q": query,
                 "start": start,
                 'sort': 'date',  # Sort results by recency
                 'lr': 'lang_en',  # Fetch articles in English
             }
 
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                results = response.json()
+            results, cached = search_cache.search(WEB, params)
+            if results is not None:
                 search_article_items = results.get('items', [])
                 search_articles.extend(search_article_items)
-            else:
-                logger.exception(f"Error: {response.status_code}")
-                print(f"Error: {response.status_code}")
-                continue
+                # Pages served from the cache cost nothing
+                if not cached:
+                    total_point += 0.0005 * len(search_article_items)
 
-        total_point += 0.0005 * len(search_articles)
         return search_articles, total_point
 
-    # Preprocessing function
-    def preprocess(text):
-        text = re.sub(r'<[^>]+>', '', text)  # Remove HTML tags
-        text = re.sub(r'\s+', ' ', text)  # Remove extra spaces
-        text = text.lower()  # Convert text to lowercase
-        tokens = nltk.word_tokenize(text)  # Tokenize words
-        lemmatizer = WordNetLemmatizer()
-        tokens = [lemmatizer.lemmatize(token) for token in tokens if token.isalnum() and token not in stopwords.words('english')]
-        return tokens
-
     def keywords_titles_builder(news_data):
         # Preprocess the articles
         articles = [article["snippet"] for article in news_data]
-        preprocessed_articles = [GoogleSearchUtils.preprocess(article) for article in articles]
+        # Tokenized once, shared by TF-IDF, LDA and the cluster keyword counts
+        preprocessed_articles = TextPreprocessor.tokens_batch(articles)
 
         # Build a dictionary and a corpus for the articles
         dictionary = Dictionary(preprocessed_articles)
@@ -170,45 +151,14 @@ class GoogleSearchUtils:
         # Analyzing trends and events
         trending_topics = []
         for cluster in range(5):
-            cluster_articles = [article for article, c in zip(articles, clusters) if c == cluster]
             cluster_keywords = Counter()
-            for article in cluster_articles:
-                article_keywords = GoogleSearchUtils.preprocess(article)
-                cluster_keywords.update(article_keywords)
+            for article_keywords, c in zip(preprocessed_articles, clusters):
+                if c == cluster:
+                    cluster_keywords.update(article_keywords)
             trending_topics.append(cluster_keywords.most_common(5))
 
         return trending_topics
 
-    def generate_title(keywords, user_id, app):
-        with app.app_context():
-            # Join the top keywords with a comma
-            keywords_str = ", ".join([keyword[0] for keyword in keywords])
-
-            system_prompt = {
-                "role": "system",
-                "content": "You are an AI assistant trained to generate relevant and engaging article titles based on a set of keywords. Generate a title using the following keywords."
-            }
-
-            user_prompt = {
-                "role": "user",
-                "content": f"Keywords: {keywords_str}"
-            }
-
-            assistant_response = openai.ChatCompletion.create(
-                model=Config.OPENAI_MODEL_GPT4,
-                messages=[system_prompt, user_prompt],
-                temperature=0.7,
-                top_p=1,
-                frequency_penalty=0,
-                presence_penalty=0,
-                user=str(user_id),
-            )
-
-            # Extract and format the title
-            title = assistant_response["choices"][0]["message"]["content"].strip()
-            total_tokens = assistant_response['usage']['total_tokens']
-            return title, total_tokens
-
     def clean_title(title):
         # Remove characters like "\", "/", and quotes
         cleaned_title = re.sub(r'[\\\/"]', '', title)
@@ -0,0 +1,232 @@
+import re
+import time
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from config import Config
+from api.assets import constants
+from api.models.content import Content
+from api.utils import logging_wrapper
+
+logger = logging_wrapper.Logger(__name__)
+
+DRAFT = "draft"
+FEW_SHOT = "few_shot"
+
+# Character n-grams are insensitive to casing, punctuation and small word
+# changes, which is what separates most near duplicate topics
+vectorizer = HashingVectorizer(
+    analyzer="char_wb",
+    ngram_range=(3, 5),
+    n_features=2 ** 18,
+    alternate_sign=False,
+    norm="l2",
+)
+
+
+def normalize_topic(topic):
+    topic = re.sub(r'[^\w\s]', ' ', (topic or "").lower())
+    return re.sub(r'\s+', ' ', topic).strip()
+
+
+def normalize_keywords(keywords):
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    return sorted({keyword.strip().lower() for keyword in keywords or [] if keyword and keyword.strip()})
+
+
+def normalize_urls(urls):
+    # Parsed request urls are {"url", "type"} dicts, stored rows hold the same
+    return sorted({
+        (url.get("url", "").strip(), url.get("type", "").upper().strip())
+        if isinstance(url, dict) else (str(url).strip(), "")
+        for url in urls or []
+    })
+
+
+def enum_name(value):
+    # Enum columns come back as enum members, new rows hold the raw string
+    return getattr(value, "name", value)
+
+
+class ContentIndex:
+    # In-memory vector index of successful content rows, grouped by
+    # (type, platform, length) so a lookup only compares comparable posts.
+    def __init__(self):
+        self.buckets = {}
+        self.indexed_ids = set()
+        self.last_content_id = 0
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def bucket_key(self, type, platform, length):
+        return (enum_name(type), platform, enum_name(length))
+
+    def add_rows(self, rows):
+        grouped_rows = {}
+        for row in rows:
+            if row.id in self.indexed_ids:
+                continue
+            self.indexed_ids.add(row.id)
+            key = self.bucket_key(row.type, row.platform, row.length)
+            grouped_rows.setdefault(key, []).append(row)
+
+        for key, bucket_rows in grouped_rows.items():
+            vectors = vectorizer.transform([normalize_topic(row.topic) for row in bucket_rows])
+            content_ids = np.array([row.id for row in bucket_rows])
+            user_ids = np.array([row.user_id for row in bucket_rows])
+
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self.buckets[key] = (vectors, content_ids, user_ids)
+            else:
+                self.buckets[key] = (
+                    sp.vstack([bucket[0], vectors], format="csr"),
+                    np.concatenate([bucket[1], content_ids]),
+                    np.concatenate([bucket[2], user_ids]),
+                )
+
+        if len(self.indexed_ids) > Config.SEMANTIC_CACHE_MAX_ROWS:
+            self.trim()
+
+    def trim(self):
+        # Evicts the oldest rows so the index stays within SEMANTIC_CACHE_MAX_ROWS
+        kept_ids = sorted(self.indexed_ids, reverse=True)[:Config.SEMANTIC_CACHE_MAX_ROWS]
+        min_id = kept_ids[-1] if kept_ids else 0
+
+        for key, (vectors, content_ids, user_ids) in list(self.buckets.items()):
+            keep = content_ids >= min_id
+            if keep.all():
+                continue
+            if not keep.any():
+                del self.buckets[key]
+                continue
+            self.buckets[key] = (vectors[np.flatnonzero(keep)], content_ids[keep], user_ids[keep])
+
+        self.indexed_ids = set(kept_ids)
+
+    def query_rows(self, after_id):
+        # Newest rows first, so a capped index keeps the most recent content
+        return (
+            Content.query
+            .with_entities(Content.id, Content.user_id, Content.type, Content.platform, Content.length, Content.topic)
+            .filter(
+                Content.id > after_id,
+                Content.status == constants.ContentStatus.SUCCESS,
+                Content.model_response.isnot(None),
+            )
+            .order_by(Content.id.desc())
+            .limit(Config.SEMANTIC_CACHE_MAX_ROWS)
+            .all()
+        )
+
+    def rebuild(self):
+        started_at = time.monotonic()
+        with self._lock:
+            self.buckets = {}
+            self.indexed_ids = set()
+            rows = self.query_rows(0)
+            self.add_rows(rows)
+            self.last_content_id = max([row.id for row in rows], default=0)
+            self.refreshed_at = time.monotonic()
+
+        logger.info("Rebuilt content index", metadata={
+            "rows": len(rows),
+            "seconds": round(time.monotonic() - started_at, 3),
+        })
+        return len(rows)
+
+    def refresh(self):
+        # Picks up rows written by other workers since the last refresh
+        with self._lock:
+            if time.monotonic() - self.refreshed_at < Config.SEMANTIC_CACHE_REFRESH_SECONDS:
+                return
+            rows = self.query_rows(self.last_content_id)
+            self.add_rows(rows)
+            self.last_content_id = max([row.id for row in rows], default=self.last_content_id)
+            self.refreshed_at = time.monotonic()
+
+    def add(self, content_data):
+        # last_content_id is left alone so rows from other workers are still picked up
+        with self._lock:
+            self.add_rows([content_data])
+
+    def search(self, topic, type, platform, length, user_id=None):
+        with self._lock:
+            bucket = self.buckets.get(self.bucket_key(type, platform, length))
+            if bucket is None:
+                return None, 0.0
+
+            vectors, content_ids, user_ids = bucket
+            similarities = vectors.dot(vectorizer.transform([normalize_topic(topic)]).T).toarray().ravel()
+            if user_id is not None:
+                similarities = np.where(user_ids == user_id, similarities, -1.0)
+
+            best_index = int(similarities.argmax())
+            return int(content_ids[best_index]), float(similarities[best_index])
+
+
+content_index = ContentIndex()
+
+
+class SemanticCache:
+    # Finds earlier content for a near identical topic on the same platform
+    # and length. Very close matches are reused as an instant draft, weaker
+    # ones are passed to the model as a few-shot example. A draft also needs
+    # the same keywords and urls, otherwise the match is only a few-shot
+    # example. force skips the cache, for users asking for a fresh post.
+    def lookup(user_id, topic, type, platform, length, keywords=None, urls=None, force=False):
+        if force or not Config.SEMANTIC_CACHE_ENABLED:
+            return None, None
+
+        try:
+            content_index.refresh()
+            scope_user_id = user_id if Config.SEMANTIC_CACHE_SCOPE == "user" else None
+            content_id, similarity = content_index.search(topic, type, platform, length, scope_user_id)
+        except Exception as e:
+            # The cache must never break content generation
+            logger.exception(str(e))
+            return None, None
+
+        if content_id is None:
+            return None, None
+
+        if similarity >= Config.SEMANTIC_CACHE_DRAFT_THRESHOLD:
+            match_type = DRAFT
+        elif similarity >= Config.SEMANTIC_CACHE_FEW_SHOT_THRESHOLD:
+            match_type = FEW_SHOT
+        else:
+            return None, None
+
+        content = Content.query.get(content_id)
+        if content is None or content.model_response is None:
+            return None, None
+
+        if match_type == DRAFT and (
+            normalize_keywords(keywords) != normalize_keywords(content.keywords)
+            or normalize_urls(urls) != normalize_urls(content.urls)
+        ):
+            match_type = FEW_SHOT
+
+        logger.info("Semantic cache match", metadata={
+            "match_type": match_type,
+            "similarity": round(similarity, 3),
+            "content_id": content_id,
+        })
+        return match_type, content
+
+    def add(content_data):
+        if not Config.SEMANTIC_CACHE_ENABLED:
+            return
+
+        try:
+            content_index.add(content_data)
+        except Exception as e:
+            # A missed index entry only costs a future cache hit
+            logger.exception(str(e))
+
+    def rebuild():
+        return content_index.rebuild()
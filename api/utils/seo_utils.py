@@ -8,12 +8,13 @@ import datetime
 from isodate import parse_duration
 import nltk
 import praw
-import requests
+from api.utils.search_cache import search_cache, WEB
+from api.utils.page_cache import page_cache
+from api.utils.reddit_snapshots import build_reddit_snapshots
 
-import concurrent.futures
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-from nltk.corpus import stopwords
+from api.utils.text_preprocessing import stop_words
 from nltk.stem import PorterStemmer
 from collections import Counter
 from api.models.search_query import SearchQuery
@@ -32,6 +33,7 @@ reddit = praw.Reddit(
     client_secret=Config.REDDIT_CLIENT_SECRET,
     user_agent=Config.REDDIT_USER_AGENT,
 )
+reddit_snapshots = build_reddit_snapshots(reddit)
 
 logger = logging_wrapper.Logger(__name__)
 
@@ -44,30 +46,22 @@ class AssistantHubSEO:
 
         for i in range(num_pages):
             start = i * 10 + 1
-            url = "https://www.googleapis.com/customsearch/v1"
             params = {
-                "key": Config.GOOGLE_SEARCH_API_KEY,
-                "cx": Config.CUSTOM_SEARCH_ENGINE_ID,
                 "q": query,
                 "start": start,
                 'sort': 'date',  # Sort results by recency
                 'lr': 'lang_en',  # Fetch articles in English
             }
 
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                results = response.json()
+            results, _ = search_cache.search(WEB, params)
+            if results is not None:
                 search_article_items = results.get('items', [])
                 search_articles.extend(search_article_items)
-            else:
-                logger.exception(f"Error: {response.status_code}")
-                print(f"Error: {response.status_code}")
-                continue
         return search_articles
 
     def analyze_google_search_results(search_results):
         # Initialize the stop words and stemmer
-        stop_words = set(stopwords.words("english"))
+        stop = stop_words()
         stemmer = PorterStemmer()
 
         # Extract the titles, snippets, and URLs from the search results
@@ -82,7 +76,7 @@ class AssistantHubSEO:
 
         # Filter out stop words and non-alphabetic tokens
         filtered_tokens = [
-            token for token in tokens if token.isalpha() and token not in stop_words]
+            token for token in tokens if token.isalpha() and token not in stop]
 
         # Perform stemming on the filtered tokens
         stemmed_tokens = [stemmer.stem(token) for token in filtered_tokens]
@@ -133,54 +127,42 @@ class AssistantHubSEO:
             "external_links": external_links,
         }
 
-    def process_post(post):
-        post_title = post.title
-        post_body = post.selftext
-        post.comments.replace_more(limit=0)  # Limit to top-level comments only
-        post_comments = [comment.body for comment in post.comments.list()]
-        return post_title, post_body, post_comments
-
-    def analyze_text(text):
-        stop_words = set(stopwords.words("english"))
+    def keyword_counters(sections):
+        # One tokenizer pass over every text, each stem is computed once
+        stop = stop_words()
         stemmer = PorterStemmer()
-        tokens = nltk.word_tokenize(text.lower())
-        filtered_tokens = [
-            token for token in tokens if token.isalpha() and token not in stop_words]
-        stemmed_tokens = [stemmer.stem(token) for token in filtered_tokens]
-        token_freq = Counter(stemmed_tokens)
-        return token_freq.most_common()
+        stems = {}
+
+        counters = {}
+        for section, texts in sections.items():
+            counter = counters[section] = Counter()
+            for text in texts:
+                for token in nltk.word_tokenize(text.lower()):
+                    if not token.isalpha() or token in stop:
+                        continue
+                    stem = stems.get(token)
+                    if stem is None:
+                        stem = stems[token] = stemmer.stem(token)
+                    counter[stem] += 1
+        return counters
 
     def analyze_reddit_subreddit(subreddit_name, post_limit=10):
-        subreddit = reddit.subreddit(subreddit_name)
-        top_posts = subreddit.top(limit=post_limit)
-        all_post_titles = []
-        all_post_bodies = []
-        all_comments = []
-        posts = []
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            post_results = executor.map(
-                AssistantHubSEO.process_post, top_posts)
-            for post_title, post_body, post_comments in post_results:
-                all_post_titles.append(post_title)
-                all_post_bodies.append(post_body)
-                all_comments.extend(post_comments)
-                posts.append({
-                    "title": post_title,
-                    "body": post_body,
-                    "comments": post_comments,
-                })
-
-        title_keywords = AssistantHubSEO.analyze_text(
-            " ".join(all_post_titles))
-        body_keywords = AssistantHubSEO.analyze_text(" ".join(all_post_bodies))
-        comment_keywords = AssistantHubSEO.analyze_text(" ".join(all_comments))
+        posts = reddit_snapshots.posts(subreddit_name, post_limit)
+
+        counters = AssistantHubSEO.keyword_counters({
+            "title": [post["title"] for post in posts],
+            "body": [post["body"] for post in posts],
+            "comment": [comment for post in posts for comment in post["comments"]],
+        })
 
         return {
-            "title_keywords": title_keywords,
-            "body_keywords": body_keywords,
-            "comment_keywords": comment_keywords,
-            "posts": posts,
+            "title_keywords": counters["title"].most_common(),
+            "body_keywords": counters["body"].most_common(),
+            "comment_keywords": counters["comment"].most_common(),
+            "posts": [
+                {"title": post["title"], "body": post["body"], "comments": post["comments"]}
+                for post in posts
+            ],
         }
 
     def get_lsi_topic_and_keywords(texts, num_topics=5, num_words=10):
@@ -246,7 +228,7 @@ class AssistantHubSEO:
 
     def fetch_html(url):
         try:
-            response = requests.get(url)
+            response = page_cache.fetch(url)
             if response.status_code == 200:
                 return response.text
             else:
@@ -1,4 +1,4 @@
-import requests
+from api.utils.http_client import http_session
 import json
 from pybreaker import CircuitBreaker, CircuitBreakerError
 
@@ -26,7 +26,7 @@ class Socket:
         url = f"{Config.RTC_URL}room/create-room"
         body = {"contentId": content_id, "userId": user_id}
         try:
-            res = requests.post(url, data=json.dumps(body), headers=headers, timeout=5)
+            res = http_session.post(url, data=json.dumps(body), headers=headers, timeout=5)
             log_response(res)
         except Exception as e:
             logger.exception(str(e))
\ No newline at end of file
@@ -0,0 +1,97 @@
+import re
+import sys
+import time
+from functools import lru_cache
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+
+from api.utils.model_registry import models
+
+HTML_TAG = re.compile(r'<[^>]+>')
+WHITESPACE = re.compile(r'\s+')
+
+# Distinct words seen across snippets stay well below this
+LEMMA_CACHE_SIZE = 100000
+
+lemmatizer = WordNetLemmatizer()
+
+
+@lru_cache(maxsize=None)
+def stop_words():
+    # Read from the nltk corpus once, on first use so importing needs no corpus
+    return frozenset(stopwords.words("english"))
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token):
+    return lemmatizer.lemmatize(token)
+
+
+class TextPreprocessor:
+    # Tokenization shared by the news, search and competitor keyword builders.
+    # Stop words are a frozenset built once and every distinct token is
+    # lemmatized once per process. Callers tokenize each document once and
+    # reuse the token lists for TF-IDF, LDA and the cluster keyword counts.
+    def tokens(text):
+        text = HTML_TAG.sub('', text)  # Remove HTML tags
+        text = WHITESPACE.sub(' ', text).lower()
+        stop = stop_words()
+        return [lemmatize(token) for token in nltk.word_tokenize(text) if token.isalnum() and token not in stop]
+
+    def tokens_batch(texts):
+        return [TextPreprocessor.tokens(text) for text in texts]
+
+    def spacy_tokens(texts, batch_size=64):
+        # Lowercased alphabetic non stop words, the documents go through spaCy in batches
+        nlp = models.get("en_core_web_sm")
+        return [
+            [token.text.lower() for token in doc if token.is_alpha and not token.is_stop]
+            for doc in nlp.pipe(texts, batch_size=batch_size, disable=["parser", "ner"])
+        ]
+
+
+def benchmark(paths, rounds=5):
+    # python -m api.utils.text_preprocessing snippets.txt [more.txt ...], one document per line
+    def per_call(text):
+        # The preprocessing the keyword builders used to copy
+        text = re.sub(r'<[^>]+>', '', text)
+        text = re.sub(r'\s+', ' ', text)
+        text = text.lower()
+        tokens = nltk.word_tokenize(text)
+        lemmatizer = WordNetLemmatizer()
+        return [lemmatizer.lemmatize(token) for token in tokens if token.isalnum() and token not in stopwords.words('english')]
+
+    documents = []
+    for document_path in paths:
+        with open(document_path, encoding="utf-8", errors="replace") as file:
+            documents.extend(line for line in file.read().splitlines() if line.strip())
+
+    # Loads the corpora outside the timings
+    per_call(documents[0])
+    TextPreprocessor.tokens(documents[0])
+
+    print(f"{len(documents)} documents, {rounds} rounds")
+    for name, preprocess in (("per call", per_call), ("shared", TextPreprocessor.tokens)):
+        started_at = time.perf_counter()
+        for _ in range(rounds):
+            for document in documents:
+                preprocess(document)
+        elapsed = (time.perf_counter() - started_at) / rounds
+        print(f"{name:>10}: {elapsed * 1000:8.1f} ms per round, {len(documents) / elapsed:8.0f} documents/s")
+
+    # A keyword builder tokenized every document twice, for TF-IDF and for the cluster counts
+    started_at = time.perf_counter()
+    for document in documents:
+        per_call(document)
+        per_call(document)
+    twice = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    TextPreprocessor.tokens_batch(documents)
+    once = time.perf_counter() - started_at
+    print(f"keyword builder: {twice * 1000:.1f} ms before, {once * 1000:.1f} ms now, {twice / once:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1:])
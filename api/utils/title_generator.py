@@ -0,0 +1,123 @@
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.deadline import Deadline
+from api.utils.llm_gateway import LLMGateway
+
+logger = logging_wrapper.Logger(__name__)
+
+TITLE_SYSTEM_PROMPT = "You are an AI assistant trained to generate relevant and engaging article titles based on a set of keywords. Generate a title using the following keywords."
+BATCHED_TITLE_SYSTEM_PROMPT = "You are an AI assistant trained to generate relevant and engaging article titles based on sets of keywords. You will receive numbered keyword sets. Generate exactly one title per keyword set.\n\nYour response must be a JSON array of strings with one title per keyword set, in the same order as the keyword sets. Do not add anything else to the response."
+
+
+class TitleGenerator:
+    def keywords_to_str(keywords):
+        # Keywords are (keyword, count) pairs from Counter.most_common
+        return ", ".join([keyword[0] for keyword in keywords])
+
+    def generate_title(keywords, user_id):
+        assistant_response = LLMGateway.chat_completion(
+            model=Config.OPENAI_MODEL_GPT4,
+            messages=[
+                {"role": "system", "content": TITLE_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Keywords: {TitleGenerator.keywords_to_str(keywords)}"},
+            ],
+            temperature=0.7,
+            top_p=1,
+            frequency_penalty=0,
+            presence_penalty=0,
+            user=str(user_id),
+        )
+
+        # Extract and format the title
+        title = assistant_response["choices"][0]["message"]["content"].strip()
+        total_tokens = assistant_response['usage']['total_tokens']
+        return title, total_tokens
+
+    def parse_batched_titles(text, expected_count):
+        titles = None
+
+        # Preferred format is a JSON array, possibly wrapped in prose or a code block
+        array_match = re.search(r'\[[\s\S]*\]', text)
+        if array_match:
+            try:
+                parsed = json.loads(array_match.group(0))
+                if isinstance(parsed, list) and all(isinstance(title, str) for title in parsed):
+                    titles = parsed
+            except ValueError:
+                titles = None
+
+        # Fallback to a numbered list such as "1. Title"
+        if titles is None:
+            titles = [
+                match.group(1)
+                for match in re.finditer(r'^\s*\d+[.)]\s*(.+?)\s*$', text, flags=re.MULTILINE)
+            ]
+
+        titles = [title.strip() for title in titles if title.strip()]
+        if len(titles) != expected_count:
+            raise ValueError(f"Expected {expected_count} titles, got {len(titles)}")
+
+        return titles
+
+    def generate_titles_batched(keyword_clusters, user_id):
+        keyword_sets = "\n".join(
+            f"{index + 1}. {TitleGenerator.keywords_to_str(keywords)}"
+            for index, keywords in enumerate(keyword_clusters)
+        )
+
+        params = {
+            "model": Config.OPENAI_MODEL_GPT4,
+            "messages": [
+                {"role": "system", "content": BATCHED_TITLE_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Keyword sets:\n{keyword_sets}"},
+            ],
+            "temperature": 0.7,
+            "top_p": 1,
+            "frequency_penalty": 0,
+            "presence_penalty": 0,
+        }
+        assistant_response = LLMGateway.chat_completion(user=str(user_id), **params)
+
+        # Zero for a cached response
+        total_tokens = assistant_response['usage']['total_tokens']
+        try:
+            titles = TitleGenerator.parse_batched_titles(
+                assistant_response["choices"][0]["message"]["content"],
+                len(keyword_clusters),
+            )
+        except ValueError as e:
+            logger.error("Unable to parse batched titles", metadata={"error": str(e)})
+            # Otherwise every later call would get the same unusable response from the cache
+            LLMGateway.evict_cached("chat_completion", user=str(user_id), **params)
+            titles = None
+
+        return titles, total_tokens
+
+    def generate_titles_per_cluster(keyword_clusters, user_id):
+        with ThreadPoolExecutor() as executor:
+            titles_futures = [executor.submit(Deadline.propagate(TitleGenerator.generate_title), keywords, user_id) for keywords in keyword_clusters]
+            titles_results = [future.result() for future in titles_futures]
+
+        titles = [title for title, _ in titles_results]
+        total_tokens = sum(tokens for _, tokens in titles_results)
+        return titles, total_tokens
+
+    # Returns one title per keyword cluster and the total tokens spent on them.
+    # Batched mode sends every cluster in a single request and falls back to
+    # one request per cluster if the response can not be parsed.
+    def generate_titles(keyword_clusters, user_id):
+        if not keyword_clusters:
+            return [], 0
+
+        spent_tokens = 0
+        if Config.OPENAI_BATCHED_TITLES:
+            titles, spent_tokens = TitleGenerator.generate_titles_batched(keyword_clusters, user_id)
+            if titles is not None:
+                return titles, spent_tokens
+
+        titles, total_tokens = TitleGenerator.generate_titles_per_cluster(keyword_clusters, user_id)
+        return titles, spent_tokens + total_tokens
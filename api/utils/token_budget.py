@@ -0,0 +1,107 @@
+import math
+import threading
+
+from config import Config
+from api.utils import logging_wrapper
+from api.utils.rate_limiter import parse_model_limits
+
+logger = logging_wrapper.Logger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Chat formatting overhead, see the OpenAI cookbook on counting tokens
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+CONTEXT_WINDOWS = parse_model_limits(Config.OPENAI_CONTEXT_WINDOWS)
+
+encodings = {}
+encodings_lock = threading.Lock()
+
+
+class TokenBudget:
+    # Model aware token counting used before calls are made, so prompts fit the
+    # context window and points can be reserved up front. Without tiktoken, or
+    # when its BPE file can not be downloaded (offline and fake backend runs),
+    # the counts fall back to the usual 4 characters per token estimate.
+    def encoding_for(model):
+        if tiktoken is None:
+            return None
+
+        model = model or Config.OPENAI_MODEL
+        with encodings_lock:
+            if model not in encodings:
+                try:
+                    try:
+                        encodings[model] = tiktoken.encoding_for_model(model)
+                    except KeyError:
+                        encodings[model] = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    # tiktoken downloads the encoding on first use, remembered so it is not retried per call
+                    logger.error("Unable to load tiktoken encoding, estimating tokens from characters", metadata={
+                        "model": model,
+                        "error": str(e),
+                    })
+                    encodings[model] = None
+            return encodings[model]
+
+    def count_tokens(text, model=None):
+        if not text:
+            return 0
+
+        encoding = TokenBudget.encoding_for(model)
+        if encoding is None:
+            return math.ceil(len(text) / 4)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_message_tokens(messages, model=None):
+        tokens = TOKENS_PER_REPLY
+        for message in messages:
+            tokens += TOKENS_PER_MESSAGE + TokenBudget.count_tokens(message.get("content") or "", model)
+        return tokens
+
+    def truncate_to_tokens(text, max_tokens, model=None):
+        if max_tokens <= 0 or not text:
+            return ""
+
+        encoding = TokenBudget.encoding_for(model)
+        if encoding is None:
+            return text[:max_tokens * 4]
+
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    def context_window(model):
+        return CONTEXT_WINDOWS.get(model, Config.OPENAI_DEFAULT_CONTEXT_WINDOW)
+
+    def prompt_budget(model, completion_tokens=None):
+        # Whatever the context window has left after reserving the completion
+        completion_tokens = completion_tokens or Config.OPENAI_ESTIMATED_COMPLETION_TOKENS
+        return TokenBudget.context_window(model) - completion_tokens
+
+    def fit_contents(contents, max_tokens, model=None):
+        # contents are {'website': ..., 'content': ...} in rank order. Sources are
+        # kept whole while they fit, the first one that does not is trimmed and
+        # the rest are dropped.
+        fitted_contents = []
+        remaining_tokens = max_tokens
+
+        for content in contents:
+            header_tokens = TokenBudget.count_tokens(content['website'], model) + 2
+            if remaining_tokens - header_tokens <= 0:
+                break
+
+            text = TokenBudget.truncate_to_tokens(content['content'], remaining_tokens - header_tokens, model)
+            fitted_contents.append({**content, 'content': text})
+            remaining_tokens -= header_tokens + TokenBudget.count_tokens(text, model)
+
+        return fitted_contents
+
+    def estimate_points(prompt_tokens, completion_tokens, price_per_1k_tokens):
+        # Same unit as Purchase.points, i.e. hundredths of a dollar
+        return math.ceil((prompt_tokens + completion_tokens) * price_per_1k_tokens / 1000 * 100)
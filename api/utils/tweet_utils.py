@@ -1,36 +1,14 @@
 # pyright: reportMissingImports=false
-import torch
-import spacy
-import fasttext
 import re
 
-from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
 
 from googletrans import Translator
 from summa import keywords as summa_keywords
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, BartForSequenceClassification, BartTokenizer, pipeline
 
 from api.assets.tweet_constants import TweetCategory
-
-# 1. Load pre-trained facebook/bart-large-mnli model for Classification of Topic
-classifier_model_name = "facebook/bart-large-mnli"
-classifier_model = BartForSequenceClassification.from_pretrained(classifier_model_name)
-classifier_tokenizer = BartTokenizer.from_pretrained(classifier_model_name)
-classifier = pipeline("zero-shot-classification", model=classifier_model, tokenizer=classifier_tokenizer)
-
-# 2. Load pre-trained BERT model for sentiment analysis
-sentiment_model_name = "cardiffnlp/twitter-roberta-base-sentiment"
-tokenizer_for_sentiment = AutoTokenizer.from_pretrained(sentiment_model_name)
-model_for_sentiment = AutoModelForSequenceClassification.from_pretrained(sentiment_model_name)
-
-# 4. Load pre-trained SpaCy model for Named Entity Recognition
-nlp = spacy.load("en_core_web_sm")
-
-# 5. Load pre-trained FastText language model for Language detection
-language_model_path = "/home/ubuntu/development/Backend/lid.176.bin"
-language_model = fasttext.load_model(language_model_path)
+from api.utils.model_registry import models
+from api.utils.text_preprocessing import lemmatize, stop_words
 
 
 class TweetUtils:
@@ -63,19 +41,18 @@ class TweetUtils:
         tokens = word_tokenize(text) # Tokenize the text
 
         # Remove only the most common stopwords
-        stop_words = set(stopwords.words('english'))
+        stop = stop_words()
 
-        tokens = [token for token in tokens if token not in stop_words] # Remove important stopwords
+        tokens = [token for token in tokens if token not in stop] # Remove important stopwords
 
-        lemmatizer = WordNetLemmatizer()
-        tokens = [lemmatizer.lemmatize(token) for token in tokens] # Lemmatize the tokens
+        tokens = [lemmatize(token) for token in tokens] # Lemmatize the tokens
 
         preprocessed_text = ' '.join(tokens) # Rejoin the tokens into a single string
         return preprocessed_text
     
     @staticmethod
     def classify_tweet(tweet):
-        result = classifier(tweet, candidate_labels=TweetCategory.all())
+        result = models.get("topic_classifier")(tweet, candidate_labels=TweetCategory.all())
         best_category = result["labels"][0]
         return best_category
     
@@ -83,9 +60,10 @@ class TweetUtils:
     # which is fine-tuned for sentiment analysis on tweets and has three sentiment classes.
     @staticmethod
     def analyze_sentiment(tweet):
+        tokenizer_for_sentiment, model_for_sentiment = models.get("tweet_sentiment")
         inputs = tokenizer_for_sentiment(tweet, return_tensors="pt")
         outputs = model_for_sentiment(**inputs)
-        probabilities = torch.softmax(outputs.logits, dim=1).tolist()[0]
+        probabilities = outputs.logits.softmax(dim=1).tolist()[0]
         sentiment_index = probabilities.index(max(probabilities))
         return ["Negative", "Neutral", "Positive"][sentiment_index]
     
@@ -105,7 +83,7 @@ class TweetUtils:
     # ```
     @staticmethod
     def extract_entities(text):
-        doc = nlp(text)
+        doc = models.get("en_core_web_sm")(text)
         entities = [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
         return entities
     
@@ -113,7 +91,7 @@ class TweetUtils:
     # Define the language detection function
     @staticmethod
     def detect_language(text):
-        predictions = language_model.predict(text)
+        predictions = models.get("language_identifier").predict(text)
         language = predictions[0][0].replace("__label__", "")
         return language
     
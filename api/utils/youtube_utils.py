@@ -1,13 +1,12 @@
 import re
 import datetime
+import concurrent.futures
 
-import openai
-from httpx import HTTPError
+from api.utils.llm_gateway import LLMGateway
+from api.utils.deadline import Deadline, DeadlineExceeded
 from isodate import parse_duration
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-import spacy
 import nltk
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
@@ -18,14 +17,15 @@ from api.models.analysis import Analysis
 from api.models.search_analysis_rel import SearchAnalysisRel
 
 from api.models.search_query import SearchQuery
-from api.utils.db import add_commit_
+from api.utils.db import add_commit_, add_flush_, commit_
+from api.utils.google_clients import google_clients
+from api.utils.text_preprocessing import TextPreprocessor
 from api.assets import constants
 
 from config import Config
 from api.utils import logging_wrapper
 
 logger = logging_wrapper.Logger(__name__)
-nlp = spacy.load("en_core_web_sm", disable=["parser", "ner"])
 
 class YotubeSEOUtils:
     def generate_youtube_search_text_gpt4(user, business_type, target_audience, industry, location):
@@ -40,7 +40,7 @@ class YotubeSEOUtils:
                 "content": f"User Input\n```\nBusiness type: {business_type}\nTarget audience: {target_audience}\nIndustry: {industry}\nLocation: {location}\n```"
             }
 
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL_GPT4,
                 messages=[system_prompt, user_prompt],
                 temperature=0.7,
@@ -53,6 +53,8 @@ class YotubeSEOUtils:
             # Extract and format search queries as an array
             search_queries = assistant_response["choices"][0]["message"]["content"].strip().split("\n")
             return search_queries
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.exception(str(e))
             return None
@@ -60,115 +62,169 @@ class YotubeSEOUtils:
     # Uses Youtube V3 API for search based on user Input
     # The current form of Query for Search is:
     #   "{business_type} {target_audience} {industry} {goals}"
-    def youtube_search(app, query_arr, seo_id, max_results=5):
-        with app.app_context():
-            youtube = build('youtube', 'v3', developerKey=Config.GOOGLE_SEARCH_API_KEY)
-
-            video_response = []
-            video_ids = []
-
-            # Calculate date one year ago from today
-            one_year_ago = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime('%Y-%m-%dT%H:%M:%SZ')
-
-            for query in query_arr:
-                try:
-                    search_model = SearchQuery.query.filter(
-                        SearchQuery.search_query == query,
-                        SearchQuery.seo_project_id == seo_id,
-                        SearchQuery.type == constants.ProjectTypeCons.enum_youtube,
-                    ).first()
-
-                    if search_model is None:
-                        search_model = SearchQuery(
-                            search_query=query,
-                            seo_project_id=seo_id,
-                            type=constants.ProjectTypeCons.enum_youtube,
-                        )
-                        add_commit_(search_model)
-
-                    search_response = youtube.search().list(
-                        q=query,
-                        part="id,snippet",
-                        maxResults=max_results,
-                        type='video',
-                        videoDefinition='high',
-                        order='viewCount',
-                        publishedAfter=one_year_ago
-                    ).execute()
-
-                    for search_result in search_response.get("items", []):
-                        if search_result["id"]["kind"] == "youtube#video":
-                            video_id = search_result["id"]["videoId"]
-                            if video_id in video_ids:
-                                continue
-
-                            video_info = youtube.videos().list(
-                                part="snippet,statistics,contentDetails",
-                                id=video_id
-                            ).execute()["items"][0]
-
-                            video_url = f"https://www.youtube.com/watch?v={video_id}"
-                            thumbnail_url = search_result["snippet"]["thumbnails"]["default"]["url"]
-                            video_duration = parse_duration(video_info["contentDetails"]["duration"]).total_seconds()
-
-                            video_model = Analysis.query.filter(Analysis.video_id == video_id).first()
-
-                            if video_model is None:
-                                video_model = Analysis(
-                                    type=constants.ProjectTypeCons.enum_youtube,
-                                    video_id=video_id,
-                                    video_url=video_url,
-                                    thumbnail_url=thumbnail_url,
-                                    video_duration=video_duration,
-                                    title=search_result["snippet"]["title"],
-                                    description=video_info["snippet"]["description"],
-                                    channel_title=search_result["snippet"]["channelTitle"],
-                                    publish_date=video_info["snippet"]["publishedAt"],
-                                    views=int(video_info["statistics"].get("viewCount", "-1")),
-                                    likes_count=int(video_info["statistics"].get("likeCount", "-1")),
-                                    comments_count=int(video_info["statistics"].get("commentCount", "-1"))
-                                )
-                                add_commit_(video_model)
-
-                            # Check if the video already exists in the video_response list
-                            if video_model not in video_response:
-                                video_response.append(video_model)
-
-                            search_video_rel_model = SearchAnalysisRel.query.filter(
-                                SearchAnalysisRel.search_query_id == search_model.id,
-                                SearchAnalysisRel.analysis_id == video_model.id
-                            ).first()
-
-                            if search_video_rel_model is None:
-                                search_video_rel_model = SearchAnalysisRel(
-                                    search_query_id=search_model.id,
-                                    analysis_id=video_model.id,
-                                )
-                                add_commit_(search_video_rel_model)
-
-                            video_ids.append(video_id)
-
-                except HTTPError as e:
-                    logger.exception(str(e))
-                    return []
-
-            return video_response
-
-    def preprocess_text(text):
-        doc = nlp(text)
-        filtered_tokens = [token.text.lower() for token in doc if token.is_alpha and not token.is_stop]
-        return filtered_tokens
+    #
+    # All queries are searched first, then the details of every distinct
+    # video are fetched in batches of 50 ids and the rows are written in one
+    # transaction. Runs in the caller's request context and session.
+    def youtube_search(query_arr, seo_id, max_results=5):
+        search_models = YotubeSEOUtils.get_or_create_search_models(query_arr, seo_id)
+
+        def search(query):
+            # A failing query is logged and skipped, the others still count
+            try:
+                return YotubeSEOUtils.search_videos(query, max_results)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                logger.exception(str(e))
+                return []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(query_arr), 8) or 1) as executor:
+            search_items = list(executor.map(Deadline.propagate(search), query_arr))
+
+        # Distinct videos in search order, and the queries that found each of them
+        search_results = {}
+        video_queries = {}
+        for query, items in zip(query_arr, search_items):
+            for search_result in items:
+                if search_result["id"]["kind"] != "youtube#video":
+                    continue
+                video_id = search_result["id"]["videoId"]
+                search_results.setdefault(video_id, search_result)
+                video_queries.setdefault(video_id, []).append(query)
+
+        if not search_results:
+            return []
+
+        video_infos = YotubeSEOUtils.fetch_video_details(list(search_results))
+
+        video_models = {
+            video_model.video_id: video_model
+            for video_model in Analysis.query.filter(Analysis.video_id.in_(list(search_results))).all()
+        }
+
+        new_video_models = []
+        for video_id, search_result in search_results.items():
+            video_info = video_infos.get(video_id)
+            if video_id in video_models or video_info is None:
+                continue
+
+            video_model = Analysis(
+                type=constants.ProjectTypeCons.enum_youtube,
+                video_id=video_id,
+                video_url=f"https://www.youtube.com/watch?v={video_id}",
+                thumbnail_url=search_result["snippet"]["thumbnails"]["default"]["url"],
+                video_duration=parse_duration(video_info["contentDetails"]["duration"]).total_seconds(),
+                title=search_result["snippet"]["title"],
+                description=video_info["snippet"]["description"],
+                channel_title=search_result["snippet"]["channelTitle"],
+                publish_date=video_info["snippet"]["publishedAt"],
+                views=int(video_info["statistics"].get("viewCount", "-1")),
+                likes_count=int(video_info["statistics"].get("likeCount", "-1")),
+                comments_count=int(video_info["statistics"].get("commentCount", "-1"))
+            )
+            video_models[video_id] = video_model
+            new_video_models.append(video_model)
+
+        # Flush to get ids for the new rows, relations go into the same commit
+        add_flush_(new_video_models)
+
+        analysis_ids = [video_model.id for video_model in video_models.values()]
+        search_query_ids = [search_model.id for search_model in search_models.values()]
+        existing_rels = {
+            (rel.search_query_id, rel.analysis_id)
+            for rel in SearchAnalysisRel.query.filter(
+                SearchAnalysisRel.search_query_id.in_(search_query_ids),
+                SearchAnalysisRel.analysis_id.in_(analysis_ids),
+            ).all()
+        }
+
+        new_rels = []
+        for video_id, queries in video_queries.items():
+            video_model = video_models.get(video_id)
+            if video_model is None:
+                continue
+            for query in queries:
+                key = (search_models[query].id, video_model.id)
+                if key not in existing_rels:
+                    existing_rels.add(key)
+                    new_rels.append(SearchAnalysisRel(search_query_id=key[0], analysis_id=key[1]))
+
+        add_flush_(new_rels)
+        commit_()
+
+        return [video_models[video_id] for video_id in search_results if video_id in video_models]
+
+    def get_or_create_search_models(query_arr, seo_id):
+        search_models = {
+            search_model.search_query: search_model
+            for search_model in SearchQuery.query.filter(
+                SearchQuery.search_query.in_(query_arr),
+                SearchQuery.seo_project_id == seo_id,
+                SearchQuery.type == constants.ProjectTypeCons.enum_youtube,
+            ).all()
+        }
+
+        new_search_models = []
+        for query in query_arr:
+            if query not in search_models:
+                search_models[query] = SearchQuery(
+                    search_query=query,
+                    seo_project_id=seo_id,
+                    type=constants.ProjectTypeCons.enum_youtube,
+                )
+                new_search_models.append(search_models[query])
+
+        add_commit_(new_search_models)
+        return search_models
+
+    def search_videos(query, max_results):
+        youtube = google_clients.youtube()
+
+        # Calculate date one year ago from today
+        one_year_ago = (datetime.datetime.now() - datetime.timedelta(days=365)).strftime('%Y-%m-%dT%H:%M:%SZ')
 
-    def yotube_video_keywords_extraction(video_data):
-        title_documents = []
-        description_documents = []
+        try:
+            search_response = youtube.search().list(
+                q=query,
+                part="id,snippet",
+                maxResults=max_results,
+                type='video',
+                videoDefinition='high',
+                order='viewCount',
+                publishedAfter=one_year_ago
+            ).execute()
+        except HttpError as e:
+            logger.exception(str(e))
+            return []
+
+        return search_response.get("items", [])
 
-        for video in video_data:
-            title_tokens = YotubeSEOUtils.preprocess_text(video.title)
-            description_tokens = YotubeSEOUtils.preprocess_text(video.description)
-            title_documents.append(title_tokens)
-            description_documents.append(description_tokens)
+    def fetch_video_details(video_ids):
+        youtube = google_clients.youtube()
+        video_infos = {}
 
+        # videos().list accepts at most 50 ids per call
+        for i in range(0, len(video_ids), 50):
+            try:
+                videos_response = youtube.videos().list(
+                    part="snippet,statistics,contentDetails",
+                    id=",".join(video_ids[i:i + 50]),
+                    maxResults=50,
+                ).execute()
+            except HttpError as e:
+                logger.exception(str(e))
+                continue
+
+            for video_info in videos_response.get("items", []):
+                video_infos[video_info["id"]] = video_info
+
+        return video_infos
+
+    def yotube_video_keywords_extraction(video_data):
+        # Titles and descriptions go through spaCy in batches, not one call per text
+        title_documents = TextPreprocessor.spacy_tokens([video.title for video in video_data])
+        description_documents = TextPreprocessor.spacy_tokens([video.description for video in video_data])
         return title_documents, description_documents
 
     def compute_tfidf_matrix(documents):
@@ -261,7 +317,7 @@ class YotubeSEOUtils:
                 "content": f"Keywords: {keywords_str}"
             }
 
-            assistant_response = openai.ChatCompletion.create(
+            assistant_response = LLMGateway.chat_completion(
                 model=Config.OPENAI_MODEL_GPT4,
                 messages=[system_prompt, user_prompt],
                 temperature=0.7,
@@ -274,5 +330,7 @@ class YotubeSEOUtils:
             # Extract and format search queries as an array
             search_queries = assistant_response["choices"][0]["message"]["content"].strip().split("\n")
             return search_queries
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return None
\ No newline at end of file
@@ -14,7 +14,12 @@ from flask import Flask, Response, request
 
 from api.models import db
 from api.utils import logging_wrapper
+from api.utils.deadline import Deadline
 from api.utils.error_classes import BaseClientError
+from api.utils.rate_limiter import rate_limiter
+from api.utils.model_registry import models
+from api.utils.semantic_cache import SemanticCache
+from api.utils.search_cache import search_cache
 from api.routes.home import bp as home_bp
 from api.routes.user import bp as user_bp
 from api.routes.dashboard import bp as dashboard_bp
@@ -57,6 +62,17 @@ app.json_encoder = JsonEncoder
 CORS(app)
 
 
+@app.before_request
+def start_request_deadline():
+    Deadline.start(Config.REQUEST_DEADLINE_SECONDS)
+
+
+@app.teardown_request
+def clear_request_deadline(exception=None):
+    # Worker threads are reused across requests
+    Deadline.clear()
+
+
 @app.errorhandler(ValidationError)
 def handle_marshmallow_validation(error):
     if isinstance(error.messages, list):
@@ -100,6 +116,44 @@ def requires_basic_auth(f):
     return decorated
 
 
+@app.route("/internal/metrics/openai", methods=["GET"])
+@requires_basic_auth
+def openai_metrics():
+    return {
+        "success": True,
+        "rate_limiter": rate_limiter.stats(),
+    }
+
+
+@app.route("/internal/metrics/search", methods=["GET"])
+@requires_basic_auth
+def search_metrics():
+    return {
+        "success": True,
+        "search_cache": search_cache.stats(),
+    }
+
+
+@app.route("/internal/metrics/models", methods=["GET"])
+@requires_basic_auth
+def model_metrics():
+    # Per worker, every gunicorn worker has its own registry
+    return {
+        "success": True,
+        "models": models.stats(),
+    }
+
+
+@app.route("/internal/semantic-cache/rebuild", methods=["POST"])
+@requires_basic_auth
+def rebuild_semantic_cache():
+    # Rebuilds the index of the worker that serves this request
+    return {
+        "success": True,
+        "rows": SemanticCache.rebuild(),
+    }
+
+
 app.config["SWAGGER"] = {
     "title": "Backend APIs",
     "uiversion": 3,
@@ -122,6 +176,9 @@ app.register_blueprint(dashboard_bp)
 app.register_blueprint(analysis_bp)
 app.register_blueprint(content_bp)
 
+# Under gunicorn --preload this runs in the master, before the workers fork
+models.preload(Config.MODEL_PRELOAD)
+
 swagger = Swagger(
     app,
     decorators=[requires_basic_auth],
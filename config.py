@@ -20,6 +20,145 @@ class Config:
     OPENAI_API_KEY = environ.get("OPENAI_API_KEY")
     OPENAI_MODEL = environ.get("OPENAI_MODEL")
     OPENAI_MODEL_GPT4 = environ.get("OPENAI_MODEL_GPT4")
+
+    # LLM response cache
+    LLM_CACHE_ENABLED = environ.get("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(environ.get("LLM_CACHE_MAX_ENTRIES", 2048))
+    LLM_CACHE_DEFAULT_TTL = int(environ.get("LLM_CACHE_DEFAULT_TTL", 7 * 24 * 60 * 60))
+    LLM_CACHE_PATH = environ.get("LLM_CACHE_PATH") or path.join(basedir, ".cache", "llm_cache.sqlite3")
+
+    # Generate all cluster titles in one request instead of one request per cluster
+    OPENAI_BATCHED_TITLES = environ.get("OPENAI_BATCHED_TITLES", "true").lower() == "true"
+
+    # Outbound OpenAI limits, per model budgets are "model:limit" pairs separated by commas
+    OPENAI_MAX_CONCURRENCY = int(environ.get("OPENAI_MAX_CONCURRENCY", 16))
+    OPENAI_RPM_LIMITS = environ.get("OPENAI_RPM_LIMITS", "gpt-4:200,gpt-3.5-turbo:3500,text-davinci-003:3000")
+    OPENAI_TPM_LIMITS = environ.get("OPENAI_TPM_LIMITS", "gpt-4:40000,gpt-3.5-turbo:90000,text-davinci-003:250000")
+    OPENAI_DEFAULT_RPM = int(environ.get("OPENAI_DEFAULT_RPM", 3000))
+    OPENAI_DEFAULT_TPM = int(environ.get("OPENAI_DEFAULT_TPM", 90000))
+    OPENAI_ESTIMATED_COMPLETION_TOKENS = int(environ.get("OPENAI_ESTIMATED_COMPLETION_TOKENS", 512))
+    # Dollars charged per 1k tokens of content generation, reserved up front and settled after
+    OPENAI_GENERATION_PRICE_PER_1K_TOKENS = float(environ.get("OPENAI_GENERATION_PRICE_PER_1K_TOKENS", 0.03))
+    RATE_LIMITER_REDIS_URL = environ.get("RATE_LIMITER_REDIS_URL")
+
+    # Deadlines and retries, keep REQUEST_DEADLINE_SECONDS below the gunicorn worker timeout
+    REQUEST_DEADLINE_SECONDS = float(environ.get("REQUEST_DEADLINE_SECONDS", 110))
+    STREAM_DEADLINE_SECONDS = float(environ.get("STREAM_DEADLINE_SECONDS", 300))
+    LLM_REQUEST_TIMEOUT = float(environ.get("LLM_REQUEST_TIMEOUT", 60))
+    LLM_MAX_RETRIES = int(environ.get("LLM_MAX_RETRIES", 3))
+    LLM_RETRY_BASE_DELAY = float(environ.get("LLM_RETRY_BASE_DELAY", 0.5))
+    LLM_RETRY_MAX_DELAY = float(environ.get("LLM_RETRY_MAX_DELAY", 8))
+    LLM_HEDGE_ENABLED = environ.get("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(environ.get("LLM_HEDGE_PERCENTILE", 95))
+
+    # Prompt budgeting, prompts are trimmed to the context window minus the expected completion
+    OPENAI_CONTEXT_WINDOWS = environ.get("OPENAI_CONTEXT_WINDOWS", "gpt-4:8192,gpt-4-32k:32768,gpt-3.5-turbo:4096,gpt-3.5-turbo-16k:16384,text-davinci-003:4097")
+    OPENAI_DEFAULT_CONTEXT_WINDOW = int(environ.get("OPENAI_DEFAULT_CONTEXT_WINDOW", 4096))
+    WEB_CONTENT_MAX_TOKENS = int(environ.get("WEB_CONTENT_MAX_TOKENS", 1000))
+
+    # Shared HTTP client for search APIs and scraping
+    HTTP_CONNECT_TIMEOUT = float(environ.get("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(environ.get("HTTP_READ_TIMEOUT", 10))
+    HTTP_POOL_CONNECTIONS = int(environ.get("HTTP_POOL_CONNECTIONS", 64))
+    HTTP_POOL_MAXSIZE = int(environ.get("HTTP_POOL_MAXSIZE", 32))
+    HTTP_MAX_RETRIES = int(environ.get("HTTP_MAX_RETRIES", 2))
+    HTTP_USER_AGENT = environ.get("HTTP_USER_AGENT", "Mozilla/5.0 (compatible; KeywordIQBot/1.0)")
+
+    # Disk cache of scraped pages, revalidated with conditional requests
+    PAGE_CACHE_ENABLED = environ.get("PAGE_CACHE_ENABLED", "true").lower() == "true"
+    PAGE_CACHE_PATH = environ.get("PAGE_CACHE_PATH") or path.join(basedir, ".cache", "page_cache.sqlite3")
+    PAGE_CACHE_MAX_BYTES = int(environ.get("PAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    PAGE_CACHE_MAX_ENTRY_BYTES = int(environ.get("PAGE_CACHE_MAX_ENTRY_BYTES", 5 * 1024 * 1024))
+    PAGE_CACHE_DEFAULT_TTL = int(environ.get("PAGE_CACHE_DEFAULT_TTL", 6 * 60 * 60))
+
+    # Directory of "{api}.{version}.json" discovery documents, overrides the ones bundled with googleapiclient
+    GOOGLE_DISCOVERY_DIR = environ.get("GOOGLE_DISCOVERY_DIR")
+
+    # Google Places detail lookups
+    PLACES_MAX_WORKERS = int(environ.get("PLACES_MAX_WORKERS", 8))
+    PLACES_DETAILS_CACHE_ENABLED = environ.get("PLACES_DETAILS_CACHE_ENABLED", "true").lower() == "true"
+    PLACES_DETAILS_CACHE_PATH = environ.get("PLACES_DETAILS_CACHE_PATH") or path.join(basedir, ".cache", "places_cache.sqlite3")
+    PLACES_DETAILS_CACHE_TTL = int(environ.get("PLACES_DETAILS_CACHE_TTL", 7 * 24 * 60 * 60))
+
+    # Google Custom Search response cache, TTLs in seconds per vertical, 0 disables
+    SEARCH_CACHE_ENABLED = environ.get("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_PATH = environ.get("SEARCH_CACHE_PATH") or path.join(basedir, ".cache", "search_cache.sqlite3")
+    SEARCH_CACHE_MAX_ENTRIES = int(environ.get("SEARCH_CACHE_MAX_ENTRIES", 2048))
+    SEARCH_CACHE_TTL_NEWS = int(environ.get("SEARCH_CACHE_TTL_NEWS", 15 * 60))
+    SEARCH_CACHE_TTL_WEB = int(environ.get("SEARCH_CACHE_TTL_WEB", 6 * 60 * 60))
+    SEARCH_CACHE_TTL_COMPETITORS = int(environ.get("SEARCH_CACHE_TTL_COMPETITORS", 7 * 24 * 60 * 60))
+
+    # Offline GeoIP, a MaxMind country database (GeoLite2-Country.mmdb). Without one every lookup goes to ip-api.com,
+    # GEOIP_REMOTE_FALLBACK also sends IPs the database has no record for
+    GEOIP_DATABASE_PATH = environ.get("GEOIP_DATABASE_PATH") or path.join(basedir, ".cache", "GeoLite2-Country.mmdb")
+    GEOIP_REMOTE_FALLBACK = environ.get("GEOIP_REMOTE_FALLBACK", "false").lower() == "true"
+    GEOIP_CACHE_SIZE = int(environ.get("GEOIP_CACHE_SIZE", 50000))
+    GEOIP_CACHE_TTL = int(environ.get("GEOIP_CACHE_TTL", 24 * 60 * 60))
+
+    # HTML extraction, engine is auto, selectolax, lxml or html.parser
+    HTML_EXTRACTOR_ENGINE = environ.get("HTML_EXTRACTOR_ENGINE", "auto")
+    HTML_MAX_BYTES = int(environ.get("HTML_MAX_BYTES", 2 * 1024 * 1024))
+    MAIN_CONTENT_MIN_CHARS = int(environ.get("MAIN_CONTENT_MIN_CHARS", 250))
+
+    # Crawler politeness and budgets
+    CRAWL_MAX_WORKERS = int(environ.get("CRAWL_MAX_WORKERS", 32))
+    CRAWL_MAX_CONCURRENCY = int(environ.get("CRAWL_MAX_CONCURRENCY", 8))
+    CRAWL_PER_HOST_CONCURRENCY = int(environ.get("CRAWL_PER_HOST_CONCURRENCY", 2))
+    CRAWL_PER_HOST_DELAY = float(environ.get("CRAWL_PER_HOST_DELAY", 1))
+    CRAWL_FETCH_BUDGET = int(environ.get("CRAWL_FETCH_BUDGET", 10))
+    CRAWL_TIME_BUDGET = float(environ.get("CRAWL_TIME_BUDGET", 15))
+
+    # Crawl governor, per host rate shared by all workers and robots.txt rules
+    CRAWL_GOVERNOR_ENABLED = environ.get("CRAWL_GOVERNOR_ENABLED", "true").lower() == "true"
+    CRAWL_GOVERNOR_REDIS_URL = environ.get("CRAWL_GOVERNOR_REDIS_URL") or environ.get("RATE_LIMITER_REDIS_URL")
+    CRAWL_GOVERNOR_PATH = environ.get("CRAWL_GOVERNOR_PATH") or path.join(basedir, ".cache", "crawl_governor.sqlite3")
+    CRAWL_GOVERNOR_MAX_WAIT = float(environ.get("CRAWL_GOVERNOR_MAX_WAIT", 10))
+    CRAWL_HOST_RATE = float(environ.get("CRAWL_HOST_RATE", 1))
+    CRAWL_HOST_BURST = int(environ.get("CRAWL_HOST_BURST", 3))
+    CRAWL_ROBOTS_USER_AGENT = environ.get("CRAWL_ROBOTS_USER_AGENT", "KeywordIQBot")
+    ROBOTS_CACHE_TTL = int(environ.get("ROBOTS_CACHE_TTL", 24 * 60 * 60))
+    ROBOTS_CACHE_ERROR_TTL = int(environ.get("ROBOTS_CACHE_ERROR_TTL", 5 * 60))
+
+    # User supplied research and competition URLs
+    USER_URLS_MAX = int(environ.get("USER_URLS_MAX", 10))
+    USER_URLS_TIME_BUDGET = float(environ.get("USER_URLS_TIME_BUDGET", 15))
+    USER_URL_MAX_TEXT_CHARS = int(environ.get("USER_URL_MAX_TEXT_CHARS", 20000))
+
+    # Social media generation pipeline
+    PIPELINE_MAX_WORKERS = int(environ.get("PIPELINE_MAX_WORKERS", 32))
+    SPECULATIVE_SEARCH_ENABLED = environ.get("SPECULATIVE_SEARCH_ENABLED", "false").lower() == "true"
+
+    # Semantic cache over earlier content, SEMANTIC_CACHE_SCOPE is "user" or "global"
+    SEMANTIC_CACHE_ENABLED = environ.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_SCOPE = environ.get("SEMANTIC_CACHE_SCOPE", "user").lower()
+    SEMANTIC_CACHE_DRAFT_THRESHOLD = float(environ.get("SEMANTIC_CACHE_DRAFT_THRESHOLD", 0.95))
+    SEMANTIC_CACHE_FEW_SHOT_THRESHOLD = float(environ.get("SEMANTIC_CACHE_FEW_SHOT_THRESHOLD", 0.75))
+    SEMANTIC_CACHE_MAX_ROWS = int(environ.get("SEMANTIC_CACHE_MAX_ROWS", 100000))
+    SEMANTIC_CACHE_REFRESH_SECONDS = int(environ.get("SEMANTIC_CACHE_REFRESH_SECONDS", 60))
+
+    # Local opinion classifier, trained from logged LLM decisions
+    OPINION_CLASSIFIER_CONFIDENCE = float(environ.get("OPINION_CLASSIFIER_CONFIDENCE", 0.85))
+    OPINION_CLASSIFIER_MIN_SAMPLES = int(environ.get("OPINION_CLASSIFIER_MIN_SAMPLES", 200))
+    OPINION_CLASSIFIER_MAX_SAMPLES = int(environ.get("OPINION_CLASSIFIER_MAX_SAMPLES", 50000))
+    OPINION_CLASSIFIER_RETRAIN_SECONDS = int(environ.get("OPINION_CLASSIFIER_RETRAIN_SECONDS", 3600))
+    OPINION_CLASSIFIER_MEMO_SIZE = int(environ.get("OPINION_CLASSIFIER_MEMO_SIZE", 10000))
+
+    # NLP models, loaded on first use, MODEL_PRELOAD names the ones loaded at startup (run gunicorn with --preload)
+    MODEL_PRELOAD = [name.strip() for name in environ.get("MODEL_PRELOAD", "").split(",") if name.strip()]
+    SENTENCE_ENCODER_URL = environ.get("SENTENCE_ENCODER_URL") or "https://tfhub.dev/google/universal-sentence-encoder/4"
+    FASTTEXT_LANGUAGE_MODEL_PATH = environ.get("FASTTEXT_LANGUAGE_MODEL_PATH") or "/home/ubuntu/development/Backend/lid.176.bin"
+
+    # "openai" or "fake", the fake backend replays recorded fixtures or synthesizes responses
+    LLM_BACKEND = environ.get("LLM_BACKEND", "openai").lower()
+    OPENAI_API_BASE = environ.get("OPENAI_API_BASE")
+    LLM_FAKE_MODE = environ.get("LLM_FAKE_MODE", "synthetic").lower()
+    LLM_FAKE_FIXTURES_PATH = environ.get("LLM_FAKE_FIXTURES_PATH")
+    LLM_RECORD_FIXTURES_PATH = environ.get("LLM_RECORD_FIXTURES_PATH")
+    LLM_FAKE_LATENCY_MEDIAN_MS = float(environ.get("LLM_FAKE_LATENCY_MEDIAN_MS", 1500))
+    LLM_FAKE_LATENCY_P95_MS = float(environ.get("LLM_FAKE_LATENCY_P95_MS", 6000))
+    LLM_FAKE_TOKEN_LATENCY_MS = float(environ.get("LLM_FAKE_TOKEN_LATENCY_MS", 30))
+    LLM_FAKE_COMPLETION_TOKENS = int(environ.get("LLM_FAKE_COMPLETION_TOKENS", 300))
+    LLM_FAKE_SEED = environ.get("LLM_FAKE_SEED") or None
     
     SQLALCHEMY_ECHO_DB_COMMANDS = bool(
         environ.get("SQLALCHEMY_ECHO_DB_COMMANDS", False)
@@ -46,6 +185,14 @@ class Config:
     REDDIT_CLIENT_SECRET=environ.get("REDDIT_CLIENT_SECRET")
     REDDIT_USER_AGENT=environ.get("REDDIT_USER_AGENT")
 
+    # Subreddit snapshots, refreshed incrementally
+    REDDIT_CACHE_ENABLED = environ.get("REDDIT_CACHE_ENABLED", "true").lower() == "true"
+    REDDIT_CACHE_PATH = environ.get("REDDIT_CACHE_PATH") or path.join(basedir, ".cache", "reddit_cache.sqlite3")
+    REDDIT_SNAPSHOT_REFRESH_SECONDS = int(environ.get("REDDIT_SNAPSHOT_REFRESH_SECONDS", 6 * 60 * 60))
+    REDDIT_SNAPSHOT_MAX_AGE = int(environ.get("REDDIT_SNAPSHOT_MAX_AGE", 7 * 24 * 60 * 60))
+    REDDIT_MAX_COMMENTS_PER_POST = int(environ.get("REDDIT_MAX_COMMENTS_PER_POST", 100))
+    REDDIT_MAX_WORKERS = int(environ.get("REDDIT_MAX_WORKERS", 8))
+
     SWAGGER_EMAIL = environ.get("SWAGGER_EMAIL")
     SWAGGER_USERNAME = environ.get("SWAGGER_USERNAME")
     SWAGGER_PASSWORD = environ.get("SWAGGER_PASSWORD")
\ No newline at end of file
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# logging_wrapper reads logging_config.json and writes to ./logs, relative to the working directory
+os.chdir(ROOT)
+os.makedirs("logs", exist_ok=True)
+
+from api.utils.deadline import Deadline  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def no_deadline():
+    # Code under test may start a request deadline, it must not leak into the next test
+    Deadline.clear()
+    yield
+    Deadline.clear()
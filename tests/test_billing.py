@@ -0,0 +1,191 @@
+from types import SimpleNamespace
+
+import pytest
+
+flask = pytest.importorskip("flask")
+dashboard = pytest.importorskip("api.controllers.dashboard")
+
+from api.utils import semantic_cache
+from api.utils.token_budget import TokenBudget
+
+
+PROCESSED_INPUT = {
+    "topic": "Remote work",
+    "platform": "LINKEDIN",
+    "length": "SHORT",
+    "urls": [],
+    "url_contents": [],
+}
+
+ASSISTANT_RESPONSE = {
+    "choices": [{"message": {"content": "Post"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 600, "completion_tokens": 400, "total_tokens": 1000},
+}
+
+
+class ContentData:
+    def __init__(self, **fields):
+        self.id = 1
+        self.user_id = fields["user"].id
+        self.model_response = None
+        self.status = None
+
+
+class FakeContentDataModel:
+    def create_content_data(**fields):
+        return ContentData(**fields)
+
+    def update_content_model_after_successful_ai_response(assistant_response, content_data):
+        content_data.model_response = assistant_response["choices"][0]["message"]["content"]
+        content_data.status = "SUCCESS"
+
+    def update_content_model_after_failed_ai_response(content_data):
+        content_data.status = "ERROR"
+
+
+class FakeStream:
+    def __iter__(self):
+        yield "Po"
+        yield "st"
+
+    def to_response(self):
+        return ASSISTANT_RESPONSE
+
+
+@pytest.fixture
+def purchase(monkeypatch):
+    purchase = SimpleNamespace(points=1000)
+    user = SimpleNamespace(id=7, name="Sam")
+
+    monkeypatch.setattr(TokenBudget, "encoding_for", lambda model: None)
+    monkeypatch.setattr(dashboard, "commit_", lambda: None)
+    monkeypatch.setattr(dashboard, "db", SimpleNamespace(session=SimpleNamespace(rollback=lambda: None)))
+    monkeypatch.setattr(dashboard, "is_user_have_sufficient_points", lambda user_id: (True, purchase))
+    monkeypatch.setattr(dashboard, "preprocess_social_media_input", lambda *args: (None, dict(PROCESSED_INPUT)))
+    monkeypatch.setattr(dashboard.SemanticCache, "lookup", lambda *args, **kwargs: (None, None))
+    monkeypatch.setattr(dashboard.Config, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(dashboard, "build_social_media_messages", lambda *args: (False, None, "System", "User", 0.0))
+    monkeypatch.setattr(dashboard, "ContentDataModel", FakeContentDataModel)
+    monkeypatch.setattr(dashboard.GeneratorModels, "generate_content", lambda *args: (ASSISTANT_RESPONSE, 1000))
+    monkeypatch.setattr(dashboard.GeneratorModels, "stream_content", lambda *args: FakeStream())
+    monkeypatch.setattr(dashboard.Instructor, "handle_chat_instruction_for_social_media", lambda *args: None)
+    monkeypatch.setattr(dashboard.Socket, "create_room_for_content", lambda *args: None)
+
+    purchase.user = user
+    # The stream variant needs a request context to stream with
+    with flask.Flask(__name__).test_request_context():
+        yield purchase
+
+
+def generate(purchase):
+    return dashboard.generate_content_for_social_media(
+        user=purchase.user,
+        topic="Remote work",
+        platform="LINKEDIN",
+        keywords=None,
+        length="SHORT",
+        urls=[],
+        user_ip="127.0.0.1",
+    )
+
+
+def generate_stream(purchase, events=None):
+    stream = dashboard.generate_content_for_social_media_stream(
+        user=purchase.user,
+        topic="Remote work",
+        platform="LINKEDIN",
+        keywords=None,
+        length="SHORT",
+        urls=[],
+        user_ip="127.0.0.1",
+    )
+    chunks = iter(stream.response)
+    return [chunk for _, chunk in zip(range(events or 1000), chunks)], chunks
+
+
+# 1000 tokens at the default 0.03 dollars per 1k tokens, in hundredths of a dollar
+GENERATION_COST = 3
+
+
+def test_generation_price_comes_from_config(monkeypatch):
+    monkeypatch.setattr(TokenBudget, "encoding_for", lambda model: None)
+    monkeypatch.setattr(dashboard.Config, "OPENAI_ESTIMATED_COMPLETION_TOKENS", 1000 - 6 - 8)
+
+    # "System" and "User" are 2 tokens each plus 3 + 2 * 4 of chat overhead
+    monkeypatch.setattr(dashboard.Config, "OPENAI_GENERATION_PRICE_PER_1K_TOKENS", 0.03)
+    assert dashboard.estimate_generation_points("System", "User") == 3
+
+    monkeypatch.setattr(dashboard.Config, "OPENAI_GENERATION_PRICE_PER_1K_TOKENS", 0.06)
+    assert dashboard.estimate_generation_points("System", "User") == 6
+
+
+def test_reserve_and_settle(monkeypatch):
+    monkeypatch.setattr(dashboard, "commit_", lambda: None)
+    purchase = SimpleNamespace(points=10)
+
+    assert dashboard.reserve_points(purchase, 20) is False
+    assert purchase.points == 10
+
+    assert dashboard.reserve_points(purchase, 8) is True
+    assert purchase.points == 2
+
+    dashboard.settle_points(purchase, 8, 0.031)
+    assert purchase.points == 10 - 4
+
+
+def test_successful_generation_is_charged_once(purchase):
+    _, status_code = generate(purchase)
+
+    assert status_code == 200
+    assert purchase.points == 1000 - GENERATION_COST
+
+
+def test_failed_generation_refunds_the_reservation(purchase, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("OpenAI is down")
+
+    monkeypatch.setattr(dashboard.GeneratorModels, "generate_content", fail)
+    _, status_code = generate(purchase)
+
+    assert status_code == 400
+    assert purchase.points == 1000
+
+
+def test_reservation_is_settled_when_a_later_step_fails(purchase, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("Socket server is down")
+
+    monkeypatch.setattr(dashboard.Socket, "create_room_for_content", fail)
+    _, status_code = generate(purchase)
+
+    # The content was generated, so it is charged, but nothing stays reserved
+    assert status_code == 500
+    assert purchase.points == 1000 - GENERATION_COST
+
+
+def test_cache_write_failure_does_not_fail_the_generation(purchase, monkeypatch):
+    def fail(content_data):
+        raise RuntimeError("Index is broken")
+
+    monkeypatch.setattr(semantic_cache.content_index, "add", fail)
+    monkeypatch.setattr(dashboard.Config, "SEMANTIC_CACHE_ENABLED", True)
+    _, status_code = generate(purchase)
+
+    assert status_code == 200
+    assert purchase.points == 1000 - GENERATION_COST
+
+
+def test_stream_is_charged_once(purchase):
+    events, _ = generate_stream(purchase)
+
+    assert events[-1].startswith("event: done")
+    assert purchase.points == 1000 - GENERATION_COST
+
+
+def test_abandoned_stream_refunds_the_reservation(purchase):
+    # The client goes away after the first token
+    events, chunks = generate_stream(purchase, events=3)
+    chunks.close()
+
+    assert events[-1].startswith("event: token")
+    assert purchase.points == 1000
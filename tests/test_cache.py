@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from api.utils.cache import LRUCache, SQLiteCache, read_through
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache.sqlite3"))
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_expires_entries(monkeypatch):
+    cache = LRUCache()
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_lru_delete_and_clear():
+    cache = LRUCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    assert cache.get("a") is None
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_sqlite_round_trips_json(disk):
+    disk.set("key", {"choices": [1, 2]}, ttl=60)
+    assert disk.get("key") == {"choices": [1, 2]}
+
+    disk.delete("key")
+    assert disk.get("key") is None
+
+
+def test_sqlite_reports_remaining_ttl(disk):
+    disk.set("expiring", "value", ttl=60)
+    disk.set("forever", "value")
+
+    value, ttl = disk.get_with_ttl("expiring")
+    assert value == "value"
+    assert 59 < ttl <= 60
+    assert disk.get_with_ttl("forever") == ("value", None)
+    assert disk.get_with_ttl("missing") == (None, None)
+
+
+def test_sqlite_drops_expired_entries(disk, monkeypatch):
+    disk.set("key", "value", ttl=10)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert disk.get_with_ttl("key") == (None, None)
+
+    monkeypatch.undo()
+    assert disk.get("key") is None
+
+
+def test_sqlite_purge_expired(disk, monkeypatch):
+    disk.set("expiring", 1, ttl=10)
+    disk.set("forever", 2)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    disk.purge_expired()
+    monkeypatch.undo()
+
+    rows = disk._connection().execute(f"SELECT key FROM {disk.table}").fetchall()
+    assert rows == [("forever",)]
+
+
+def test_read_through_prefers_memory(disk):
+    memory = LRUCache()
+    memory.set("key", "memory")
+    disk.set("key", "disk")
+
+    assert read_through(memory, disk, "key") == "memory"
+
+
+def test_read_through_promotes_disk_hits_with_remaining_ttl(disk, monkeypatch):
+    memory = LRUCache()
+    disk.set("key", "disk", ttl=60)
+
+    assert read_through(memory, disk, "key") == "disk"
+    assert memory.get("key") == "disk"
+
+    # The promoted entry expires with the disk entry, not a fresh TTL
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert memory.get("key") is None
+
+
+def test_read_through_keeps_entries_without_ttl(disk):
+    memory = LRUCache()
+    disk.set("key", "disk")
+
+    assert read_through(memory, disk, "key") == "disk"
+    assert memory._data["key"][0] is None
+
+
+def test_read_through_without_disk():
+    assert read_through(LRUCache(), None, "key") is None
@@ -0,0 +1,144 @@
+import time
+import threading
+
+import pytest
+
+from api.utils.deadline import Deadline, DeadlineExceeded
+from api.utils.resilience import LatencyTracker, backoff_delay, call_with_retries, hedged_call
+
+
+class Retryable(Exception):
+    pass
+
+
+def test_no_deadline_by_default():
+    assert Deadline.remaining() is None
+    assert Deadline.timeout(10) == 10
+    Deadline.check()
+
+
+def test_timeout_is_capped_by_the_deadline():
+    with Deadline.scope(2):
+        assert Deadline.timeout(10) <= 2
+        assert Deadline.timeout(1) == 1
+    assert Deadline.remaining() is None
+
+
+def test_timeout_raises_once_the_deadline_passed():
+    with Deadline.scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            Deadline.timeout(10)
+        with pytest.raises(DeadlineExceeded):
+            Deadline.check()
+
+
+def test_propagate_carries_the_deadline_to_threads():
+    seen = []
+    with Deadline.scope(5):
+        f = Deadline.propagate(lambda: seen.append(Deadline.remaining()))
+    thread = threading.Thread(target=f)
+    thread.start()
+    thread.join()
+
+    assert 0 < seen[0] <= 5
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.1, 1) <= 1
+
+
+def test_retries_retryable_errors(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    attempts = []
+
+    def f():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Retryable()
+        return "ok"
+
+    assert call_with_retries(f, lambda e: isinstance(e, Retryable), 3, 0.1, 1) == "ok"
+    assert len(attempts) == 3
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    attempts = []
+
+    def f():
+        attempts.append(1)
+        raise Retryable()
+
+    with pytest.raises(Retryable):
+        call_with_retries(f, lambda e: True, 2, 0.1, 1)
+    assert len(attempts) == 3
+
+
+def test_does_not_retry_other_errors():
+    attempts = []
+
+    def f():
+        attempts.append(1)
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        call_with_retries(f, lambda e: isinstance(e, Retryable), 3, 0.1, 1)
+    assert len(attempts) == 1
+
+
+def test_does_not_sleep_past_the_deadline():
+    def f():
+        raise Retryable()
+
+    with Deadline.scope(0.05):
+        with pytest.raises(DeadlineExceeded):
+            call_with_retries(f, lambda e: True, 5, 10, 10)
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for seconds in range(9):
+        tracker.record("gpt-4", seconds)
+    assert tracker.percentile("gpt-4", 95) is None
+
+    tracker.record("gpt-4", 9)
+    assert tracker.percentile("gpt-4", 50) == 5
+    assert tracker.percentile("gpt-4", 95) == 9
+
+
+def test_hedged_call_returns_the_faster_attempt():
+    calls = []
+    lock = threading.Lock()
+
+    def f():
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        time.sleep(1 if first else 0.01)
+        return "slow" if first else "fast"
+
+    started_at = time.monotonic()
+    assert hedged_call(f, 0.05) == "fast"
+    assert time.monotonic() - started_at < 0.5
+
+
+def test_hedged_call_skips_the_hedge_for_fast_calls():
+    calls = []
+
+    def f():
+        calls.append(1)
+        return "ok"
+
+    assert hedged_call(f, 1) == "ok"
+    assert len(calls) == 1
+
+
+def test_hedged_call_raises_when_every_attempt_fails():
+    def f():
+        time.sleep(0.02)
+        raise Retryable()
+
+    with pytest.raises(Retryable):
+        hedged_call(f, 0.01)
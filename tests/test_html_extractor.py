@@ -0,0 +1,72 @@
+import pytest
+
+from api.utils.html_extractor import HTMLExtractor, decode_html, sniff_encoding
+
+PAGE = """<html><head>
+<title> Remote   work </title>
+<meta name="description" content="Working from home">
+<style>body { color: red }</style>
+</head><body>
+<h2>Second level</h2>
+<h1>Why remote work</h1>
+<script>var tracking = true;</script>
+<p>First <b>paragraph</b>.</p>
+<p>Second paragraph.</p>
+<a href="/one">One</a> <a href="https://example.com/two">Two</a>
+</body></html>"""
+
+ENGINES = [
+    engine for engine in ("selectolax", "lxml", "html.parser")
+    if HTMLExtractor.engine_name(engine) == engine
+]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_extract_the_same_fields(engine):
+    extract = HTMLExtractor.extract(PAGE, engine)
+
+    assert extract["title"] == "Remote work"
+    assert extract["heading"] == "Why remote work"
+    assert extract["description"] == "Working from home"
+    assert extract["paragraphs"] == ["First paragraph.", "Second paragraph."]
+    assert extract["links"] == ["/one", "https://example.com/two"]
+    assert "First paragraph" in extract["text"]
+    assert "tracking" not in extract["text"]
+    assert "color" not in extract["text"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_empty_pages(engine):
+    extract = HTMLExtractor.extract("", engine)
+    assert extract["text"] == ""
+    assert extract["paragraphs"] == []
+
+
+def test_unknown_engines_fall_back_to_html_parser():
+    assert HTMLExtractor.engine_name("html.parser") == "html.parser"
+    assert HTMLExtractor.engine_name("missing") == "html.parser"
+
+
+def test_sniff_encoding_order():
+    assert sniff_encoding(b"\xef\xbb\xbf<html>", "latin-1") == "utf-8-sig"
+    assert sniff_encoding(b'<meta charset="windows-1252">', "iso-8859-2") == "iso8859-2"
+    assert sniff_encoding(b'<meta charset="windows-1252">') == "cp1252"
+    assert sniff_encoding(b"<html>", "not-a-charset") == "utf-8"
+    assert sniff_encoding(b"<html>") == "utf-8"
+
+
+def test_decode_html_uses_the_declared_charset():
+    html = '<meta charset="windows-1252"><p>café</p>'.encode("cp1252")
+    assert "café" in decode_html(html)
+
+
+def test_extract_decodes_bytes():
+    html = "<html><body><p>Grüße</p></body></html>".encode("iso-8859-1")
+    assert HTMLExtractor.extract(html, "html.parser", encoding="iso-8859-1")["paragraphs"] == ["Grüße"]
+
+
+def test_extract_stream_handles_characters_split_across_chunks():
+    html = "<p>naïve café</p>".encode("utf-8")
+    chunks = [html[:6], html[6:14], html[14:]]
+
+    assert HTMLExtractor.extract_stream(chunks)["paragraphs"] == ["naïve café"]
@@ -0,0 +1,91 @@
+import pytest
+
+pytest.importorskip("openai")
+
+from api.utils import llm_gateway
+from api.utils.cache import LRUCache, SQLiteCache
+from api.utils.llm_gateway import LLMGateway
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_gateway.Config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_gateway, "memory_cache", LRUCache())
+    monkeypatch.setattr(llm_gateway, "disk_cache", SQLiteCache(str(tmp_path / "llm.sqlite3"), table="llm_cache"))
+
+    calls = []
+
+    def call(api_resource, endpoint, key, params, estimated_tokens, user):
+        calls.append(params)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": "Hello"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    monkeypatch.setattr(LLMGateway, "_call", call)
+    return calls
+
+
+def chat(user, **params):
+    return LLMGateway.chat_completion(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": "Hi"}],
+        user=user,
+        **params,
+    )
+
+
+def test_cache_hit_costs_no_tokens(calls):
+    first = chat("1")
+    second = chat("1")
+
+    assert len(calls) == 1
+    assert first["usage"]["total_tokens"] == 15
+    assert second["cached"] is True
+    assert second["usage"] == {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def test_cache_is_per_user_by_default(calls):
+    chat("1")
+    response = chat("2")
+
+    assert len(calls) == 2
+    assert response["usage"]["total_tokens"] == 15
+
+
+def test_shared_cache_is_opt_in(calls):
+    chat("1", shared_cache=True)
+    response = chat("2", shared_cache=True)
+
+    assert len(calls) == 1
+    assert response["cached"] is True
+
+
+def test_zero_ttl_bypasses_the_cache(calls):
+    chat("1", cache_ttl=0)
+    chat("1", cache_ttl=0)
+
+    assert len(calls) == 2
+
+
+def test_evict_cached_drops_both_tiers(calls):
+    chat("1", temperature=0.7)
+    LLMGateway.evict_cached(
+        "chat_completion",
+        user="1",
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": "Hi"}],
+        temperature=0.7,
+    )
+    chat("1", temperature=0.7)
+
+    assert len(calls) == 2
+
+
+def test_cache_key_ignores_attribution_params():
+    params = {"model": "gpt-4", "messages": [{"role": "user", "content": "Hi"}]}
+
+    key = LLMGateway.cache_key("chat_completion", params)
+    assert key == LLMGateway.cache_key("chat_completion", {**params, "user": "1", "request_timeout": 5})
+    assert key != LLMGateway.cache_key("completion", params)
+    assert key != LLMGateway.cache_key("chat_completion", {**params, "temperature": 0})
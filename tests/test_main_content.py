@@ -0,0 +1,59 @@
+from api.utils.main_content import MainContentExtractor
+
+SENTENCE = "Remote teams that write things down, share context early and meet less tend to ship more, and they report fewer late surprises."
+
+ARTICLE_PAGE = f"""<html><head><title>Remote work</title></head><body>
+<header><nav><a href="/">Home</a> <a href="/blog">Blog</a> <a href="/about">About us and the team</a></nav></header>
+<div class="cookie-consent">We use cookies to improve your experience on this website, accept them all.</div>
+<div class="layout">
+  <article class="post-content">
+    <h1>Why remote work works</h1>
+    <p>{SENTENCE}</p>
+    <p>{SENTENCE}</p>
+    <p>{SENTENCE}</p>
+  </article>
+  <aside class="sidebar"><p>Subscribe to our newsletter for weekly tips, tricks and offers.</p></aside>
+</div>
+<div class="related-links">
+  <a href="/a">Another article about offices and commuting</a>
+  <a href="/b">Yet another article about hybrid schedules</a>
+</div>
+<footer><p>Copyright 2024, Example Inc. All rights reserved worldwide.</p></footer>
+</body></html>"""
+
+
+def test_main_text_is_the_article():
+    extract = MainContentExtractor.extract(ARTICLE_PAGE)
+
+    assert extract["main_text"].startswith("Why remote work works")
+    assert extract["main_text"].count("Remote teams") == 3
+    for boilerplate in ("Home", "cookies", "newsletter", "hybrid schedules", "Copyright"):
+        assert boilerplate not in extract["main_text"]
+
+
+def test_keeps_the_regular_fields():
+    extract = MainContentExtractor.extract(ARTICLE_PAGE.encode("utf-8"))
+
+    assert extract["title"] == "Remote work"
+    assert extract["heading"] == "Why remote work works"
+    assert "Copyright" in extract["text"]
+
+
+def test_pages_without_an_article_fall_back_to_readable_paragraphs():
+    page = f"""<html><body>
+    <nav><a href="/">Home</a></nav>
+    <p>{SENTENCE}</p>
+    </body></html>"""
+
+    main_text = MainContentExtractor.extract(page)["main_text"]
+    assert SENTENCE in main_text
+    assert "Home" not in main_text
+
+
+def test_short_pages_fall_back_to_all_text():
+    extract = MainContentExtractor.extract("<html><body><span>Hello</span></body></html>")
+    assert extract["main_text"] == "Hello"
+
+
+def test_empty_pages():
+    assert MainContentExtractor.extract(b"")["main_text"] == ""
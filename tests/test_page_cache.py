@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+from api.utils import page_cache as page_cache_module
+from api.utils.page_cache import CachedPage, PageCache, normalize_url
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, content=b"<html>Hello</html>", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size):
+        yield self.content
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache_module, "crawl_governor", None)
+    return PageCache(str(tmp_path / "pages.sqlite3"), max_bytes=10 ** 6, max_entry_bytes=10 ** 5, default_ttl=60)
+
+
+def serve(monkeypatch, *responses):
+    session = FakeSession(*responses)
+    monkeypatch.setattr(page_cache_module, "http_session", session)
+    return session
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com:443/a?utm_source=x&b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_freshness(cache):
+    assert cache.freshness(FakeResponse(headers={"Cache-Control": "no-store"})) is None
+    assert cache.freshness(FakeResponse(headers={"Cache-Control": "no-cache"})) == 0
+    assert cache.freshness(FakeResponse(headers={"Cache-Control": "public, max-age=300"})) == 300
+    assert cache.freshness(FakeResponse(headers={"Expires": "Thu, 01 Jan 1970 00:00:00 GMT"})) == 0
+    assert cache.freshness(FakeResponse()) == 60
+
+
+def test_fresh_pages_are_served_from_cache(cache, monkeypatch):
+    session = serve(monkeypatch, FakeResponse(headers={"Content-Type": "text/html; charset=utf-8"}))
+
+    first = cache.fetch("https://example.com/")
+    second = cache.fetch("https://example.com/?utm_source=feed")
+
+    assert len(session.requests) == 1
+    assert first.from_cache is False
+    assert second.from_cache is True
+    assert second.text == "<html>Hello</html>"
+    assert second.encoding == "utf-8"
+
+
+def test_stale_pages_are_revalidated(cache, monkeypatch):
+    session = serve(
+        monkeypatch,
+        FakeResponse(headers={"Cache-Control": "no-cache", "ETag": '"v1"'}),
+        FakeResponse(status_code=304, content=b"", headers={"Cache-Control": "max-age=300"}),
+    )
+
+    cache.fetch("https://example.com/")
+    page = cache.fetch("https://example.com/")
+
+    assert session.requests[1]["If-None-Match"] == '"v1"'
+    assert page.from_cache is True
+    assert page.content == b"<html>Hello</html>"
+
+    # The 304 renewed the freshness
+    _, expires_at, _ = cache.lookup(normalize_url("https://example.com/"))
+    assert expires_at > time.time() + 200
+
+
+def test_uncacheable_pages_are_not_stored(cache, monkeypatch):
+    session = serve(
+        monkeypatch,
+        FakeResponse(headers={"Cache-Control": "no-store"}),
+        FakeResponse(headers={"Cache-Control": "no-cache"}),
+        FakeResponse(status_code=404),
+        FakeResponse(),
+    )
+
+    cache.fetch("https://example.com/a")
+    cache.fetch("https://example.com/b")
+    cache.fetch("https://example.com/c")
+
+    # no-cache without a validator can not be revalidated, so it is not kept either
+    for path in ("a", "b", "c"):
+        assert cache.lookup(f"https://example.com/{path}")[0] is None
+    assert len(session.requests) == 3
+
+
+def test_eviction_drops_least_recently_used_pages(cache):
+    for index, path in enumerate(("old", "recent")):
+        page = CachedPage(f"https://example.com/{path}", 200, b"x" * 100, None)
+        cache.store(page, 60)
+        cache._connection().execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (index, page.url))
+
+    # Just over the limit, dropping one page is enough
+    cache.max_bytes = cache._connection().execute("SELECT SUM(size) FROM pages").fetchone()[0] - 1
+
+    cache.evict()
+
+    assert cache.lookup("https://example.com/old")[0] is None
+    assert cache.lookup("https://example.com/recent")[0] is not None
+
+
+def test_oversized_pages_are_not_stored(cache):
+    cache.max_entry_bytes = 10
+    cache.store(CachedPage("https://example.com/", 200, bytes(range(256)) * 10, None), 60)
+
+    assert cache.lookup("https://example.com/")[0] is None
+
+
+def test_extractions_are_cached_per_body(cache):
+    calls = []
+
+    def extract(page):
+        calls.append(page.url)
+        return {"length": len(page.content)}
+
+    page = CachedPage("https://example.com/", 200, b"abc", None)
+    assert cache.extract(page, "test:v1", extract) == {"length": 3}
+    assert cache.extract(page, "test:v1", extract) == {"length": 3}
+    assert len(calls) == 1
+
+    changed = CachedPage("https://example.com/", 200, b"abcd", None)
+    assert cache.extract(changed, "test:v1", extract) == {"length": 4}
+    assert len(calls) == 2
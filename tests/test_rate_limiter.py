@@ -0,0 +1,166 @@
+import time
+import threading
+
+import pytest
+
+from api.utils.deadline import Deadline, DeadlineExceeded
+from api.utils.rate_limiter import OpenAIRateLimiter, TokenBucket, parse_model_limits
+
+
+def make_limiter(max_concurrency=4, rpm=1000, tpm=100000):
+    return OpenAIRateLimiter(max_concurrency, {}, {}, rpm, tpm)
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for_queue(limiter, model, depth):
+    for _ in range(200):
+        with limiter.condition:
+            if model in limiter.models and limiter.models[model].queue_depth == depth:
+                return
+        time.sleep(0.005)
+    raise AssertionError(f"queue never reached {depth}")
+
+
+def test_parse_model_limits():
+    assert parse_model_limits("gpt-4:200, gpt-3.5-turbo:3500,broken") == {"gpt-4": 200, "gpt-3.5-turbo": 3500}
+    assert parse_model_limits(None) == {}
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(30) == pytest.approx(30, abs=0.1)
+
+    # Oversized requests only wait for a full bucket
+    assert bucket.wait_time(600) == pytest.approx(60, abs=0.1)
+
+
+def test_token_bucket_refunds_over_estimates():
+    bucket = TokenBucket(100)
+    bucket.consume(80)
+    bucket.consume(-50)
+    assert bucket.tokens == pytest.approx(70, abs=1)
+
+    bucket.consume(-1000)
+    assert bucket.tokens == 100
+
+
+def test_acquire_consumes_both_budgets():
+    limiter = make_limiter(rpm=10, tpm=1000)
+    with limiter.acquire("gpt-4", 300, "1"):
+        assert limiter.active_calls == 1
+
+    model = limiter.models["gpt-4"]
+    assert model.request_bucket.tokens == pytest.approx(9, abs=0.1)
+    assert model.token_bucket.tokens == pytest.approx(700, abs=1)
+    assert limiter.active_calls == 0
+    assert limiter.stats()["models"]["gpt-4"]["total_calls"] == 1
+
+
+def test_record_usage_corrects_the_estimate():
+    limiter = make_limiter(tpm=1000)
+    with limiter.acquire("gpt-4", 300):
+        pass
+    limiter.record_usage("gpt-4", 300, 100)
+
+    assert limiter.models["gpt-4"].token_bucket.tokens == pytest.approx(900, abs=1)
+
+
+def test_waiting_calls_are_served_round_robin_across_users():
+    limiter = make_limiter(max_concurrency=1)
+    order = []
+    release = threading.Event()
+
+    def hold():
+        with limiter.acquire("gpt-4", 1, "holder"):
+            release.wait(5)
+
+    def call(user):
+        with limiter.acquire("gpt-4", 1, user):
+            order.append(user)
+
+    threads = [start(hold)]
+    wait_for_queue(limiter, "gpt-4", 0)
+    for depth, user in enumerate(["a", "a", "a", "b"], start=1):
+        threads.append(start(call, user))
+        wait_for_queue(limiter, "gpt-4", depth)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["a", "b", "a", "a"]
+
+
+def test_wait_is_bounded_by_the_deadline():
+    limiter = make_limiter(rpm=1)
+    with limiter.acquire("gpt-4", 1):
+        pass
+
+    with Deadline.scope(0.2):
+        started_at = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            with limiter.acquire("gpt-4", 1):
+                pass
+
+    assert time.monotonic() - started_at < 1
+    assert limiter.models["gpt-4"].queue_depth == 0
+    assert limiter.active_calls == 0
+
+
+class SlowRedis:
+    def __init__(self, delay, over_budget_calls=0):
+        self.delay = delay
+        self.over_budget_calls = over_budget_calls
+        self.calls = 0
+
+    def try_consume(self, model, requests, tokens, rpm, tpm):
+        self.calls += 1
+        if model == "slow":
+            time.sleep(self.delay)
+        if self.calls <= self.over_budget_calls:
+            return 0.1
+        return 0.0
+
+    def adjust_tokens(self, model, tokens):
+        pass
+
+
+def test_redis_round_trip_does_not_hold_the_lock():
+    limiter = make_limiter()
+    limiter.redis_budget = SlowRedis(delay=0.5)
+    finished_at = {}
+    started_at = time.monotonic()
+
+    def call(model):
+        with limiter.acquire(model, 1):
+            finished_at[model] = time.monotonic() - started_at
+
+    slow = start(call, "slow")
+    time.sleep(0.05)
+    fast = start(call, "fast")
+    slow.join(5)
+    fast.join(5)
+
+    assert finished_at["fast"] < 0.4
+    assert finished_at["slow"] >= 0.5
+    assert limiter.active_calls == 0
+
+
+def test_redis_over_budget_waits_and_frees_the_slot():
+    limiter = make_limiter(max_concurrency=1)
+    limiter.redis_budget = SlowRedis(delay=0, over_budget_calls=1)
+
+    started_at = time.monotonic()
+    with limiter.acquire("gpt-4", 1):
+        assert limiter.active_calls == 1
+
+    assert time.monotonic() - started_at >= 0.1
+    assert limiter.redis_budget.calls == 2
+    assert limiter.active_calls == 0
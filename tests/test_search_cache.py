@@ -0,0 +1,119 @@
+import time
+import threading
+
+import pytest
+
+from api.utils.cache import LRUCache, SQLiteCache
+from api.utils.search_cache import NEWS, WEB, SearchCache, search_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SearchCache(
+        memory=LRUCache(),
+        disk=SQLiteCache(str(tmp_path / "search.sqlite3"), table="search_cache"),
+        ttls={NEWS: 0, WEB: 60},
+    )
+
+
+def stub_fetch(cache, monkeypatch, result=None, delay=0):
+    calls = []
+
+    def fetch(params):
+        calls.append(params)
+        time.sleep(delay)
+        return result if result is not None else {"items": [params["q"]]}
+
+    monkeypatch.setattr(cache, "fetch", fetch)
+    return calls
+
+
+def test_search_key_normalizes_whitespace_and_country():
+    assert search_key({"q": " remote   work ", "gl": "IN"}) == search_key({"q": "remote work", "gl": "in"})
+
+
+def test_search_key_keeps_query_case():
+    # OR and AND are operators only in upper case
+    assert search_key({"q": "cats OR dogs"}) != search_key({"q": "cats or dogs"})
+
+
+def test_search_key_ignores_the_api_key():
+    assert search_key({"q": "remote work", "key": "a"}) == search_key({"q": "remote work", "key": "b"})
+
+
+def test_second_search_is_a_hit(cache, monkeypatch):
+    calls = stub_fetch(cache, monkeypatch)
+
+    assert cache.search(WEB, {"q": "remote work"}) == ({"items": ["remote work"]}, False)
+    assert cache.search(WEB, {"q": "remote work"}) == ({"items": ["remote work"]}, True)
+    assert len(calls) == 1
+    assert cache.stats()[WEB] == {"hits": 1, "misses": 1, "coalesced": 0}
+
+
+def test_disk_hits_survive_a_new_process(cache, monkeypatch):
+    calls = stub_fetch(cache, monkeypatch)
+    cache.search(WEB, {"q": "remote work"})
+    cache.memory.clear()
+
+    assert cache.search(WEB, {"q": "remote work"}) == ({"items": ["remote work"]}, True)
+    assert len(calls) == 1
+
+
+def test_zero_ttl_vertical_is_not_cached(cache, monkeypatch):
+    calls = stub_fetch(cache, monkeypatch)
+
+    assert cache.search(NEWS, {"q": "remote work"})[1] is False
+    assert cache.search(NEWS, {"q": "remote work"})[1] is False
+    assert len(calls) == 2
+
+
+def test_failed_fetch_is_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(cache, "fetch", lambda params: None)
+    assert cache.search(WEB, {"q": "remote work"}) == (None, False)
+
+    calls = stub_fetch(cache, monkeypatch)
+    cache.search(WEB, {"q": "remote work"})
+    assert len(calls) == 1
+
+
+def test_concurrent_identical_searches_are_coalesced(cache, monkeypatch):
+    calls = stub_fetch(cache, monkeypatch, delay=0.2)
+    results = []
+
+    def search():
+        results.append(cache.search(WEB, {"q": "remote work"}))
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(served_from_cache for _, served_from_cache in results) == [False, True, True, True]
+    assert cache.stats()[WEB]["coalesced"] == 3
+    assert cache.in_flight == {}
+
+
+def test_coalesced_searches_share_the_leader_error(cache, monkeypatch):
+    def fetch(params):
+        time.sleep(0.2)
+        raise ConnectionError("Custom Search is down")
+
+    monkeypatch.setattr(cache, "fetch", fetch)
+    errors = []
+
+    def search():
+        try:
+            cache.search(WEB, {"q": "remote work"})
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    assert cache.in_flight == {}
@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip("openai")
+
+from api.utils import title_generator
+from api.utils.llm_gateway import LLMGateway
+from api.utils.title_generator import BATCHED_TITLE_SYSTEM_PROMPT, TitleGenerator
+
+CLUSTERS = [
+    [("remote", 3), ("work", 2)],
+    [("office", 4), ("commute", 1)],
+]
+
+
+def completion(content, total_tokens):
+    return {
+        "choices": [{"message": {"content": content}}],
+        "usage": {"total_tokens": total_tokens},
+    }
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(title_generator.Config, "OPENAI_BATCHED_TITLES", True)
+    llm = {"batched": "", "calls": [], "evicted": []}
+
+    def chat_completion(model, messages, user=None, **params):
+        llm["calls"].append(messages)
+        if messages[0]["content"] == BATCHED_TITLE_SYSTEM_PROMPT:
+            return completion(llm["batched"], 100)
+        return completion(f"Title for {messages[1]['content']}", 10)
+
+    def evict_cached(endpoint, user=None, **params):
+        llm["evicted"].append((endpoint, user))
+
+    monkeypatch.setattr(LLMGateway, "chat_completion", chat_completion)
+    monkeypatch.setattr(LLMGateway, "evict_cached", evict_cached)
+    return llm
+
+
+def test_parse_json_array():
+    assert TitleGenerator.parse_batched_titles('["One", "Two"]', 2) == ["One", "Two"]
+
+
+def test_parse_json_array_wrapped_in_prose():
+    text = 'Here you go:\n```json\n["One", " Two "]\n```'
+    assert TitleGenerator.parse_batched_titles(text, 2) == ["One", "Two"]
+
+
+def test_parse_numbered_list():
+    assert TitleGenerator.parse_batched_titles("1. One\n2) Two\n", 2) == ["One", "Two"]
+
+
+def test_parse_rejects_the_wrong_count():
+    with pytest.raises(ValueError):
+        TitleGenerator.parse_batched_titles('["One"]', 2)
+
+
+def test_batched_titles_use_one_request(llm):
+    llm["batched"] = '["Remote title", "Office title"]'
+
+    assert TitleGenerator.generate_titles(CLUSTERS, 7) == (["Remote title", "Office title"], 100)
+    assert len(llm["calls"]) == 1
+
+
+def test_unparseable_batch_falls_back_to_one_request_per_cluster(llm):
+    llm["batched"] = "Sorry, I can not help with that."
+
+    titles, total_tokens = TitleGenerator.generate_titles(CLUSTERS, 7)
+
+    assert titles == ["Title for Keywords: remote, work", "Title for Keywords: office, commute"]
+    # The failed batch is charged as well
+    assert total_tokens == 100 + 2 * 10
+    # And dropped from the cache, so the next call does not get it again
+    assert llm["evicted"] == [("chat_completion", "7")]
+
+
+def test_no_clusters(llm):
+    assert TitleGenerator.generate_titles([], 7) == ([], 0)
+    assert llm["calls"] == []
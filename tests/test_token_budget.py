@@ -0,0 +1,50 @@
+import pytest
+
+from api.utils.token_budget import TokenBudget
+
+
+@pytest.fixture(autouse=True)
+def character_estimates(monkeypatch):
+    # Counts without tiktoken, so the expectations do not depend on its BPE files
+    monkeypatch.setattr(TokenBudget, "encoding_for", lambda model: None)
+
+
+def test_count_tokens_estimates_from_characters():
+    assert TokenBudget.count_tokens("") == 0
+    assert TokenBudget.count_tokens(None) == 0
+    assert TokenBudget.count_tokens("abcd") == 1
+    assert TokenBudget.count_tokens("abcde") == 2
+
+
+def test_count_message_tokens_adds_chat_overhead():
+    messages = [
+        {"role": "system", "content": "abcd" * 10},
+        {"role": "user", "content": None},
+    ]
+    assert TokenBudget.count_message_tokens(messages) == 3 + (4 + 10) + (4 + 0)
+
+
+def test_truncate_to_tokens():
+    assert TokenBudget.truncate_to_tokens("abcdefgh", 1) == "abcd"
+    assert TokenBudget.truncate_to_tokens("abcdefgh", 0) == ""
+
+
+def test_fit_contents_keeps_sources_in_rank_order():
+    contents = [
+        {"website": "abcd", "content": "x" * 40},
+        {"website": "abcd", "content": "y" * 400},
+        {"website": "abcd", "content": "z" * 40},
+    ]
+
+    fitted = TokenBudget.fit_contents(contents, 30)
+
+    # First source whole, second trimmed to what is left, third dropped
+    assert [content["content"][:1] for content in fitted] == ["x", "y"]
+    assert fitted[0]["content"] == "x" * 40
+    assert len(fitted[1]["content"]) == (30 - 3 - 10 - 3) * 4
+
+
+def test_estimate_points_rounds_up_to_hundredths_of_a_dollar():
+    assert TokenBudget.estimate_points(1000, 0, 0.03) == 3
+    assert TokenBudget.estimate_points(1, 0, 0.03) == 1
+    assert TokenBudget.estimate_points(0, 0, 0.03) == 0